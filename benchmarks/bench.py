@@ -0,0 +1,331 @@
+"""Benchmarks of lunaconf on synthetic large configurations.
+
+    python benchmarks/bench.py run -o baseline.json
+    python benchmarks/bench.py compare baseline.json --threshold 0.15
+
+`run` times every benchmark and optionally stores the results as a JSON
+baseline. `compare` runs the benchmarks again (or reads a second result file)
+and exits with status 1 if any of them got slower than the baseline by more
+than the threshold. `--scale` shrinks or grows every workload; `compare` runs
+at the scale of the baseline.
+"""
+
+import argparse
+import copy
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Any
+
+import toml
+from pydantic import Field, create_model
+
+from lunaconf import (
+    LunaConf,
+    lunaconf_cli,
+    lunaconf_dump_json,
+    lunaconf_dump_toml,
+    lunaconf_dumps_json,
+    lunaconf_dumps_toml,
+    lunaconf_gendict,
+)
+from lunaconf.cli import adjust_conf, adjust_conf_multilevel_data_structure
+
+DEPTH = 32
+ENV_NAME = "LUNACONF_BENCH_NAME"
+ENV_INT = "LUNACONF_BENCH_INT"
+
+
+class Layer(LunaConf):
+    width: int = 64
+    act: str = "relu"
+    dropout: float = 0.0
+    tags: list[str] = Field(default_factory=list)
+
+
+def _deep_model(depth: int) -> type[LunaConf]:
+    model = create_model("Deep0", __base__=LunaConf, value=(int, 0))
+    for i in range(1, depth):
+        model = create_model(
+            f"Deep{i}",
+            __base__=LunaConf,
+            value=(int, 0),
+            child=(model, Field(default_factory=model)),
+        )
+    return model
+
+
+class Workload:
+    """The configuration class, arguments and files of one scale."""
+
+    def __init__(self, scale: float, directory: str) -> None:
+        self.scale = scale
+        self.n_items = max(10, int(100_000 * scale))
+        self.n_overrides = max(10, int(10_000 * scale))
+        self.n_layers = max(10, int(2_000 * scale))
+        self.n_params = max(10, int(5_000 * scale))
+
+        deep = _deep_model(DEPTH)
+        n_items, n_layers = self.n_items, self.n_layers
+        self.cls: type[LunaConf] = create_model(
+            "BenchConf",
+            __base__=LunaConf,
+            name=(str, "default"),
+            seed=(int, 0),
+            items=(list[int], Field(default_factory=lambda: list(range(n_items)))),
+            layers=(
+                list[Layer],
+                Field(default_factory=lambda: [Layer() for _ in range(n_layers)]),
+            ),
+            params=(dict[str, float], Field(default_factory=dict)),
+            deep=(deep, Field(default_factory=deep)),
+        )
+
+        self.deep_path = ".".join(["deep"] + ["child"] * (DEPTH - 1) + ["value"])
+        self.overrides = self._overrides()
+        self.document = self._document()
+        self.json_file = os.path.join(directory, "overlay.json")
+        with open(self.json_file, "w") as f:
+            json.dump(self.document, f)
+        self.toml_file = os.path.join(directory, "overlay.toml")
+        with open(self.toml_file, "w") as f:
+            toml.dump(
+                {
+                    "seed": f"<envint:{ENV_INT}>",
+                    "params": {f"t{i}": i / 2 for i in range(self.n_params)},
+                },
+                f,
+            )
+        self.args = [
+            "-J",
+            self.json_file,
+            "-T",
+            self.toml_file,
+            *self.overrides,
+        ]
+
+    def _overrides(self) -> list[str]:
+        # `key=value` commands, 100 per argument
+        commands = [f"name=<env:{ENV_NAME}>", f"{self.deep_path}=7"]
+        i = 0
+        while len(commands) < self.n_overrides:
+            match i % 5:
+                case 0:
+                    commands.append(f"params.p{i}={i}.5")
+                case 1:
+                    commands.append(f"items.{i % self.n_items}={-i}")
+                case 2:
+                    commands.append(f"layers.{i % self.n_layers}.width={i}")
+                case 3:
+                    commands.append(f"layers.{i % self.n_layers}.act=gelu")
+                case 4:
+                    commands.append(f"params.t{i % self.n_params}=<del>")
+            i += 1
+        # delete from the end, so that the indices above stay valid
+        commands += [f"items.{self.n_items - 1 - j}=<del>" for j in range(10)]
+        return ["; ".join(commands[i : i + 100]) for i in range(0, len(commands), 100)]
+
+    def _document(self) -> dict[str, Any]:
+        deep: dict[str, Any] = {"value": 1}
+        for _ in range(DEPTH - 1):
+            deep = {"value": 1, "child": deep}
+        return {
+            "name": "overlay",
+            "items": list(range(self.n_items, 0, -1)),
+            "layers": [
+                {
+                    "width": i,
+                    "act": "<del>",
+                    "dropout": "<nan>" if i % 100 == 0 else 0.1,
+                    "tags": [f"<env:{ENV_NAME}>", "x"],
+                }
+                for i in range(self.n_layers)
+            ],
+            "params": {f"p{i}": i * 1.5 for i in range(self.n_params)},
+            "deep": deep,
+        }
+
+
+Benchmark = tuple[str, Callable[[], tuple[Any, ...]], Callable[..., Any]]
+
+
+def benchmarks(w: Workload) -> list[Benchmark]:
+    """(name, setup, function); only calling the function is timed."""
+    seed = w.cls().model_dump()
+    config = lunaconf_cli(w.cls, w.args)
+    keys = [[f"k{i % 97}", f"s{i % 13}", str(i % 7)] for i in range(w.n_overrides)] + [
+        w.deep_path.split(".")
+    ]
+
+    def run_adjust_conf(d: dict[str, Any]) -> None:
+        for i, k in enumerate(keys):
+            d = adjust_conf(d, k, i)
+
+    def fresh() -> tuple[Any, ...]:
+        return (copy.deepcopy(seed),)
+
+    return [
+        ("adjust_conf", lambda: ({},), run_adjust_conf),
+        (
+            "adjust_conf_multilevel_data_structure",
+            lambda: (copy.deepcopy(seed), copy.deepcopy(w.document)),
+            adjust_conf_multilevel_data_structure,
+        ),
+        (
+            "lunaconf_gendict",
+            fresh,
+            lambda d: lunaconf_gendict(d, w.args, use_cache=False),
+        ),
+        (
+            "lunaconf_gendict_checked",
+            fresh,
+            lambda d: lunaconf_gendict(d, w.args, use_cache=False, cls=w.cls),
+        ),
+        (
+            "lunaconf_cli",
+            lambda: (),
+            lambda: lunaconf_cli(w.cls, ["--no-cache", *w.args]),
+        ),
+        # the in-memory dumpers, as the reference for the streaming writers
+        ("lunaconf_dumps_json", lambda: (), lambda: lunaconf_dumps_json(config)),
+        ("lunaconf_dumps_toml", lambda: (), lambda: lunaconf_dumps_toml(config)),
+        (
+            "lunaconf_dump_json",
+            lambda: (io.StringIO(),),
+            lambda fp: lunaconf_dump_json(config, fp),
+        ),
+        (
+            "lunaconf_dump_toml",
+            lambda: (io.StringIO(),),
+            lambda fp: lunaconf_dump_toml(config, fp),
+        ),
+    ]
+
+
+def run(scale: float, repeat: int, only: list[str] | None = None) -> dict[str, Any]:
+    os.environ[ENV_NAME] = "bench"
+    os.environ[ENV_INT] = "3"
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        w = Workload(scale, directory)
+        for name, setup, fn in benchmarks(w):
+            if only and name not in only:
+                continue
+            fn(*setup())  # warm up the schema and parser caches
+            times = []
+            for _ in range(repeat):
+                args = setup()
+                start = time.perf_counter()
+                fn(*args)
+                times.append(time.perf_counter() - start)
+            results[name] = {
+                "min": min(times),
+                "median": statistics.median(times),
+                "repeat": repeat,
+            }
+            print(
+                f"{name:<40} {min(times) * 1000:>10.2f} ms"
+                f" {statistics.median(times) * 1000:>10.2f} ms",
+                file=sys.stderr,
+            )
+    return {
+        "scale": scale,
+        "lunaconf": _version(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def _version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("lunaconf")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def compare(
+    baseline: dict[str, Any], current: dict[str, Any], threshold: float
+) -> list[str]:
+    """The benchmarks whose minimum time grew by more than `threshold`."""
+    if baseline["scale"] != current["scale"]:
+        raise ValueError(
+            f"Cannot compare scale {current['scale']} to scale {baseline['scale']}"
+        )
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<40} {'-':>10} {result['min'] * 1000:>10.2f}")
+            continue
+        ratio = result["min"] / base["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<40} {base['min'] * 1000:>10.2f} {result['min'] * 1000:>10.2f}"
+            f" {ratio:>7.2f}{flag}"
+        )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="mode", required=True)
+    for mode in ("run", "compare"):
+        p = sub.add_parser(mode)
+        if mode == "run":
+            p.add_argument("--scale", type=float, default=1.0)
+        p.add_argument("--repeat", type=int, default=5)
+        p.add_argument(
+            "--only", action="append", help="Only run this benchmark (repeatable)"
+        )
+        p.add_argument("-o", "--output", help="Write the results to this file")
+        if mode == "compare":
+            p.add_argument("baseline", help="Result file to compare against")
+            p.add_argument(
+                "current",
+                nargs="?",
+                help="Result file to compare instead of running the benchmarks",
+            )
+            p.add_argument(
+                "--threshold",
+                type=float,
+                default=0.1,
+                help="Allowed slowdown as a fraction (default: 0.1)",
+            )
+    args = parser.parse_args(argv)
+
+    if args.mode == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.mode == "compare" and args.current is not None:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        scale = baseline["scale"] if args.mode == "compare" else args.scale
+        current = run(scale, args.repeat, args.only)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+    if args.mode == "compare":
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"regressions: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
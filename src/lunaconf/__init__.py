@@ -1,11 +1,114 @@
-from lunaconf.cli import lunaconf_cli, lunaconf_gendict
-from lunaconf.config_base import LunaConf
-from lunaconf.dump import lunaconf_dumps_json, lunaconf_dumps_toml
+# Recognized by type checkers; avoids importing `typing` at runtime.
+TYPE_CHECKING = False
+
+if TYPE_CHECKING:
+    from lunaconf.aio import lunaconf_cli_async, lunaconf_cli_batch_async
+    from lunaconf.batch import lunaconf_cli_batch
+    from lunaconf.cli import lunaconf_cli, lunaconf_gendict
+    from lunaconf.columns import (
+        lunaconf_dump_csv,
+        lunaconf_dump_jsonl,
+        lunaconf_to_columns,
+    )
+    from lunaconf.config_base import LunaConf
+    from lunaconf.defaults import lunaconf_defaults, lunaconf_invalidate_defaults
+    from lunaconf.dump import (
+        lunaconf_dump_json,
+        lunaconf_dump_toml,
+        lunaconf_dumps_json,
+        lunaconf_dumps_toml,
+    )
+    from lunaconf.fingerprint import lunaconf_fingerprint
+    from lunaconf.formats import lunaconf_register_format
+    from lunaconf.overrides import lunaconf_overrides
+    from lunaconf.parser import LunaConfParser
+    from lunaconf.profile import (
+        lunaconf_add_profile_hook,
+        lunaconf_remove_profile_hook,
+    )
+    from lunaconf.shm import lunaconf_attach, lunaconf_publish
+    from lunaconf.snapshot import lunaconf_load_snapshot, lunaconf_save_snapshot
+    from lunaconf.special import lunaconf_register_special_value
+    from lunaconf.sweep import lunaconf_sweep
+    from lunaconf.watch import lunaconf_watch
+
+del TYPE_CHECKING
+
+# The submodules pull in pydantic, argparse and the format backends, so they
+# are only imported when one of their attributes is first accessed.
+_LAZY_ATTRS = {
+    "lunaconf_cli": "lunaconf.cli",
+    "lunaconf_cli_batch": "lunaconf.batch",
+    "lunaconf_cli_async": "lunaconf.aio",
+    "lunaconf_cli_batch_async": "lunaconf.aio",
+    "lunaconf_gendict": "lunaconf.cli",
+    "LunaConf": "lunaconf.config_base",
+    "LunaConfParser": "lunaconf.parser",
+    "lunaconf_defaults": "lunaconf.defaults",
+    "lunaconf_invalidate_defaults": "lunaconf.defaults",
+    "lunaconf_dump_json": "lunaconf.dump",
+    "lunaconf_dump_toml": "lunaconf.dump",
+    "lunaconf_dumps_json": "lunaconf.dump",
+    "lunaconf_dumps_toml": "lunaconf.dump",
+    "lunaconf_to_columns": "lunaconf.columns",
+    "lunaconf_dump_csv": "lunaconf.columns",
+    "lunaconf_dump_jsonl": "lunaconf.columns",
+    "lunaconf_fingerprint": "lunaconf.fingerprint",
+    "lunaconf_overrides": "lunaconf.overrides",
+    "lunaconf_register_format": "lunaconf.formats",
+    "lunaconf_add_profile_hook": "lunaconf.profile",
+    "lunaconf_remove_profile_hook": "lunaconf.profile",
+    "lunaconf_register_special_value": "lunaconf.special",
+    "lunaconf_load_snapshot": "lunaconf.snapshot",
+    "lunaconf_publish": "lunaconf.shm",
+    "lunaconf_attach": "lunaconf.shm",
+    "lunaconf_save_snapshot": "lunaconf.snapshot",
+    "lunaconf_sweep": "lunaconf.sweep",
+    "lunaconf_watch": "lunaconf.watch",
+}
 
 __all__ = [
     "lunaconf_cli",
+    "lunaconf_cli_batch",
+    "lunaconf_cli_async",
+    "lunaconf_cli_batch_async",
     "lunaconf_gendict",
     "LunaConf",
+    "LunaConfParser",
+    "lunaconf_defaults",
+    "lunaconf_invalidate_defaults",
+    "lunaconf_dump_json",
+    "lunaconf_dump_toml",
     "lunaconf_dumps_json",
     "lunaconf_dumps_toml",
+    "lunaconf_to_columns",
+    "lunaconf_dump_csv",
+    "lunaconf_dump_jsonl",
+    "lunaconf_fingerprint",
+    "lunaconf_overrides",
+    "lunaconf_register_format",
+    "lunaconf_add_profile_hook",
+    "lunaconf_remove_profile_hook",
+    "lunaconf_register_special_value",
+    "lunaconf_load_snapshot",
+    "lunaconf_publish",
+    "lunaconf_attach",
+    "lunaconf_save_snapshot",
+    "lunaconf_sweep",
+    "lunaconf_watch",
 ]
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,151 @@
+import asyncio
+import copy
+import os
+import sys
+from collections import Counter
+from collections.abc import Sequence
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from lunaconf.cli import (
+    _AvaliTag,
+    _expand_command_files,
+    _load_file,
+    _read_command_file,
+)
+from lunaconf.config_base import LunaConf
+from lunaconf.parser import LunaConfParser
+
+T = TypeVar("T", bound=LunaConf)
+
+_FILE_TAGS = ("json-file", "toml-file", "detect-file")
+
+_FileKey = tuple[_AvaliTag, str, bool]
+
+
+async def _prefetch_command_files(
+    executor: Executor, command: list[tuple[_AvaliTag, str]]
+) -> None:
+    """Read the command files reachable from `command`, a level at a time.
+
+    Only warms the memo of `_read_command_file`; errors are left to the
+    expansion, which reports them in order.
+    """
+    loop = asyncio.get_running_loop()
+    seen: set[str] = set()
+    level = command
+    while True:
+        paths = {
+            os.path.realpath(arg) for tag, arg in level if tag == "command-file"
+        } - seen
+        if not paths:
+            return
+        seen |= paths
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, _read_command_file, p) for p in paths),
+            return_exceptions=True,
+        )
+        level = [c for r in results if not isinstance(r, BaseException) for c in r[0]]
+
+
+class _Prefetched:
+    """Hands out the documents loaded ahead of time, in the order of use.
+
+    A document is merged into the configuration by adopting its containers,
+    so a file used several times gives copies to all but its last use.
+    """
+
+    def __init__(
+        self, loaded: dict[_FileKey, tuple[Any, bool] | BaseException], uses: Counter
+    ) -> None:
+        self._loaded = loaded
+        self._uses = uses
+
+    def __call__(self, tag: _AvaliTag, path: str, use_cache: bool) -> tuple[Any, bool]:
+        key = (tag, path, use_cache)
+        res = self._loaded[key]
+        if isinstance(res, BaseException):
+            raise res
+        self._uses[key] -= 1
+        if self._uses[key] > 0:
+            return copy.deepcopy(res[0]), res[1]
+        return res
+
+
+async def _resolve_async(
+    parser: LunaConfParser[T], args: Sequence[str], executor: Executor
+) -> T:
+    loop = asyncio.get_running_loop()
+    command, no_cache = parser._commands(args)
+    await _prefetch_command_files(executor, command)
+    entries = await loop.run_in_executor(
+        executor,
+        _expand_command_files,
+        command,
+        parser.use_cache and not no_cache,
+    )
+
+    uses: Counter = Counter(
+        (tag, arg, use_cache) for tag, arg, use_cache in entries if tag in _FILE_TAGS
+    )
+    keys = list(uses)
+    results = await asyncio.gather(
+        *(loop.run_in_executor(executor, _load_file, *key) for key in keys),
+        return_exceptions=True,
+    )
+    load_file = _Prefetched(dict(zip(keys, results)), uses)
+    # merging and validating is CPU-bound, so it stays off the event loop too
+    return await loop.run_in_executor(executor, parser._resolve, entries, load_file)
+
+
+async def lunaconf_cli_async(
+    cls: type[T],
+    args: Sequence[str] | None = None,
+    *,
+    init_from_defaults: bool = True,
+    max_workers: int = 8,
+) -> T:
+    """Resolve a configuration like `lunaconf_cli`, without blocking the loop.
+
+    Every file referenced through `-J/-T/-D/-C` is read and parsed up front,
+    at most `max_workers` at a time in a thread pool, and the results are
+    applied in the order of the arguments, so the outcome is the same as
+    with `lunaconf_cli`. The printing and snapshot flags are not supported,
+    and invalid arguments raise a `ValueError`.
+    """
+    if args is None:
+        args = sys.argv[1:]
+    parser = LunaConfParser(cls, init_from_defaults=init_from_defaults)
+    executor = ThreadPoolExecutor(max_workers, thread_name_prefix="lunaconf")
+    try:
+        return await _resolve_async(parser, args, executor)
+    finally:
+        executor.shutdown(wait=False)
+
+
+async def lunaconf_cli_batch_async(
+    cls: type[T],
+    argvs: Sequence[Sequence[str]],
+    *,
+    init_from_defaults: bool = True,
+    max_workers: int = 8,
+) -> list[T | Exception]:
+    """Resolve many argument vectors like `lunaconf_cli_async`, concurrently.
+
+    All of them share one thread pool of `max_workers` threads. As with
+    `lunaconf_cli_batch`, the results keep the input order and an item that
+    fails holds its exception.
+    """
+    parser = LunaConfParser(cls, init_from_defaults=init_from_defaults)
+    executor = ThreadPoolExecutor(max_workers, thread_name_prefix="lunaconf")
+    try:
+        results = await asyncio.gather(
+            *(_resolve_async(parser, args, executor) for args in argvs),
+            return_exceptions=True,
+        )
+    finally:
+        executor.shutdown(wait=False)
+    for res in results:
+        if isinstance(res, BaseException) and not isinstance(res, Exception):
+            raise res
+    return list(results)  # type: ignore[arg-type]
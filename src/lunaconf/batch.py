@@ -0,0 +1,95 @@
+import os
+import pickle
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, TypeVar
+
+from lunaconf.config_base import LunaConf
+from lunaconf.parser import LunaConfParser
+
+T = TypeVar("T", bound=LunaConf)
+
+
+def _resolve_chunk(
+    cls: type[T],
+    argvs: list[Sequence[str]],
+    init_from_defaults: bool,
+) -> list[T | Exception]:
+    parser = LunaConfParser(cls, init_from_defaults=init_from_defaults)
+    results: list[T | Exception] = []
+    for args in argvs:
+        try:
+            results.append(parser.parse(list(args)))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _portable_results(results: list[T | Exception]) -> list[T | Exception]:
+    # Not every exception survives a round-trip through pickle, so the ones
+    # that do not are replaced before they are sent back to the parent.
+    for i, res in enumerate(results):
+        if isinstance(res, Exception):
+            try:
+                pickle.loads(pickle.dumps(res))
+            except Exception:
+                results[i] = RuntimeError(f"{type(res).__name__}: {res}")
+    return results
+
+
+def _resolve_chunk_in_worker(
+    cls: type[T],
+    argvs: list[Sequence[str]],
+    init_from_defaults: bool,
+) -> list[T | Exception]:
+    return _portable_results(_resolve_chunk(cls, argvs, init_from_defaults))
+
+
+def _is_picklable(obj: Any) -> bool:
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+
+def lunaconf_cli_batch(
+    cls: type[T],
+    argvs: Sequence[Sequence[str]],
+    *,
+    max_workers: int | None = None,
+    chunksize: int | None = None,
+    min_parallel: int = 64,
+    init_from_defaults: bool = True,
+) -> list[T | Exception]:
+    """Resolve many argument vectors, in parallel when it pays off.
+
+    Each argument vector is handled like the arguments of `lunaconf_cli`
+    (without the printing flags). The results are returned in the input
+    order; an item that fails holds its exception instead of a configuration,
+    so a single bad item does not abort the batch.
+
+    Batches smaller than `min_parallel`, single-worker runs and classes that
+    cannot be pickled (e.g. defined inside a function) are resolved in the
+    current process.
+    """
+    argvs = list(argvs)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if len(argvs) < min_parallel or max_workers <= 1 or not _is_picklable(cls):
+        return _resolve_chunk(cls, argvs, init_from_defaults)
+
+    if chunksize is None:
+        chunksize = max(1, len(argvs) // (max_workers * 4))
+    chunks = [argvs[i : i + chunksize] for i in range(0, len(argvs), chunksize)]
+
+    results: list[T | Exception] = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for chunk_results in executor.map(
+            _resolve_chunk_in_worker,
+            [cls] * len(chunks),
+            chunks,
+            [init_from_defaults] * len(chunks),
+        ):
+            results.extend(chunk_results)
+    return results
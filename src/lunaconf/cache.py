@@ -0,0 +1,125 @@
+import hashlib
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+from lunaconf.profile import phase
+from lunaconf.special import SpecialValueResolver
+
+# Bump whenever the layout of a cache entry (or the way documents are
+# pre-resolved before being stored) changes.
+_CACHE_VERSION = 1
+_DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_dir() -> Path | None:
+    """Return the cache directory, or `None` if caching is disabled.
+
+    The cache is opt-in through `LUNACONF_CACHE_DIR` and can be turned off
+    again with `LUNACONF_NO_CACHE=1`.
+    """
+    if os.environ.get("LUNACONF_NO_CACHE", "") not in ("", "0"):
+        return None
+    d = os.environ.get("LUNACONF_CACHE_DIR")
+    if not d:
+        return None
+    return Path(d)
+
+
+def cache_max_bytes() -> int:
+    try:
+        return int(os.environ.get("LUNACONF_CACHE_MAX_BYTES", _DEFAULT_MAX_BYTES))
+    except ValueError:
+        return _DEFAULT_MAX_BYTES
+
+
+def _evict(directory: Path, max_bytes: int) -> None:
+    entries = []
+    total = 0
+    for entry in directory.glob("*.lcc"):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime_ns, st.st_size, entry))
+        total += st.st_size
+    if total <= max_bytes:
+        return
+    entries.sort()
+    for _, size, entry in entries:
+        if total <= max_bytes:
+            break
+        try:
+            entry.unlink()
+        except OSError:
+            continue
+        total -= size
+
+
+def load_document(
+    path: str,
+    fmt: str,
+    loads: Callable[[str], Any],
+    *,
+    use_cache: bool = True,
+) -> tuple[Any, bool]:
+    """Read and parse the file at `path` with `loads`.
+
+    Returns the parsed document and whether it may still contain special
+    values. When the cache is enabled, the parsed document is stored on disk
+    keyed by path, size, mtime and content hash, so a repeated load of an
+    unchanged file skips parsing.
+    """
+    directory = cache_dir() if use_cache else None
+    if directory is None:
+        with phase("read", path) as p:
+            with open(path) as f:
+                text = f.read()
+            p.size = len(text)
+        with phase("parse", path, len(text)):
+            return loads(text), True
+
+    st = os.stat(path)
+    with phase("read", path) as p:
+        with open(path) as f:
+            text = f.read()
+        p.size = len(text)
+    digest = hashlib.blake2b(
+        text.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+    key = hashlib.blake2b(
+        f"{_CACHE_VERSION}\0{fmt}\0{os.path.abspath(path)}\0"
+        f"{st.st_size}\0{st.st_mtime_ns}".encode("utf-8", "surrogatepass"),
+        digest_size=16,
+    ).hexdigest()
+    entry = directory / f"{key}.lcc"
+
+    try:
+        with phase("cache", path):
+            with open(entry, "rb") as f:
+                stored_digest, dynamic, obj = pickle.load(f)
+        if stored_digest == digest:
+            os.utime(entry)
+            return obj, dynamic
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+        pass
+
+    with phase("parse", path, len(text)):
+        obj = loads(text)
+    # context-free special values are resolved before caching, and the others
+    # are only resolved again on load if there are any
+    resolver = SpecialValueResolver(static_only=True)
+    resolver.resolve(obj)
+    dynamic = resolver.dynamic_seen or not isinstance(obj, (dict, list))
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((digest, dynamic, obj), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, entry)
+        _evict(directory, cache_max_bytes())
+    except (OSError, pickle.PicklingError):
+        pass
+    return obj, dynamic
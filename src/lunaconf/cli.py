@@ -1,14 +1,358 @@
 import argparse
+import functools
 import json
+import os
+import shlex
+import sys
+import threading
 from collections.abc import Sequence
 from typing import Any, Callable, Literal, TypeAlias, TypeVar
 
-import toml
-
+from lunaconf.cache import load_document
 from lunaconf.config_base import LunaConf
-from lunaconf.dump import lunaconf_dumps_json, lunaconf_dumps_toml
+from lunaconf.defaults import lunaconf_defaults
+from lunaconf.dump import lunaconf_dump_json, lunaconf_dump_toml
+from lunaconf.formats import detect_signature, get_format, loads_detect
+from lunaconf.overrides import lunaconf_overrides
+from lunaconf.profile import PROFILE_FLAG, ProfileReport, phase
+from lunaconf.schema import OverrideChecker
+from lunaconf.snapshot import lunaconf_load_snapshot, lunaconf_save_snapshot
+from lunaconf.special import _DEL_OBJ, SpecialValueResolver
+
+
+class _InvalidKey(str):
+    """A key that is neither a list index nor an identifier."""
+
+
+@functools.lru_cache(maxsize=65536)
+def _compile_key(key: str) -> int | str:
+    if key.isdigit():
+        return int(key)
+    if key.isidentifier():
+        return sys.intern(key)
+    return _InvalidKey(key)
+
+
+@functools.lru_cache(maxsize=65536)
+def _compile_path(key_str: str) -> tuple[int | str, ...]:
+    return tuple(_compile_key(s.strip()) for s in key_str.split("."))
+
+
+# Kinds of payload in a step of a `_PathTrie`
+_LEAF = 0  # a value to set (or `_DEL_OBJ`)
+_TRIE = 1  # a nested `_PathTrie`
+_DOC = 2  # a nested non-empty dict or list to merge, see `_merge_document`
+
+_Step: TypeAlias = tuple[int | str, Any, int]
+
+
+class _PathTrie:
+    """An ordered batch of overrides grouped by their common key prefixes.
+
+    Applying the trie gives exactly the same result as applying every
+    override one after the other from the root: a new override is only merged
+    into an earlier subtree when all steps in between operate on different
+    identifier keys, which always commute.
+    """
+
+    __slots__ = ("steps", "_last", "_barrier")
+
+    def __init__(self) -> None:
+        self.steps: list[_Step] = []
+        # key -> position of the latest step on this key
+        self._last: dict[str, int] = {}
+        # position of the latest step that is not on an identifier key
+        self._barrier = -1
+
+    def _child(self, seg: int | str) -> "_PathTrie":
+        steps = self.steps
+        if type(seg) is str:
+            pos = self._last.get(seg, -1)
+            if pos > self._barrier and steps[pos][2] == _TRIE:
+                return steps[pos][1]
+        elif type(seg) is int:
+            if steps and steps[-1][0] == seg and steps[-1][2] == _TRIE:
+                return steps[-1][1]
+        child = _PathTrie()
+        self._append((seg, child, _TRIE))
+        return child
+
+    def _append(self, step: _Step) -> None:
+        seg = step[0]
+        if type(seg) is str:
+            self._last[seg] = len(self.steps)
+        else:
+            self._barrier = len(self.steps)
+        self.steps.append(step)
+
+    def insert(self, path: Sequence[int | str], value: Any) -> None:
+        node = self
+        for seg in path[:-1]:
+            node = node._child(seg)
+        node._append((path[-1], value, _LEAF))
+
+
+# Gaps up to this size are padded right away, larger ones are kept sparse
+_PAD_GAP = 64
+_DEFAULT_MAX_LIST_GAP = 1_000_000
+
+
+def max_list_gap() -> int:
+    """How far past the end of a list an index may be written.
+
+    Set through `LUNACONF_MAX_LIST_GAP`, so that a mistyped index fails
+    before the list is padded up to it.
+    """
+    try:
+        return int(os.environ.get("LUNACONF_MAX_LIST_GAP", _DEFAULT_MAX_LIST_GAP))
+    except ValueError:
+        return _DEFAULT_MAX_LIST_GAP
+
+
+class _Sparse:
+    """The writes set aside past the end of a list, in `tail`.
+
+    The list behaves as if padded with `None` up to `size`; `materialize`
+    pads it in place. The list itself stays a plain list, and sparse writes
+    only exist while overrides are merged, see `_settle_sparse`.
+    """
+
+    __slots__ = ("items", "tail", "size")
+
+    def __init__(self, items: list[Any]) -> None:
+        self.items = items
+        self.tail: dict[int, Any] = {}
+        self.size = len(items)
+
+    def delete(self, index: int) -> None:
+        if index < len(self.items):
+            del self.items[index]
+        else:
+            self.tail.pop(index, None)
+        self.tail = {k - 1 if k > index else k: v for k, v in self.tail.items()}
+        self.size -= 1
+
+    def materialize(self) -> None:
+        items = self.items
+        if self.size > len(items):
+            items.extend([None] * (self.size - len(items)))
+            for k, v in self.tail.items():
+                items[k] = v
+        self.tail = {}
+
+
+class _SparseLists(threading.local):
+    def __init__(self) -> None:
+        # id of a list -> its sparse writes, for the merges of this thread
+        self.lists: dict[int, _Sparse] = {}
+
+
+_sparse = _SparseLists()
+
+
+def _settle_sparse() -> None:
+    """Materialize the sparse lists created by the merges of this thread."""
+    pending = _sparse.lists
+    if pending:
+        _sparse.lists = {}
+        for sparse in pending.values():
+            sparse.materialize()
+
+
+def _materialize(now: list[Any]) -> None:
+    sparse = _sparse.lists.pop(id(now), None)
+    if sparse is not None:
+        sparse.materialize()
+
+
+def _apply_sparse(now: list[Any], seg: int, payload: Any, kind: int) -> Any:
+    """`_apply_step` for an index past the end of `now` or a sparse `now`."""
+    sparse = _sparse.lists.get(id(now))
+    size = len(now) if sparse is None else sparse.size
+    if kind == _LEAF and payload is _DEL_OBJ:
+        if sparse is not None and seg < size:
+            sparse.delete(seg)
+        return now
+    if seg < len(now):
+        now[seg] = payload if kind == _LEAF else _apply_child(now[seg], payload, kind)
+        return now
+    gap = seg - size
+    if gap > 0:
+        limit = max_list_gap()
+        if gap > limit:
+            raise ValueError(
+                f"List index {seg} is {gap} past the end of a list of length "
+                f"{size}; at most {limit} are allowed (see LUNACONF_MAX_LIST_GAP)"
+            )
+    if sparse is None and gap <= _PAD_GAP:
+        now.extend([None] * (seg - len(now) + 1))
+        now[seg] = payload if kind == _LEAF else _apply_child(None, payload, kind)
+        return now
+    if sparse is None:
+        sparse = _sparse.lists[id(now)] = _Sparse(now)
+    if kind == _LEAF:
+        sparse.tail[seg] = payload
+    else:
+        sparse.tail[seg] = _apply_child(sparse.tail.get(seg), payload, kind)
+    sparse.size = max(size, seg + 1)
+    return now
+
+
+def _apply_step(now: Any, seg: int | str, payload: Any, kind: int) -> Any:
+    if type(seg) is int:
+        if not isinstance(now, list):
+            now = []
+        if seg >= len(now) or id(now) in _sparse.lists:
+            return _apply_sparse(now, seg, payload, kind)
+        if kind == _LEAF and payload is _DEL_OBJ:
+            del now[seg]
+            return now
+        if kind == _LEAF:
+            now[seg] = payload
+        else:
+            now[seg] = _apply_child(now[seg], payload, kind)
+    elif type(seg) is str:
+        if not isinstance(now, dict):
+            now = {}
+        if kind == _LEAF:
+            if payload is _DEL_OBJ:
+                now.pop(seg, None)
+            else:
+                now[seg] = payload
+        else:
+            now[seg] = _apply_child(now.get(seg), payload, kind)
+    else:
+        raise TypeError(f"Cannot set value for key '{seg}' in {type(now)}")
+    return now
+
+
+def _apply_child(now: Any, payload: Any, kind: int) -> Any:
+    if kind == _TRIE:
+        for seg, sub, sub_kind in payload.steps:
+            now = _apply_step(now, seg, sub, sub_kind)
+        return now
+    obj, blocked = payload
+    return _merge_document(now, obj, blocked)
+
+
+def _prepare_document(
+    obj: dict[str, Any] | list[Any],
+    resolver: SpecialValueResolver | None,
+) -> set[int]:
+    """Resolve the special values of a document and analyze it for merging.
+
+    Returns the containers that cannot be adopted as they are: those that
+    hold (maybe deep inside) a `<del>` or a key that is not an identifier,
+    since merging them into nothing does not simply reproduce them, and those
+    the document reaches more than once (e.g. through YAML anchors), which
+    must not end up shared in the configuration.
+    """
+    blocked: set[int] = set()
+    seen: set[int] = set()
+    shared: set[int] = set()
+    # post-order traversal: a container is visited again once its children
+    # have been resolved and decided
+    stack: list[tuple[Any, bool]] = [(obj, False)]
+    while stack:
+        cur, visited = stack.pop()
+        items = cur.items() if isinstance(cur, dict) else enumerate(cur)
+        if visited:
+            if isinstance(cur, dict) and any(
+                type(_compile_key(k)) is not str for k in cur
+            ):
+                blocked.add(id(cur))
+                continue
+            for _, v in items:
+                if v is _DEL_OBJ or (isinstance(v, (dict, list)) and id(v) in blocked):
+                    blocked.add(id(cur))
+                    break
+            continue
+        stack.append((cur, True))
+        for k, v in items:
+            if isinstance(v, str):
+                if resolver is not None and v.startswith("<"):
+                    r = resolver.resolve_scalar(v)
+                    if r is not v:
+                        cur[k] = r
+            elif isinstance(v, (dict, list)):
+                if id(v) in seen:
+                    shared.add(id(v))
+                else:
+                    seen.add(id(v))
+                    stack.append((v, False))
+    if shared:
+        _block_shared(obj, shared, blocked)
+    return blocked
+
+
+def _block_shared(obj: Any, shared: set[int], blocked: set[int]) -> None:
+    """Block the `shared` containers, everything in them and above them."""
+    done: set[int] = set()
+    stack: list[tuple[Any, bool, bool]] = [(obj, False, False)]
+    while stack:
+        cur, visited, inside = stack.pop()
+        children = cur.values() if isinstance(cur, dict) else cur
+        if visited:
+            if inside or any(
+                isinstance(v, (dict, list)) and (id(v) in blocked or id(v) in shared)
+                for v in children
+            ):
+                blocked.add(id(cur))
+            continue
+        if id(cur) in done:
+            continue
+        done.add(id(cur))
+        inside = inside or id(cur) in shared
+        stack.append((cur, True, inside))
+        for v in children:
+            if isinstance(v, (dict, list)):
+                stack.append((v, False, inside))
+
+
+def _doc_step(v: Any, blocked: set[int]) -> tuple[Any, int]:
+    if isinstance(v, (dict, list)):
+        if len(v) > 0:
+            return (v, blocked), _DOC
+        if id(v) in blocked:
+            return type(v)(), _LEAF
+    return v, _LEAF
+
+
+def _merge_document(
+    now: Any,
+    obj: dict[str, Any] | list[Any],
+    blocked: set[int],
+) -> Any:
+    """Merge a parsed document into `now`, subtree by subtree.
+
+    The result is the same as setting every leaf of `obj` one by one, but a
+    subtree that has nothing to be merged with is adopted as a whole, and a
+    list of plain values is written in bulk.
+    """
+    if isinstance(obj, dict):
+        if not isinstance(now, dict) and id(obj) not in blocked:
+            return obj
+        for k, v in obj.items():
+            now = _apply_step(now, _compile_key(k), *_doc_step(v, blocked))
+    else:
+        if isinstance(now, list):
+            _materialize(now)
+        if id(obj) not in blocked:
+            if not isinstance(now, list):
+                return obj
+            if not any(isinstance(v, (dict, list)) for v in obj):
+                now[: len(obj)] = obj
+                return now
+        for i, v in enumerate(obj):
+            now = _apply_step(now, i, *_doc_step(v, blocked))
+    return now
+
 
-_DEL_OBJ = object()
+def _apply_root(config_dict: dict[str, Any], trie: _PathTrie) -> None:
+    # Every override starts again from `config_dict`, so a step that would
+    # replace the root container (e.g. a list index) has no effect.
+    for seg, payload, kind in trie.steps:
+        _apply_step(config_dict, seg, payload, kind)
 
 
 def adjust_conf(
@@ -18,95 +362,23 @@ def adjust_conf(
 ) -> list[Any] | dict[str, Any]:
     if len(keys) == 0:
         raise ValueError("Keys cannot be empty")
-    key = keys[0]
-    if len(keys) == 1:
-        if key.isdigit():
-            if now is None or not isinstance(now, list):
-                now = []
-            index = int(key)
-            if value is _DEL_OBJ:
-                if index < len(now):
-                    del now[index]
-            else:
-                if index >= len(now):
-                    # fill with None
-                    now.extend([None] * (index - len(now) + 1))
-                now[index] = value
-        elif key.isidentifier():
-            if now is None or not isinstance(now, dict):
-                now = {}
-            if value is _DEL_OBJ:
-                if key in now:
-                    del now[key]
-            else:
-                now[key] = value
-        else:
-            raise TypeError(f"Cannot set value for key '{key}' in {type(now)}")
-    else:
-        if key.isdigit():
-            if now is None or not isinstance(now, list):
-                now = []
-            index = int(key)
-            if index >= len(now):
-                # fill with None
-                now.extend([None] * (index - len(now) + 1))
-            now[index] = adjust_conf(now[index], keys[1:], value)
-        elif key.isidentifier():
-            if now is None or not isinstance(now, dict):
-                now = {}
-            if key not in now:
-                now[key] = None
-            now[key] = adjust_conf(now[key], keys[1:], value)
-        else:
-            raise TypeError(f"Cannot set value for key '{key}' in {type(now)}")
-    return now
+    trie = _PathTrie()
+    trie.insert([_compile_key(key) for key in keys], value)
+    try:
+        res = _apply_child(now, trie, _TRIE)
+    finally:
+        _settle_sparse()
+    return res
 
 
 def _handle_special_values(obj: Any) -> Any:
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            obj[k] = _handle_special_values(v)
-    elif isinstance(obj, list):
-        for i, v in enumerate(obj):
-            obj[i] = _handle_special_values(v)
-    elif isinstance(obj, str):
-        match obj.lower():
-            case "<null>":
-                return None
-            case "<del>":
-                return _DEL_OBJ
-            case "<inf>":
-                return float("inf")
-            case "<-inf>":
-                return float("-inf")
-            case "<nan>":
-                return float("nan")
-        objl = obj.lower()
-        if objl.startswith("<env:") and objl.endswith(">"):
-            env_var = obj[5:-1]
-            import os
-
-            res = os.getenv(env_var)
-            if res is None:
-                raise ValueError(f"Environment variable '{env_var}' is not set")
-            return res
-        if objl.startswith("<envint:") and objl.endswith(">"):
-            env_var = obj[8:-1]
-            import os
-
-            res = os.getenv(env_var)
-            if res is None:
-                raise ValueError(f"Environment variable '{env_var}' is not set")
-            try:
-                return int(res)
-            except ValueError as e:
-                raise ValueError(
-                    f"Environment variable '{env_var}' cannot be converted to int"
-                ) from e
-    return obj
+    return SpecialValueResolver().resolve(obj)
 
 
-def _parse_command_value(value_str: str) -> Any:
+def _parse_command_value(
+    value_str: str,
+    resolver: SpecialValueResolver | None = None,
+) -> Any:
     def parse_inner(value_str: str) -> Any:
         try:
             return json.loads(value_str)
@@ -121,77 +393,95 @@ def _parse_command_value(value_str: str) -> Any:
                 pass
         return value_str
 
-    return _handle_special_values(parse_inner(value_str))
+    if resolver is None:
+        resolver = SpecialValueResolver()
+    return resolver.resolve(parse_inner(value_str))
 
 
-def adjust_conf_command(config_dict: dict[str, Any], cmdline: str) -> None:
+def _compile_command(
+    trie: _PathTrie,
+    cmdline: str,
+    resolver: SpecialValueResolver | None = None,
+    checker: OverrideChecker | None = None,
+) -> None:
     for cmd in (s.strip() for s in cmdline.split(";")):
         if cmd.count("=") != 1:
             raise ValueError(f"Invalid command format: {cmd}")
         key_str, value_str = (s.strip() for s in cmd.split("="))
-        keys = [s.strip() for s in key_str.split(".")]
 
-        value = _parse_command_value(value_str)
+        value = _parse_command_value(value_str, resolver)
+        path = _compile_path(key_str)
+        if checker is not None:
+            value = checker.check_path(path, value)
 
-        adjust_conf(config_dict, keys, value)
+        trie.insert(path, value)
 
 
-def adjust_conf_command_file(config_dict: dict[str, Any], filepath: str) -> None:
-    args: list[str] = []
+def adjust_conf_command(config_dict: dict[str, Any], cmdline: str) -> None:
+    trie = _PathTrie()
+    _compile_command(trie, cmdline)
+    try:
+        _apply_root(config_dict, trie)
+    finally:
+        _settle_sparse()
 
-    with open(filepath) as f:
-        lines = f.readlines()
 
-    for line in lines:
-        line = line.split("#", maxsplit=1)[0].strip()
-        if not line:
-            continue
-        if line.startswith("-"):
-            args.extend(line.split(maxsplit=1))
-        else:
-            args.append(line)
-    lunaconf_gendict(config_dict, args)
+def adjust_conf_command_file(
+    config_dict: dict[str, Any],
+    filepath: str,
+    *,
+    use_cache: bool = True,
+    checker: OverrideChecker | None = None,
+) -> None:
+    _apply_commands(
+        config_dict,
+        [("command-file", filepath)],
+        use_cache=use_cache,
+        checker=checker,
+    )
 
 
 def adjust_conf_multilevel_data_structure(
     config_dict: dict[str, Any],
     obj: dict[str, Any] | list[Any],
     prefix: list[str] | None = None,
+    *,
+    resolve_special: bool = True,
+    resolver: SpecialValueResolver | None = None,
 ) -> None:
-    def adjust_inner(
-        config_dict: dict[str, Any],
-        obj: dict[str, Any] | list[Any],
-        prefix: list[str] | None = None,
-    ) -> None:
-        if prefix is None:
-            prefix = []
-        if isinstance(obj, dict):
-            if len(obj) == 0:
-                adjust_conf(config_dict, prefix, {})
-            else:
-                for k, v in obj.items():
-                    prefix.append(k)
-                    if isinstance(v, (dict, list)):
-                        adjust_inner(config_dict, v, prefix)
-                    else:
-                        adjust_conf(config_dict, prefix, v)
-                    prefix.pop()
-        elif isinstance(obj, list):
-            if len(obj) == 0:
-                adjust_conf(config_dict, prefix, [])
-            else:
-                for i, v in enumerate(obj):
-                    prefix.append(str(i))
-                    if isinstance(v, (dict, list)):
-                        adjust_inner(config_dict, v, prefix)
-                    else:
-                        adjust_conf(config_dict, prefix, v)
-                    prefix.pop()
-        else:
-            raise TypeError(f"Expected dict or list but got {type(obj)}")
-
-    obj = _handle_special_values(obj)
-    adjust_inner(config_dict, obj, prefix)
+    """Merge the parsed document `obj` into `config_dict`.
+
+    Containers of `obj` may be adopted by `config_dict` as they are, so `obj`
+    should not be used afterwards.
+    """
+    if not isinstance(obj, (dict, list)):
+        raise TypeError(f"Expected dict or list but got {type(obj)}")
+    if not resolve_special:
+        resolver = None
+    elif resolver is None:
+        resolver = SpecialValueResolver()
+
+    trie = _PathTrie()
+    if len(obj) == 0:
+        if not prefix:
+            raise ValueError("Keys cannot be empty")
+        trie.insert([_compile_key(key) for key in prefix], obj)
+    elif prefix:
+        node = trie
+        for key in prefix[:-1]:
+            node = node._child(_compile_key(key))
+        seg = _compile_key(prefix[-1])
+        node._append((seg, (obj, _prepare_document(obj, resolver)), _DOC))
+    else:
+        blocked = _prepare_document(obj, resolver)
+        items = obj.items() if isinstance(obj, dict) else enumerate(obj)
+        for k, v in items:
+            seg = _compile_key(k) if isinstance(k, str) else k
+            trie._append((seg, *_doc_step(v, blocked)))
+    try:
+        _apply_root(config_dict, trie)
+    finally:
+        _settle_sparse()
 
 
 _AvaliTag: TypeAlias = Literal[
@@ -206,6 +496,8 @@ _AvaliTag: TypeAlias = Literal[
 ]
 
 
+# The action classes are created once per tag, not for every parser
+@functools.cache
 def _extend_action_with_tag(tag: _AvaliTag) -> type[argparse.Action]:
     class ExtendActionWithTag(argparse._ExtendAction):
         def __call__(self, parser, namespace, values, option_string=None):
@@ -215,6 +507,7 @@ def _extend_action_with_tag(tag: _AvaliTag) -> type[argparse.Action]:
     return ExtendActionWithTag
 
 
+@functools.cache
 def _append_action_with_tag(tag: _AvaliTag) -> type[argparse.Action]:
     class AppendActionWithTag(argparse._AppendAction):
         def __call__(self, parser, namespace, values, option_string=None):
@@ -227,15 +520,9 @@ def _append_action_with_tag(tag: _AvaliTag) -> type[argparse.Action]:
 T = TypeVar("T", bound=LunaConf)
 
 
-def lunaconf_gendict(
-    config_dict: dict[str, Any],
-    args: Sequence[str] | None = None,
-    *,
-    parser: argparse.ArgumentParser | None = None,
-) -> argparse.Namespace:
-    if parser is None:
-        parser = argparse.ArgumentParser()
-
+def _add_gendict_arguments(
+    parser: argparse.ArgumentParser, no_cache: bool = True
+) -> None:
     parser.add_argument(
         "command",
         type=str,
@@ -299,45 +586,252 @@ def lunaconf_gendict(
         action=_append_action_with_tag("detect-file"),
         help="Detect the format of the file and parse it accordingly",
     )
+    if no_cache:
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Do not use the on-disk parse cache enabled by LUNACONF_CACHE_DIR",
+        )
+
+
+@functools.cache
+def _command_file_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="-C")
+    _add_gendict_arguments(parser)
+    return parser
+
+
+@functools.cache
+def _gendict_parser() -> argparse.ArgumentParser:
+    """The parser of `lunaconf_gendict` when no parser is given."""
+    parser = argparse.ArgumentParser()
+    _add_gendict_arguments(parser)
+    return parser
+
 
-    argspace = parser.parse_args(args)
+# Command files parsed so far: absolute path -> (mtime, size, commands, no-cache)
+_COMMAND_FILES: dict[str, tuple[int, int, list[tuple[_AvaliTag, str]], bool]] = {}
+_COMMAND_FILES_MAX = 1024
+
+
+def _read_command_file(path: str) -> tuple[list[tuple[_AvaliTag, str]], bool]:
+    """The tagged commands in a command file, and whether it has --no-cache.
+
+    Files are only read and parsed again when their mtime or size changes.
+    """
+    st = os.stat(path)
+    entry = _COMMAND_FILES.get(path)
+    if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+        return entry[2], entry[3]
+
+    args: list[str] = []
+    with phase("read", path) as p:
+        with open(path) as f:
+            lines = f.readlines()
+        p.size = sum(map(len, lines))
+    for line in lines:
+        line = line.split("#", maxsplit=1)[0].strip()
+        if not line:
+            continue
+        if line.startswith("-"):
+            args.extend(line.split(maxsplit=1))
+        else:
+            args.append(line)
+    with phase("argparse", path):
+        argspace = _command_file_parser().parse_args(args)
     command: list[tuple[_AvaliTag, str]] = argspace.command or []
 
-    for tag, arg in command:
+    if len(_COMMAND_FILES) >= _COMMAND_FILES_MAX:
+        _COMMAND_FILES.clear()
+    _COMMAND_FILES[path] = (st.st_mtime_ns, st.st_size, command, argspace.no_cache)
+    return command, argspace.no_cache
+
+
+def _expand_command_files(
+    command: list[tuple[_AvaliTag, str]],
+    use_cache: bool,
+    included: set[str] | None = None,
+) -> list[tuple[_AvaliTag, str, bool]]:
+    """Replace every `-C` by the commands in its file, recursively.
+
+    Each entry of the result also tells whether its file may be loaded from
+    the parse cache. A file included several times is only expanded once.
+    The paths of the command files are added to `included`.
+    """
+    expanded: dict[tuple[str, bool], list[tuple[_AvaliTag, str, bool]]] = {}
+    including: list[str] = []
+
+    def expand(
+        command: list[tuple[_AvaliTag, str]], use_cache: bool
+    ) -> list[tuple[_AvaliTag, str, bool]]:
+        res: list[tuple[_AvaliTag, str, bool]] = []
+        for tag, arg in command:
+            if tag != "command-file":
+                res.append((tag, arg, use_cache))
+                continue
+            path = os.path.realpath(arg)
+            if included is not None:
+                included.add(path)
+            if path in including:
+                chain = including[including.index(path) :] + [path]
+                raise ValueError(
+                    f"Command files include each other: {' -> '.join(chain)}"
+                )
+            key = (path, use_cache)
+            sub = expanded.get(key)
+            if sub is None:
+                sub_command, no_cache = _read_command_file(path)
+                including.append(path)
+                sub = expand(sub_command, use_cache and not no_cache)
+                including.pop()
+                expanded[key] = sub
+            res.extend(sub)
+        return res
+
+    return expand(command, use_cache)
+
+
+def _merge_checked(
+    config_dict: dict[str, Any],
+    d: Any,
+    resolver: SpecialValueResolver,
+    checker: OverrideChecker | None,
+    resolve_special: bool = True,
+) -> None:
+    if checker is not None and isinstance(d, (dict, list)):
+        # the checks need the final values
+        if resolve_special:
+            with phase("special"):
+                resolver.resolve(d)
+            resolve_special = False
+        with phase("check"):
+            d = checker.check_document(d)
+    with phase("merge"):
+        adjust_conf_multilevel_data_structure(
+            config_dict, d, resolve_special=resolve_special, resolver=resolver
+        )
+
+
+def _load_file(tag: _AvaliTag, path: str, use_cache: bool) -> tuple[Any, bool]:
+    """Load the document of a `-J/-T/-D` argument, see `load_document`."""
+    if tag == "detect-file":
+        return load_document(
+            path,
+            f"detect:{detect_signature()}",
+            functools.partial(loads_detect, path=path),
+            use_cache=use_cache,
+        )
+    fmt = tag.removesuffix("-file")
+    return load_document(path, fmt, get_format(fmt).loads, use_cache=use_cache)
+
+
+def _apply_commands(
+    config_dict: dict[str, Any],
+    command: list[tuple[_AvaliTag, str]],
+    *,
+    use_cache: bool = True,
+    checker: OverrideChecker | None = None,
+) -> None:
+    # the included command files are spliced in, so that consecutive commands
+    # are applied as one batch even across files
+    entries = _expand_command_files(command, use_cache)
+    _apply_entries(config_dict, entries, checker=checker)
+
+
+def _apply_entries(
+    config_dict: dict[str, Any],
+    entries: list[tuple[_AvaliTag, str, bool]],
+    *,
+    checker: OverrideChecker | None = None,
+    load_file: Callable[[_AvaliTag, str, bool], tuple[Any, bool]] = _load_file,
+) -> None:
+    try:
+        _apply_entries_sparse(config_dict, entries, checker, load_file)
+    finally:
+        # writes far past the end of lists are only padded now
+        _settle_sparse()
+
+
+def _apply_entries_sparse(
+    config_dict: dict[str, Any],
+    entries: list[tuple[_AvaliTag, str, bool]],
+    checker: OverrideChecker | None,
+    load_file: Callable[[_AvaliTag, str, bool], tuple[Any, bool]],
+) -> None:
+    resolver = SpecialValueResolver()
+    pending: _PathTrie | None = None
+    for i, (tag, arg, use_cache) in enumerate(entries):
         match tag:
             case "command":
-                adjust_conf_command(config_dict, arg)
-            case "command-file":
-                adjust_conf_command_file(config_dict, arg)
-            case "json" | "json-file":
-                if tag == "json-file":
-                    with open(arg) as f:
-                        arg = f.read()
-                d = json.loads(arg)
-                adjust_conf_multilevel_data_structure(config_dict, d)
-            case "toml" | "toml-file":
-                if tag == "toml-file":
-                    with open(arg) as f:
-                        arg = f.read()
-                d = toml.loads(arg)
-                adjust_conf_multilevel_data_structure(config_dict, d)
-            case "detect" | "detect-file":
-                if tag == "detect-file":
-                    with open(arg) as f:
-                        arg = f.read()
-                try:
-                    d = json.loads(arg)
-                except (TypeError, json.JSONDecodeError):
-                    try:
-                        d = toml.loads(arg)
-                    except toml.TomlDecodeError:
-                        raise ValueError("Cannot detect the format of the string")
-                adjust_conf_multilevel_data_structure(config_dict, d)
+                if pending is None:
+                    pending = _PathTrie()
+                with phase("compile", count=arg.count(";") + 1):
+                    _compile_command(pending, arg, resolver, checker)
+                if i + 1 == len(entries) or entries[i + 1][0] != "command":
+                    with phase("merge", count=len(pending.steps)):
+                        _apply_root(config_dict, pending)
+                    pending = None
+            case "json" | "toml":
+                with phase("parse", size=len(arg)):
+                    d = get_format(tag).loads(arg)
+                _merge_checked(config_dict, d, resolver, checker)
+            case "detect":
+                with phase("parse", size=len(arg)):
+                    d = loads_detect(arg)
+                _merge_checked(config_dict, d, resolver, checker)
+            case "json-file" | "toml-file" | "detect-file":
+                d, dynamic = load_file(tag, arg, use_cache)
+                _merge_checked(config_dict, d, resolver, checker, dynamic)
             case _:
                 raise ValueError(f"Unknown tag: {tag}")
+
+
+def _gendict(
+    config_dict: dict[str, Any],
+    args: Sequence[str] | None,
+    *,
+    parser: argparse.ArgumentParser | None = None,
+    use_cache: bool = True,
+    checker: OverrideChecker | None = None,
+) -> argparse.Namespace:
+    own_parser = parser is None
+    if parser is None:
+        parser = _gendict_parser()
+    else:
+        # `--no-cache` is left out, as the caller may have an option of
+        # that name already
+        _add_gendict_arguments(parser, no_cache=False)
+
+    with phase("argparse"):
+        argspace = parser.parse_args(args)
+    _apply_commands(
+        config_dict,
+        argspace.command or [],
+        use_cache=use_cache and not (own_parser and argspace.no_cache),
+        checker=checker,
+    )
     return argspace
 
 
+def lunaconf_gendict(
+    config_dict: dict[str, Any],
+    args: Sequence[str] | None = None,
+    *,
+    parser: argparse.ArgumentParser | None = None,
+    use_cache: bool = True,
+    cls: type[LunaConf] | None = None,
+) -> argparse.Namespace:
+    """Apply the overrides in `args` to `config_dict`.
+
+    With `cls`, every override is validated against the type of the field it
+    sets as soon as it is parsed, and paths that `cls` forbids are rejected.
+    """
+    checker = None if cls is None else OverrideChecker(cls)
+    return _gendict(
+        config_dict, args, parser=parser, use_cache=use_cache, checker=checker
+    )
+
+
 def lunaconf_cli(
     cls: type[T],
     args: Sequence[str] | None = None,
@@ -346,6 +840,39 @@ def lunaconf_cli(
     description: str = "Generate configuration",
     post_action_with_all: Callable[[T], None] = lambda _: None,
     post_action_without_all: Callable[[T], None] = lambda _: None,
+) -> T:
+    # checked before parsing, so that argparse itself is profiled too
+    if PROFILE_FLAG not in (sys.argv[1:] if args is None else args):
+        return _lunaconf_cli(
+            cls,
+            args,
+            init_from_defaults,
+            description,
+            post_action_with_all,
+            post_action_without_all,
+        )
+    report = ProfileReport()
+    report.start()
+    try:
+        return _lunaconf_cli(
+            cls,
+            args,
+            init_from_defaults,
+            description,
+            post_action_with_all,
+            post_action_without_all,
+        )
+    finally:
+        report.finish(sys.stderr)
+
+
+def _lunaconf_cli(
+    cls: type[T],
+    args: Sequence[str] | None,
+    init_from_defaults: bool,
+    description: str,
+    post_action_with_all: Callable[[T], None],
+    post_action_without_all: Callable[[T], None],
 ) -> T:
     parser = argparse.ArgumentParser(description=description)
     parser.add_argument(
@@ -372,19 +899,54 @@ def lunaconf_cli(
         action="store_true",
         help="Print the generated configuration in TOML format and exit",
     )
+    parser.add_argument(
+        "--print-overrides",
+        action="store_true",
+        help="Print the shortest overrides that reproduce the generated configuration and exit",
+    )
+    parser.add_argument(
+        "-S",
+        "--save-snapshot",
+        type=str,
+        help="Save the generated configuration as a binary snapshot",
+    )
+    parser.add_argument(
+        "-L",
+        "--load-snapshot",
+        type=str,
+        help="Start from the configuration in a binary snapshot, not the defaults",
+    )
+    parser.add_argument(
+        PROFILE_FLAG,
+        action="store_true",
+        help="Print the time spent in each phase of the resolution to stderr",
+    )
+    _add_gendict_arguments(parser)
+    with phase("argparse"):
+        argspace = parser.parse_args(args)
+    command: list[tuple[_AvaliTag, str]] = argspace.command or []
+
+    config: T | None = None
     config_dict: dict[str, Any]
-    if init_from_defaults:
-        config_dict = cls.__lunaconf_default__().model_dump()
+    if argspace.load_snapshot is not None:
+        config = lunaconf_load_snapshot(cls, argspace.load_snapshot)
+        config_dict = config.model_dump() if command else {}
+    elif init_from_defaults:
+        with phase("defaults"):
+            config_dict = lunaconf_defaults(cls).seed()
     else:
         config_dict = {}
 
-    argspace = lunaconf_gendict(
-        config_dict,
-        args,
-        parser=parser,
-    )
+    if config is None or command:
+        checker = OverrideChecker(cls)
+        _apply_commands(
+            config_dict, command, use_cache=not argspace.no_cache, checker=checker
+        )
+        with phase("validate"):
+            config = checker.validate(config_dict)
 
-    config = cls.model_validate(config_dict)
+    if argspace.save_snapshot is not None:
+        lunaconf_save_snapshot(config, argspace.save_snapshot)
 
     if argspace.all:
         post_action_with_all(config)
@@ -392,20 +954,25 @@ def lunaconf_cli(
         post_action_without_all(config)
 
     if argspace.print_json:
-        print(
-            lunaconf_dumps_json(
-                config,
-                indent=argspace.json_indent,
-                exclude_defaults=not argspace.all,
-            )
+        lunaconf_dump_json(
+            config,
+            sys.stdout,
+            indent=argspace.json_indent,
+            exclude_defaults=not argspace.all,
         )
+        print()
         exit(0)
     elif argspace.print_toml:
-        print(
-            lunaconf_dumps_toml(
-                config,
-                exclude_defaults=not argspace.all,
-            )
+        lunaconf_dump_toml(
+            config,
+            sys.stdout,
+            exclude_defaults=not argspace.all,
         )
+        print()
+        exit(0)
+    elif argspace.print_overrides:
+        # relative to what this program starts from
+        base = None if init_from_defaults else {}
+        print(shlex.join(lunaconf_overrides(config, base)))
         exit(0)
     return config
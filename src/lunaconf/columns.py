@@ -0,0 +1,212 @@
+import array
+import csv
+import functools
+import io
+import json
+import sys
+from collections.abc import Iterable, Iterator, Sequence
+from typing import IO, Any, NamedTuple
+
+from pydantic_core import to_jsonable_python
+
+from lunaconf.config_base import LunaConf
+from lunaconf.dump import _BufferedWriter, _json_key, _write_json
+from lunaconf.profile import phase
+
+_SCALARS = frozenset([str, int, float, bool, type(None)])
+_INT64 = (-(2**63), 2**63 - 1)
+
+
+class LunaColumn(NamedTuple):
+    """A column of `lunaconf_to_columns`.
+
+    `values` is an `array.array` (`"q"` for integers, `"d"` for floats, `"b"`
+    for booleans) or a NumPy array when NumPy is installed, and a list for
+    anything else. `mask` is true where a configuration has no value, i.e.
+    the path is missing or the value is `None`; those entries of numeric
+    columns hold `0` (or NaN for floats).
+    """
+
+    values: Any
+    mask: Any
+
+
+@functools.cache
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _flatten(
+    obj: dict[Any, Any],
+    prefix: str,
+    row: dict[str, Any],
+    paths: dict[str, dict[str, str]],
+) -> None:
+    names = paths.get(prefix)
+    if names is None:
+        names = paths[prefix] = {}
+    for k, v in obj.items():
+        path = names.get(k)
+        if path is None:
+            name = _json_key(k)
+            path = sys.intern(f"{prefix}.{name}" if prefix else name)
+            if type(k) is str:
+                names[k] = path
+        if type(v) is dict:
+            _flatten(v, path, row, paths)
+        elif type(v) in _SCALARS:
+            row[path] = v
+        else:
+            # lists, enums, dates, ... as in a JSON dump
+            row[path] = to_jsonable_python(v)
+
+
+def _rows(configs: Iterable[LunaConf]) -> Iterator[dict[str, Any]]:
+    """The configurations flattened into dotted paths, one at a time."""
+    cls: type[LunaConf] | None = None
+    # prefix -> key -> interned path, shared by all rows
+    paths: dict[str, dict[str, str]] = {}
+    for config in configs:
+        if cls is None:
+            cls = type(config)
+        elif type(config) is not cls:
+            raise TypeError(
+                f"Expected configurations of {cls.__name__} but got "
+                f"{type(config).__name__}"
+            )
+        row: dict[str, Any] = {}
+        # dumping is done by pydantic-core, faster than walking the model
+        _flatten(config.model_dump(), "", row, paths)
+        yield row
+
+
+def _column(n: int, rows: list[int], values: list[Any]) -> LunaColumn:
+    types = {type(v) for v in values}
+    types.discard(type(None))
+    if types == {bool}:
+        kind, fill = "b", False
+    elif types == {int} and all(
+        _INT64[0] <= v <= _INT64[1] for v in values if v is not None
+    ):
+        kind, fill = "q", 0
+    elif types and types <= {int, float}:
+        kind, fill = "d", float("nan")
+    else:
+        kind, fill = "", None
+
+    if len(rows) == n and None not in values:
+        filled, mask = values, [False] * n
+    else:
+        filled, mask = [fill] * n, [True] * n
+        for r, v in zip(rows, values):
+            if v is not None:
+                filled[r] = v
+                mask[r] = False
+    np = _numpy()
+    if np is not None:
+        dtype = {"b": np.bool_, "q": np.int64, "d": np.float64}.get(kind)
+        if dtype is not None:
+            filled = np.array(filled, dtype=dtype)
+        return LunaColumn(filled, np.array(mask, dtype=np.bool_))
+    if kind:
+        filled = array.array(kind, filled)
+    return LunaColumn(filled, array.array("b", mask))
+
+
+def lunaconf_to_columns(configs: Iterable[LunaConf]) -> dict[str, LunaColumn]:
+    """Flatten configurations of one class into columns, e.g. for pandas.
+
+    Submodels and dicts are flattened into dotted paths (`opt.lr`), which are
+    interned; other values, such as lists, are kept whole as in a JSON dump.
+    Columns are in the order their paths are first met, and a path that only
+    some configurations have is masked in the others.
+    """
+    # path -> (row indices, values), so that sparse paths stay cheap
+    found: dict[str, tuple[list[int], list[Any]]] = {}
+    n = 0
+    for n, row in enumerate(_rows(configs), 1):
+        for path, v in row.items():
+            col = found.get(path)
+            if col is None:
+                col = found[path] = ([], [])
+            col[0].append(n - 1)
+            col[1].append(v)
+    return {path: _column(n, rows, values) for path, (rows, values) in found.items()}
+
+
+def _json_value(v: Any) -> str:
+    """`v` as JSON, encoded as by `lunaconf_dump_json`."""
+    try:
+        return json.dumps(v, ensure_ascii=False, allow_nan=False)
+    except ValueError:
+        # NaN and infinities, written as special values
+        buf = io.StringIO()
+        w = _BufferedWriter(buf)
+        _write_json(w, v, None, 0, (False, False, False))
+        w.flush()
+        return buf.getvalue()
+
+
+def lunaconf_dump_csv(
+    configs: Iterable[LunaConf],
+    fp: IO[str],
+    columns: Sequence[str] | None = None,
+) -> int:
+    """Write configurations of one class to `fp` as CSV, one row each.
+
+    Rows are flattened as by `lunaconf_to_columns` and written as they come,
+    so `configs` may be a generator of any length. The header is `columns`,
+    or the paths of the first configuration; a later configuration with a
+    path outside of it raises a `ValueError`. Missing values are left empty,
+    lists and dicts are written as JSON. Returns the number of rows.
+    """
+    with phase("dump") as p:
+        w = _BufferedWriter(fp)
+        writer = csv.writer(w, lineterminator="\n")
+        n = 0
+        header: dict[str, int] | None = None
+        if columns is not None:
+            header = {path: i for i, path in enumerate(columns)}
+            writer.writerow(columns)
+        for n, row in enumerate(_rows(configs), 1):
+            if header is None:
+                header = {path: i for i, path in enumerate(row)}
+                writer.writerow(row)
+            cells: list[Any] = [""] * len(header)
+            for path, v in row.items():
+                i = header.get(path)
+                if i is None:
+                    raise ValueError(
+                        f"Configuration {n - 1} has the path '{path}', which is "
+                        "not a column; pass all paths as `columns`"
+                    )
+                if v is None:
+                    v = ""
+                elif type(v) is list or type(v) is dict:
+                    v = _json_value(v)
+                cells[i] = v
+            writer.writerow(cells)
+        w.flush()
+        p.size = w.total
+    return n
+
+
+def lunaconf_dump_jsonl(configs: Iterable[LunaConf], fp: IO[str]) -> int:
+    """Write configurations to `fp` as JSON lines, one flattened object each.
+
+    Rows are flattened as by `lunaconf_to_columns` and written as they come;
+    values are encoded as by `lunaconf_dump_json`. Returns the number of rows.
+    """
+    with phase("dump") as p:
+        w = _BufferedWriter(fp)
+        n = 0
+        for n, row in enumerate(_rows(configs), 1):
+            w.write(_json_value(row))
+            w.write("\n")
+        w.flush()
+        p.size = w.total
+    return n
@@ -1,3 +1,4 @@
+from collections.abc import Sequence
 from typing import Self
 
 from pydantic import BaseModel
@@ -9,3 +10,13 @@ class LunaConf(BaseModel):
     @classmethod
     def __lunaconf_default__(cls) -> Self:
         return cls()
+
+    def lunaconf_apply(self, args: Sequence[str]) -> Self:
+        """Return a copy with the `key=value` overrides in `args` applied.
+
+        Only the submodels along the overridden paths are validated again, and
+        the others are shared with `self`.
+        """
+        from lunaconf.delta import lunaconf_apply
+
+        return lunaconf_apply(self, args)
@@ -0,0 +1,118 @@
+import math
+import pickle
+import weakref
+from typing import Any
+
+from lunaconf.config_base import LunaConf
+
+
+class LunaDefaults:
+    """The default configuration of a class, built once and shared.
+
+    `instance` and `dump` are shared by every user of the cache and must not
+    be modified; `seed()` returns a fresh copy of `dump` to build on.
+    """
+
+    __slots__ = ("instance", "dump", "_blob", "__weakref__")
+
+    def __init__(self, cls: type[LunaConf]) -> None:
+        self.instance = cls.__lunaconf_default__()
+        self.dump: dict[str, Any] = self.instance.model_dump()
+        try:
+            # unpickling a flat buffer is as fast as dumping the cached
+            # instance again, and gives a copy independent of both
+            self._blob: bytes | None = pickle.dumps(
+                self.dump, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        except (pickle.PicklingError, AttributeError, TypeError):
+            self._blob = None
+
+    def seed(self) -> dict[str, Any]:
+        """A fresh dumped default configuration, free to be modified."""
+        if self._blob is None:
+            return self.instance.model_dump()
+        return pickle.loads(self._blob)
+
+    def diff(self, dump: dict[str, Any]) -> dict[str, Any]:
+        """The entries of a dumped configuration that differ from `dump`.
+
+        Nested dicts are compared key by key, other values as a whole. Keys
+        of the defaults missing from `dump` are reported as `"<del>"`, so the
+        result can be applied as a document on top of the defaults.
+        """
+        return _diff(self.dump, dump)
+
+
+def _same(a: Any, b: Any) -> bool:
+    if a is b:
+        return True
+    if isinstance(a, float) and isinstance(b, float):
+        return a == b or (math.isnan(a) and math.isnan(b))
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(_same, a, b))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(v, b[k]) for k, v in a.items())
+    return a == b
+
+
+def _diff(base: dict[Any, Any], new: dict[Any, Any]) -> dict[Any, Any]:
+    res: dict[Any, Any] = {}
+    for k, v in new.items():
+        if k not in base:
+            res[k] = v
+            continue
+        b = base[k]
+        if isinstance(v, dict) and isinstance(b, dict):
+            sub = _diff(b, v)
+            if sub:
+                res[k] = sub
+        elif not _same(b, v):
+            res[k] = v
+    for k in base:
+        if k not in new:
+            res[k] = "<del>"
+    return res
+
+
+_DEFAULTS: "weakref.WeakKeyDictionary[type, LunaDefaults]" = weakref.WeakKeyDictionary()
+_FIELD_DEFAULTS: "weakref.WeakKeyDictionary[type, dict[str, Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def lunaconf_defaults(cls: type[LunaConf]) -> LunaDefaults:
+    """The cached default configuration of `cls`.
+
+    It is built from `cls.__lunaconf_default__()` on first use; call
+    `lunaconf_invalidate_defaults` after changing what that returns.
+    """
+    res = _DEFAULTS.get(cls)
+    if res is None:
+        res = LunaDefaults(cls)
+        _DEFAULTS[cls] = res
+    return res
+
+
+def field_defaults(cls: type[Any]) -> dict[str, Any]:
+    """The defaults that `exclude_defaults` compares the fields of `cls` to."""
+    res = _FIELD_DEFAULTS.get(cls)
+    if res is None:
+        res = {
+            name: field.get_default(call_default_factory=True)
+            for name, field in cls.model_fields.items()
+            if not field.is_required()
+        }
+        _FIELD_DEFAULTS[cls] = res
+    return res
+
+
+def lunaconf_invalidate_defaults(cls: type[Any] | None = None) -> None:
+    """Drop the cached defaults of `cls`, or of every class if `None`."""
+    if cls is None:
+        _DEFAULTS.clear()
+        _FIELD_DEFAULTS.clear()
+    else:
+        _DEFAULTS.pop(cls, None)
+        _FIELD_DEFAULTS.pop(cls, None)
@@ -0,0 +1,148 @@
+import copy
+from collections.abc import Sequence
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+
+from lunaconf.cli import (
+    _TRIE,
+    _apply_step,
+    _compile_command,
+    _PathTrie,
+    _settle_sparse,
+    _Step,
+)
+from lunaconf.config_base import LunaConf
+from lunaconf.schema import _RAW_MODES, OverrideChecker
+from lunaconf.special import SpecialValueResolver
+
+T = TypeVar("T", bound=LunaConf)
+M = TypeVar("M", bound=BaseModel)
+
+_MISSING = object()
+
+
+def _reuses_instances(cls: type[BaseModel]) -> bool:
+    """Whether validated values can be fed back to `cls` as they are.
+
+    Validators that see the raw input may not expect already validated
+    values, and models that revalidate instances gain nothing from sharing.
+    """
+    decorators = cls.__pydantic_decorators__
+    for d in decorators.model_validators.values():
+        if d.info.mode in _RAW_MODES:
+            return False
+    for d in decorators.field_validators.values():
+        if d.info.mode in _RAW_MODES:
+            return False
+    if cls.model_config.get("revalidate_instances", "never") != "never":
+        return False
+    return all(
+        field.validation_alias is None or isinstance(field.validation_alias, str)
+        for field in cls.model_fields.values()
+    )
+
+
+def _dump_field(model: BaseModel, name: str) -> Any:
+    dumped = model.model_dump(include={name})
+    if name in dumped:
+        return dumped[name]
+    # excluded from dumps
+    return copy.deepcopy(getattr(model, name))
+
+
+def _rebuild_items(value: Any, steps: list[_Step]) -> Any:
+    """Apply `steps` to a list or dict of models, sharing untouched items.
+
+    Returns `_MISSING` if a step does more than reach into an existing model.
+    """
+    if isinstance(value, list):
+        keys_ok = all(type(seg) is int and seg < len(value) for seg, _, _ in steps)
+    elif isinstance(value, dict):
+        keys_ok = all(type(seg) is str and seg in value for seg, _, _ in steps)
+    else:
+        return _MISSING
+    if not keys_ok or not all(
+        kind == _TRIE and isinstance(value[seg], BaseModel) for seg, _, kind in steps
+    ):
+        return _MISSING
+    res = value.copy()
+    for seg, payload, _ in steps:
+        res[seg] = _rebuild(res[seg], payload.steps)
+    return res
+
+
+def _rebuild(model: M, steps: list[_Step], root: bool = False) -> M:
+    cls = type(model)
+    fields = cls.model_fields
+    if not _reuses_instances(cls) or not all(
+        type(seg) is str and seg in fields for seg, _, _ in steps
+    ):
+        # rebuild this model from its dump, like the CLI would
+        holder: Any = model.model_dump()
+        for step in steps:
+            res = _apply_step(holder, *step)
+            if not root:
+                # the root is never replaced, see `_apply_root`
+                holder = res
+        _settle_sparse()
+        return cls.model_validate(holder)
+
+    # steps on different fields commute, so they can be grouped by field
+    by_field: dict[str, list[_Step]] = {}
+    for step in steps:
+        by_field.setdefault(step[0], []).append(step)
+
+    updates: dict[str, Any] = {}
+    for name, field_steps in by_field.items():
+        new = _MISSING
+        if len(field_steps) == 1 and field_steps[0][2] == _TRIE:
+            cur = getattr(model, name)
+            sub = field_steps[0][1].steps
+            if isinstance(cur, BaseModel):
+                new = _rebuild(cur, sub)
+            else:
+                new = _rebuild_items(cur, sub)
+        if new is _MISSING:
+            holder = {name: _dump_field(model, name)}
+            for step in field_steps:
+                _apply_step(holder, *step)
+            _settle_sparse()
+            new = holder.get(name, _MISSING)
+        updates[name] = new
+
+    data: dict[str, Any] = {}
+    for name, field in fields.items():
+        value = updates.get(name, _MISSING)
+        if value is _MISSING:
+            if name in updates:
+                # deleted, so back to the default
+                continue
+            value = getattr(model, name)
+        data[field.validation_alias or field.alias or name] = value
+    if model.__pydantic_extra__:
+        data.update(model.__pydantic_extra__)
+    res = cls.model_validate(data)
+    # `data` holds every field, but only those set before or now count as set
+    fields_set = model.model_fields_set | {
+        name for name, value in updates.items() if value is not _MISSING
+    }
+    fields_set -= {name for name, value in updates.items() if value is _MISSING}
+    object.__setattr__(res, "__pydantic_fields_set__", fields_set)
+    return res
+
+
+def lunaconf_apply(config: T, args: Sequence[str]) -> T:
+    """Return a copy of `config` with the overrides in `args` applied.
+
+    Only the models along the overridden paths are validated again; every
+    untouched submodel is shared with `config`.
+    """
+    trie = _PathTrie()
+    resolver = SpecialValueResolver()
+    checker = OverrideChecker(type(config))
+    for cmdline in args:
+        _compile_command(trie, cmdline, resolver, checker)
+    if not trie.steps:
+        return config
+    return _rebuild(config, trie.steps, root=True)
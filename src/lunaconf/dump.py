@@ -1,10 +1,19 @@
+import datetime
+import itertools
 import json
 import math
-from typing import Any
+import re
+import weakref
+from collections.abc import Iterator
+from typing import IO, Any
 
-import toml
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
 
 from lunaconf.config_base import LunaConf
+from lunaconf.defaults import field_defaults
+from lunaconf.formats import dumps_format
+from lunaconf.profile import phase
 
 
 def _handle_special_values_dump_json(obj: dict[str, Any] | list[Any]) -> None:
@@ -39,14 +48,12 @@ def lunaconf_dumps_json(
     indent: int = 2,
     **kwargs,
 ) -> str:
-    dump_dict = config.model_dump(**kwargs)
-    _handle_special_values_dump_json(dump_dict)
-    return json.dumps(
-        dump_dict,
-        indent=indent,
-        ensure_ascii=False,
-        allow_nan=False,
-    )
+    with phase("dump") as p:
+        dump_dict = config.model_dump(**kwargs)
+        _handle_special_values_dump_json(dump_dict)
+        res = dumps_format("json", dump_dict, indent=indent)
+        p.size = len(res)
+    return res
 
 
 def _handle_special_values_dump_toml(obj: dict[str, Any] | list[Any]) -> None:
@@ -70,6 +77,337 @@ def lunaconf_dumps_toml(
     config: LunaConf,
     **kwargs,
 ) -> str:
-    dump_dict = config.model_dump(**kwargs)
-    _handle_special_values_dump_toml(dump_dict)
-    return toml.dumps(dump_dict)
+    with phase("dump") as p:
+        dump_dict = config.model_dump(**kwargs)
+        _handle_special_values_dump_toml(dump_dict)
+        res = dumps_format("toml", dump_dict)
+        p.size = len(res)
+    return res
+
+
+# Options of `model_dump` that the streaming writers implement themselves
+_STREAM_OPTIONS = frozenset(["exclude_defaults", "exclude_none", "exclude_unset"])
+_FLUSH_SIZE = 1 << 16
+
+
+class _BufferedWriter:
+    __slots__ = ("fp", "parts", "size", "total", "written")
+
+    def __init__(self, fp: IO[str]) -> None:
+        self.fp = fp
+        self.parts: list[str] = []
+        self.size = 0
+        self.total = 0
+        self.written = False
+
+    def write(self, s: str) -> None:
+        self.written = True
+        self.parts.append(s)
+        self.size += len(s)
+        if self.size >= _FLUSH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        self.fp.write("".join(self.parts))
+        self.parts.clear()
+        self.total += self.size
+        self.size = 0
+
+
+def _stream_options(kwargs: dict[str, Any]) -> tuple[bool, bool, bool]:
+    return (
+        bool(kwargs.get("exclude_defaults", False)),
+        bool(kwargs.get("exclude_none", False)),
+        bool(kwargs.get("exclude_unset", False)),
+    )
+
+
+_FIELDS: "weakref.WeakKeyDictionary[type, tuple[str, ...] | None]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _field_names(cls: type[BaseModel]) -> tuple[str, ...] | None:
+    """The fields of `cls` that are dumped, or `None` if pydantic has to."""
+    if cls in _FIELDS:
+        return _FIELDS[cls]
+    decorators = cls.__pydantic_decorators__
+    names: tuple[str, ...] | None = None
+    if not (
+        decorators.field_serializers
+        or decorators.model_serializers
+        or any(getattr(f, "exclude_if", None) for f in cls.model_fields.values())
+    ):
+        names = tuple(
+            name for name, field in cls.model_fields.items() if not field.exclude
+        )
+    _FIELDS[cls] = names
+    return names
+
+
+def _iter_items(
+    obj: BaseModel | dict[Any, Any],
+    exclude_defaults: bool,
+    exclude_none: bool,
+    exclude_unset: bool,
+) -> Iterator[tuple[Any, Any]]:
+    """Iterate over what `model_dump` would output for `obj`, without copies."""
+    if isinstance(obj, dict):
+        yield from obj.items()
+        return
+    cls = type(obj)
+    names = _field_names(cls)
+    if names is None:
+        # custom serialization is left to pydantic
+        yield from obj.model_dump(
+            exclude_defaults=exclude_defaults,
+            exclude_none=exclude_none,
+            exclude_unset=exclude_unset,
+        ).items()
+        return
+    fields_set = obj.model_fields_set
+    defaults = field_defaults(cls) if exclude_defaults else {}
+    for name in names:
+        if exclude_unset and name not in fields_set:
+            continue
+        value = getattr(obj, name)
+        if exclude_none and value is None:
+            continue
+        if name in defaults and value == defaults[name]:
+            continue
+        yield name, value
+    if obj.__pydantic_extra__:
+        # extras have no default and always count as set
+        for name, value in obj.__pydantic_extra__.items():
+            if not (exclude_none and value is None):
+                yield name, value
+    for name in cls.model_computed_fields:
+        value = getattr(obj, name)
+        if not (exclude_none and value is None):
+            yield name, value
+
+
+def _json_key(k: Any) -> str:
+    if isinstance(k, str):
+        return k
+    if isinstance(k, (bool, int, float)) or k is None:
+        return json.dumps(k)
+    return str(to_jsonable_python(k))
+
+
+def _write_json(
+    w: _BufferedWriter,
+    v: Any,
+    indent: int | None,
+    level: int,
+    opts: tuple[bool, bool, bool],
+) -> None:
+    if v is None:
+        w.write("null")
+    elif v is True:
+        w.write("true")
+    elif v is False:
+        w.write("false")
+    elif isinstance(v, str):
+        w.write(json.dumps(v, ensure_ascii=False))
+    elif isinstance(v, int):
+        w.write(int.__repr__(v))
+    elif isinstance(v, float):
+        if math.isnan(v):
+            w.write('"<nan>"')
+        elif v == math.inf:
+            w.write('"<inf>"')
+        elif v == -math.inf:
+            w.write('"<-inf>"')
+        else:
+            w.write(float.__repr__(v))
+    elif isinstance(v, (BaseModel, dict)):
+        items = _iter_items(v, *opts)
+        first = next(items, None)
+        if first is None:
+            w.write("{}")
+            return
+        if indent is None:
+            sep, end = ", ", "}"
+            w.write("{")
+        else:
+            sep = ",\n" + " " * (indent * (level + 1))
+            end = "\n" + " " * (indent * level) + "}"
+            w.write("{" + sep[1:])
+        for i, (k, item) in enumerate(itertools.chain((first,), items)):
+            if i:
+                w.write(sep)
+            w.write(json.dumps(_json_key(k), ensure_ascii=False))
+            w.write(": ")
+            _write_json(w, item, indent, level + 1, opts)
+        w.write(end)
+    elif isinstance(v, (list, tuple, set, frozenset)):
+        if len(v) == 0:
+            w.write("[]")
+            return
+        if indent is None:
+            sep, end = ", ", "]"
+            w.write("[")
+        else:
+            sep = ",\n" + " " * (indent * (level + 1))
+            end = "\n" + " " * (indent * level) + "]"
+            w.write("[" + sep[1:])
+        for i, item in enumerate(v):
+            if i:
+                w.write(sep)
+            _write_json(w, item, indent, level + 1, opts)
+        w.write(end)
+    else:
+        _write_json(w, to_jsonable_python(v), indent, level, opts)
+
+
+def lunaconf_dump_json(
+    config: LunaConf,
+    fp: IO[str],
+    indent: int | None = 2,
+    **kwargs,
+) -> None:
+    """Write `config` as JSON to `fp`, like `lunaconf_dumps_json`.
+
+    The output is encoded while walking the model, without building a dumped
+    copy of it first.
+    """
+    with phase("dump") as p:
+        w = _BufferedWriter(fp)
+        if kwargs.keys() <= _STREAM_OPTIONS:
+            _write_json(w, config, indent, 0, _stream_options(kwargs))
+        else:
+            dumped = config.model_dump(**kwargs)
+            _write_json(w, dumped, indent, 0, _stream_options({}))
+        w.flush()
+        p.size = w.total
+
+
+_TOML_BARE_KEY = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def _toml_key(k: Any) -> str:
+    k = _json_key(k)
+    if _TOML_BARE_KEY.fullmatch(k):
+        return k
+    return _toml_str(k)
+
+
+def _toml_str(s: str) -> str:
+    return json.dumps(s, ensure_ascii=False).replace("\x7f", "\\u007f")
+
+
+def _is_table(v: Any) -> bool:
+    return isinstance(v, (BaseModel, dict))
+
+
+def _is_array_of_tables(v: Any) -> bool:
+    return (
+        isinstance(v, (list, tuple))
+        and len(v) > 0
+        and all(isinstance(item, (BaseModel, dict)) for item in v)
+    )
+
+
+def _toml_value(v: Any, opts: tuple[bool, bool, bool]) -> Iterator[str]:
+    if v is None:
+        yield '"<null>"'
+    elif v is True:
+        yield "true"
+    elif v is False:
+        yield "false"
+    elif isinstance(v, str):
+        yield _toml_str(v)
+    elif isinstance(v, int):
+        yield int.__repr__(v)
+    elif isinstance(v, float):
+        # `repr` gives `inf`, `-inf` and `nan`, which TOML supports
+        yield float.__repr__(v)
+    elif isinstance(v, datetime.datetime):
+        yield v.isoformat().replace("+00:00", "Z")
+    elif isinstance(v, (datetime.date, datetime.time)):
+        yield v.isoformat()
+    elif isinstance(v, (BaseModel, dict)):
+        yield "{ "
+        for i, (k, item) in enumerate(_iter_items(v, *opts)):
+            if i:
+                yield ", "
+            yield _toml_key(k)
+            yield " = "
+            yield from _toml_value(item, opts)
+        yield " }"
+    elif isinstance(v, (list, tuple, set, frozenset)):
+        yield "["
+        for item in v:
+            yield " "
+            yield from _toml_value(item, opts)
+            yield ","
+        yield "]"
+    else:
+        yield from _toml_value(to_jsonable_python(v), opts)
+
+
+def _write_toml_header(w: _BufferedWriter, header: str) -> None:
+    w.write(f"\n{header}\n" if w.written else f"{header}\n")
+
+
+def _write_toml_table(
+    w: _BufferedWriter,
+    path: str,
+    table: BaseModel | dict[Any, Any],
+    opts: tuple[bool, bool, bool],
+    array_element: bool = False,
+) -> None:
+    subtables: list[tuple[str, Any]] = []
+    arrays: list[tuple[str, Any]] = []
+    # the root has no header, and an array element always needs one
+    need_header = bool(path) and not array_element
+    if array_element:
+        _write_toml_header(w, f"[[{path}]]")
+    for k, v in _iter_items(table, *opts):
+        key = _toml_key(k)
+        if _is_table(v):
+            subtables.append((key, v))
+        elif _is_array_of_tables(v):
+            arrays.append((key, v))
+        else:
+            if need_header:
+                _write_toml_header(w, f"[{path}]")
+                need_header = False
+            w.write(key)
+            w.write(" = ")
+            for part in _toml_value(v, opts):
+                w.write(part)
+            w.write("\n")
+    if need_header and not subtables and not arrays:
+        # an empty table is still written so that it exists
+        _write_toml_header(w, f"[{path}]")
+
+    prefix = f"{path}." if path else ""
+    for key, array in arrays:
+        for item in array:
+            _write_toml_table(w, prefix + key, item, opts, array_element=True)
+    for key, sub in subtables:
+        _write_toml_table(w, prefix + key, sub, opts)
+
+
+def lunaconf_dump_toml(
+    config: LunaConf,
+    fp: IO[str],
+    **kwargs,
+) -> None:
+    """Write `config` as TOML to `fp`, like `lunaconf_dumps_toml`.
+
+    The output is encoded while walking the model, without building a dumped
+    copy of it first. It parses to the same document, but is not the same
+    text: subtables are written depth-first right after their parent table.
+    """
+    with phase("dump") as p:
+        w = _BufferedWriter(fp)
+        if kwargs.keys() <= _STREAM_OPTIONS:
+            _write_toml_table(w, "", config, _stream_options(kwargs))
+        else:
+            dumped = config.model_dump(**kwargs)
+            _write_toml_table(w, "", dumped, _stream_options({}))
+        w.flush()
+        p.size = w.total
@@ -0,0 +1,165 @@
+import enum
+import hashlib
+import weakref
+from typing import Any
+
+from pydantic import BaseModel
+
+from lunaconf.defaults import _same, field_defaults
+
+# Bumped whenever the encoding below changes, so that fingerprints of
+# different versions never compare equal.
+_VERSION = 1
+
+_FIELDS: "weakref.WeakKeyDictionary[type, tuple[str, ...]]" = (
+    weakref.WeakKeyDictionary()
+)
+# (id of a frozen model, exclude_defaults) -> (weak reference, digest)
+_MEMO: dict[tuple[int, bool], tuple["weakref.ref[BaseModel]", bytes]] = {}
+
+
+def _field_names(cls: type[BaseModel]) -> tuple[str, ...]:
+    names = _FIELDS.get(cls)
+    if names is None:
+        names = tuple(
+            sorted(
+                name for name, field in cls.model_fields.items() if not field.exclude
+            )
+        )
+        _FIELDS[cls] = names
+    return names
+
+
+def _encode(v: Any, parts: list[str], exclude_defaults: bool) -> bool:
+    """Append the canonical encoding of `v` to `parts`.
+
+    Returns whether `v` is immutable, i.e. whether its encoding can be
+    remembered.
+    """
+    t = type(v)
+    if t is str:
+        parts.append(f"s{len(v)}:")
+        parts.append(v)
+    elif t is int:
+        parts.append(f"i{v};")
+    elif t is float:
+        if v != v:
+            parts.append("fnan;")
+        elif v == 0:
+            # 0.0 == -0.0
+            parts.append("f0;")
+        else:
+            parts.append(f"f{v!r};")
+    elif t is bool:
+        parts.append("T" if v else "F")
+    elif v is None:
+        parts.append("N")
+    elif isinstance(v, BaseModel):
+        digest, immutable = _model_digest(v, exclude_defaults)
+        parts.append(f"m{digest.hex()};")
+        return immutable
+    elif t is list or t is tuple:
+        parts.append("[" if t is list else "(")
+        immutable = t is tuple
+        for item in v:
+            immutable &= _encode(item, parts, exclude_defaults)
+        parts.append("]" if t is list else ")")
+        return immutable
+    elif isinstance(v, dict):
+        # sorted by the encoding of the keys, so that the order does not count
+        items = []
+        for key, value in v.items():
+            key_parts: list[str] = []
+            _encode(key, key_parts, exclude_defaults)
+            items.append(("".join(key_parts), value))
+        items.sort(key=lambda item: item[0])
+        parts.append("{")
+        for key_str, value in items:
+            parts.append(key_str)
+            _encode(value, parts, exclude_defaults)
+        parts.append("}")
+        return False
+    elif isinstance(v, (set, frozenset)):
+        encoded = []
+        immutable = isinstance(v, frozenset)
+        for item in v:
+            item_parts: list[str] = []
+            immutable &= _encode(item, item_parts, exclude_defaults)
+            encoded.append("".join(item_parts))
+        parts.append("<")
+        parts.extend(sorted(encoded))
+        parts.append(">")
+        return immutable
+    elif isinstance(v, enum.Enum):
+        parts.append("e")
+        return _encode(v.value, parts, exclude_defaults)
+    elif isinstance(v, (bytes, bytearray)):
+        parts.append(f"b{v.hex()};")
+        return t is bytes
+    elif isinstance(v, (int, float, str)):
+        # subclasses encode like their base type
+        base = int if isinstance(v, int) else float if isinstance(v, float) else str
+        return _encode(base(v), parts, exclude_defaults)
+    else:
+        from pydantic_core import to_jsonable_python
+
+        parts.append("j")
+        _encode(to_jsonable_python(v), parts, exclude_defaults)
+        return False
+    return True
+
+
+def _model_digest(model: BaseModel, exclude_defaults: bool) -> tuple[bytes, bool]:
+    """The digest of one node of the Merkle tree, and whether it is final."""
+    cls = type(model)
+    frozen = bool(cls.model_config.get("frozen", False))
+    if frozen:
+        key = (id(model), exclude_defaults)
+        hit = _MEMO.get(key)
+        if hit is not None and hit[0]() is model:
+            return hit[1], True
+
+    parts = [f"{cls.__qualname__}("]
+    immutable = frozen
+    decorators = cls.__pydantic_decorators__
+    if decorators.field_serializers or decorators.model_serializers:
+        # custom serialization decides what the fields are, as for dumps
+        values = model.model_dump(exclude_defaults=exclude_defaults)
+        _encode(values, parts, exclude_defaults)
+        immutable = False
+    else:
+        defaults = field_defaults(cls) if exclude_defaults else {}
+        values = model.__dict__
+        for name in _field_names(cls):
+            value = values[name]
+            if name in defaults and _same(value, defaults[name]):
+                continue
+            parts.append(f"{name}=")
+            immutable &= _encode(value, parts, exclude_defaults)
+        if model.__pydantic_extra__:
+            parts.append("+")
+            immutable &= _encode(model.__pydantic_extra__, parts, exclude_defaults)
+    parts.append(")")
+    digest = hashlib.sha256("".join(parts).encode("utf-8", "surrogatepass")).digest()
+
+    if immutable:
+        _MEMO[key] = (
+            weakref.ref(model, lambda _, key=key: _MEMO.pop(key, None)),
+            digest,
+        )
+    return digest, immutable
+
+
+def lunaconf_fingerprint(config: BaseModel, *, exclude_defaults: bool = False) -> str:
+    """A stable hash of the values of a configuration.
+
+    Equal configurations give equal fingerprints, whatever the order of dict
+    keys, and NaNs are equal to each other. Every submodel is hashed on its
+    own and only its digest enters its parent; the digests of frozen
+    submodels holding only immutable values are remembered, so configurations
+    sharing them (e.g. from `lunaconf_apply`) only hash what differs. With
+    `exclude_defaults`, fields at their default value are left out, so adding
+    a field with a default keeps the fingerprints of existing configurations.
+    """
+    digest, _ = _model_digest(config, exclude_defaults)
+    return f"v{_VERSION}:{digest.hex()}"
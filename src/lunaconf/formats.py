@@ -0,0 +1,262 @@
+import functools
+import json
+import logging
+import os
+import re
+from collections.abc import Iterable
+from typing import Any, Callable, NamedTuple
+
+
+class LunaFormat(NamedTuple):
+    """A configuration format that can be used with `-d/-D` and the dumpers."""
+
+    name: str
+    loads: Callable[[str], Any]
+    dumps: Callable[..., str] | None
+    extensions: tuple[str, ...]
+    decode_errors: tuple[type[Exception], ...]
+    detect: bool
+    # Given the beginning of a document (without leading whitespace), tells
+    # whether it certainly is in this format.
+    sniff: Callable[[str], bool] | None = None
+
+
+logger = logging.getLogger("lunaconf")
+
+# The number of characters `-d/-D` looks at to decide on the format
+SNIFF_PREFIX = 4096
+
+_FORMATS: dict[str, LunaFormat] = {}
+_EXTENSIONS: dict[str, str] = {}
+
+
+def lunaconf_register_format(
+    name: str,
+    loads: Callable[[str], Any],
+    dumps: Callable[..., str] | None = None,
+    *,
+    extensions: Iterable[str] = (),
+    decode_errors: Iterable[type[Exception]] = (ValueError,),
+    detect: bool = True,
+    sniff: Callable[[str], bool] | None = None,
+) -> LunaFormat:
+    """Register (or replace) a configuration format.
+
+    `loads` parses a string into a dict or list and raises one of
+    `decode_errors` for malformed input. Formats with `detect` set take part
+    in the detection of `-d/-D`: the format whose `sniff` recognizes the
+    beginning of the document is tried first, then the one matching the file
+    extension, then the others in registration order.
+    """
+    fmt = LunaFormat(
+        name=name,
+        loads=loads,
+        dumps=dumps,
+        extensions=tuple(f".{e.lower().lstrip('.')}" for e in extensions),
+        decode_errors=tuple(decode_errors),
+        detect=detect,
+        sniff=sniff,
+    )
+    old = _FORMATS.pop(name, None)
+    if old is not None:
+        for ext in old.extensions:
+            if _EXTENSIONS.get(ext) == name:
+                del _EXTENSIONS[ext]
+    _FORMATS[name] = fmt
+    for ext in fmt.extensions:
+        _EXTENSIONS[ext] = name
+    return fmt
+
+
+def get_format(name: str) -> LunaFormat:
+    try:
+        return _FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown format: {name}") from None
+
+
+def dumps_format(name: str, obj: Any, **kwargs) -> str:
+    fmt = get_format(name)
+    if fmt.dumps is None:
+        raise ValueError(f"Format '{name}' does not support dumping")
+    return fmt.dumps(obj, **kwargs)
+
+
+def format_for_path(path: str) -> LunaFormat | None:
+    name = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    return None if name is None else _FORMATS[name]
+
+
+def sniff_format(s: str, path: str | None = None) -> tuple[LunaFormat | None, str]:
+    """Guess the format of a document without parsing it.
+
+    Returns the format (or `None` if the guess is ambiguous) and the reason
+    for the guess.
+    """
+    formats = [fmt for fmt in _FORMATS.values() if fmt.detect]
+    prefix = s[:SNIFF_PREFIX].lstrip()
+    claims = [fmt for fmt in formats if fmt.sniff and fmt.sniff(prefix)]
+    if len(claims) == 1:
+        return claims[0], "content"
+    if path is not None:
+        fmt = format_for_path(path)
+        if fmt is not None and fmt.detect:
+            return fmt, "extension"
+    return None, "ambiguous"
+
+
+def detect_formats(s: str, path: str | None = None) -> list[LunaFormat]:
+    """The formats to try for `-d/-D`, in order."""
+    formats = [fmt for fmt in _FORMATS.values() if fmt.detect]
+    preferred, reason = sniff_format(s, path)
+    if preferred is not None:
+        formats = [preferred] + [fmt for fmt in formats if fmt is not preferred]
+    logger.debug(
+        "Detecting the format of %s: trying %s (%s)",
+        path if path is not None else "string",
+        ", ".join(fmt.name for fmt in formats),
+        reason,
+    )
+    return formats
+
+
+def detect_signature() -> str:
+    """Identifies the current detection order, e.g. for cache keys."""
+    return ",".join(fmt.name for fmt in _FORMATS.values() if fmt.detect)
+
+
+def loads_detect(s: str, path: str | None = None) -> Any:
+    for fmt in detect_formats(s, path):
+        try:
+            d = fmt.loads(s)
+        except fmt.decode_errors:
+            continue
+        logger.debug(
+            "Parsed %s as %s", path if path is not None else "string", fmt.name
+        )
+        return d
+    raise ValueError("Cannot detect the format of the string")
+
+
+# orjson silently turns integers beyond 64 bits into floats
+_LONG_INT = re.compile(r"\d{19}")
+
+
+@functools.cache
+def _json_backend() -> Callable[[str], Any]:
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+
+    def loads(s: str) -> Any:
+        if _LONG_INT.search(s) is None:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                # orjson is stricter than `json` (e.g. NaN literals), so let
+                # `json` decide and report the error
+                pass
+        return json.loads(s)
+
+    return loads
+
+
+def _json_loads(s: str) -> Any:
+    return _json_backend()(s)
+
+
+def _json_dumps(obj: Any, indent: int | None = 2) -> str:
+    return json.dumps(obj, indent=indent, ensure_ascii=False, allow_nan=False)
+
+
+_JSON_LITERAL = re.compile(r"(?:true|false|null)(?![A-Za-z0-9_-])")
+_JSON_SCALAR = re.compile(r"\s*(?:-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null)\s*")
+_TOML_SIMPLE_KEY = r"""(?:[A-Za-z0-9_-]+|"(?:[^"\\\n]|\\.)*"|'[^'\n]*')"""
+# `key =`, `a.b =`, `"quoted key" =` etc.
+_TOML_KEY_VALUE = re.compile(
+    rf"{_TOML_SIMPLE_KEY}(?:[ \t]*\.[ \t]*{_TOML_SIMPLE_KEY})*[ \t]*="
+)
+# `[table]` or `[[array.of.tables]]`, on a line of its own
+_TOML_HEADER = re.compile(r"\[\[?([^\[\]\n]*)\]\]?[ \t]*(?:#.*)?$", re.M)
+_TOML_BARE_HEADER = re.compile(
+    r"[ \t]*[A-Za-z0-9_-]+(?:[ \t]*\.[ \t]*[A-Za-z0-9_-]+)*[ \t]*"
+)
+
+
+def _sniff_builtin(prefix: str) -> str | None:
+    """Tell JSON from TOML by the beginning of a document.
+
+    Returns `None` when the document may be valid in both formats, e.g.
+    `[1]` is a JSON array and a TOML table header.
+    """
+    if not prefix:
+        # an empty document is an empty TOML table, but no JSON
+        return "toml"
+    c = prefix[0]
+    if c == "{":
+        # TOML documents cannot start with an inline table
+        return "json"
+    if c == "#":
+        return "toml"
+    if c == "[":
+        m = _TOML_HEADER.match(prefix)
+        if m is None:
+            return "json"
+        inner = m.group(1)
+        if _JSON_SCALAR.fullmatch(inner) or '"' in inner:
+            return None
+        if _TOML_BARE_HEADER.fullmatch(inner) or "'" in inner:
+            return "toml"
+        return "json"
+    if _TOML_KEY_VALUE.match(prefix):
+        return "toml"
+    if c == '"' or c == "-" or c.isdigit() or _JSON_LITERAL.match(prefix):
+        return "json"
+    return None
+
+
+def _sniff_json(prefix: str) -> bool:
+    return _sniff_builtin(prefix) == "json"
+
+
+def _sniff_toml(prefix: str) -> bool:
+    return _sniff_builtin(prefix) == "toml"
+
+
+def _toml_loads(s: str) -> Any:
+    import tomllib
+
+    try:
+        return tomllib.loads(s)
+    except tomllib.TOMLDecodeError:
+        # `toml` accepts a few documents the stricter `tomllib` rejects
+        import toml
+
+        return toml.loads(s)
+
+
+def _toml_dumps(obj: Any) -> str:
+    import toml
+
+    return toml.dumps(obj)
+
+
+lunaconf_register_format(
+    "json",
+    _json_loads,
+    _json_dumps,
+    extensions=(".json",),
+    decode_errors=(TypeError, json.JSONDecodeError),
+    sniff=_sniff_json,
+)
+lunaconf_register_format(
+    "toml",
+    _toml_loads,
+    _toml_dumps,
+    extensions=(".toml",),
+    # both `tomllib.TOMLDecodeError` and `toml.TomlDecodeError` subclass
+    # `ValueError`, so the backends need not be imported up front
+    decode_errors=(ValueError,),
+    sniff=_sniff_toml,
+)
@@ -0,0 +1,314 @@
+import hashlib
+import itertools
+import json
+import math
+from typing import Any, Callable
+
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+from lunaconf.defaults import lunaconf_defaults
+from lunaconf.fingerprint import _encode
+from lunaconf.special import is_special
+
+# Lists whose differing middle parts pair up more elements than this are
+# edited position by position instead of by the cheapest alignment.
+_MAX_ALIGN = 4096
+
+_MISSING = object()
+_INF = float("inf")
+
+_Commands = list[str] | None  # `None` if the change cannot be written
+
+
+def _cost(commands: list[str]) -> int:
+    # as written on a command line, separated by spaces
+    return sum(len(c) + 1 for c in commands)
+
+
+def _addressable(key: Any) -> bool:
+    # digits would index a list instead, see `_compile_key`
+    return type(key) is str and key.isidentifier()
+
+
+def _json_str(s: str) -> str:
+    # `;` and `=` separate commands, so they are escaped even inside strings
+    return (
+        json.dumps(s, ensure_ascii=False)
+        .replace(";", "\\u003b")
+        .replace("=", "\\u003d")
+    )
+
+
+def _is_raw(s: str) -> bool:
+    """Whether `s` parses back to itself as the unquoted value of a command."""
+    if not s or s != s.strip() or ";" in s or "=" in s or is_special(s):
+        return False
+    if s[0] == "[" and s[-1] == "]":
+        return False
+    try:
+        json.loads(s)
+    except ValueError:
+        return True
+    return False
+
+
+class _Differ:
+    """Diffs two dumps, remembering the digest and JSON of every container.
+
+    Entries are keyed by `id` and keep their container alive, so that an id
+    is never reused while the differ exists.
+    """
+
+    def __init__(self) -> None:
+        self._digests: dict[int, tuple[Any, bytes]] = {}
+        self._values: dict[int, tuple[Any, str | None]] = {}
+
+    def digest(self, v: Any) -> bytes:
+        """Equal for equal values, as compared by `_same`."""
+        t = type(v)
+        # the same as `_encode` for the common scalars, only faster
+        if t is int:
+            return b"i%d;" % v
+        if t is str:
+            return b"s%d:" % len(v) + v.encode("utf-8", "surrogatepass")
+        if t is not dict and t is not list:
+            parts: list[str] = []
+            _encode(v, parts, False)
+            return "".join(parts).encode("utf-8", "surrogatepass")
+        hit = self._digests.get(id(v))
+        if hit is not None:
+            return hit[1]
+        if t is dict:
+            # independent of the order of the keys
+            items = sorted(self.digest(k) + self.digest(x) for k, x in v.items())
+            digest = b"{" + hashlib.sha256(b"".join(items)).digest()
+        else:
+            items = [self.digest(x) for x in v]
+            digest = b"[" + hashlib.sha256(b"".join(items)).digest()
+        self._digests[id(v)] = (v, digest)
+        return digest
+
+    def json(self, v: Any) -> str | None:
+        """`v` as JSON that parses back to it, `None` if there is none."""
+        t = type(v)
+        if t is str:
+            return None if is_special(v) else _json_str(v)
+        if t is int:
+            return str(v)
+        if t is float and math.isfinite(v):
+            return repr(v)
+        if v is None or t is bool or t is float:
+            return json.dumps(v)
+        if t is not dict and t is not list:
+            return self.json(to_jsonable_python(v))
+        hit = self._values.get(id(v))
+        if hit is not None:
+            return hit[1]
+        res: str | None
+        if t is dict and any(type(k) is not str for k in v):
+            res = self.json(to_jsonable_python(v))
+        elif t is dict:
+            parts = []
+            for k, x in v.items():
+                value = self.json(x)
+                if value is None:
+                    break
+                parts.append(f"{_json_str(k)}:{value}")
+            res = "{" + ",".join(parts) + "}" if len(parts) == len(v) else None
+        else:
+            values = [self.json(x) for x in v]
+            res = None if None in values else "[" + ",".join(values) + "]"
+        self._values[id(v)] = (v, res)
+        return res
+
+    def value(self, v: Any) -> str | None:
+        if type(v) is str and _is_raw(v):
+            return v
+        return self.json(v)
+
+    def diff(self, path: str, b: Any, n: Any) -> _Commands:
+        """The cheapest commands turning `b` at `path` into `n`."""
+        value = self.value(n)
+        # editing a container has to beat writing it whole
+        limit = _INF if value is None else len(path) + len(value) + 2
+        edits: _Commands = None
+        if type(b) is dict and type(n) is dict:
+            if all(map(_addressable, b)) and all(map(_addressable, n)):
+                edits = self.diff_dict(path, b, n, limit)
+        elif type(b) is list and type(n) is list:
+            edits = self.diff_list(path, b, n, limit)
+        if edits is not None or value is None:
+            return edits
+        return [f"{path}={value}"]
+
+    def diff_dict(
+        self, path: str, b: dict[str, Any], n: dict[str, Any], limit: float
+    ) -> _Commands:
+        """The edits of the keys that changed, if they cost less than `limit`."""
+        prefix = f"{path}." if path else ""
+        res: list[str] = []
+        cost = 0
+        for k, x in n.items():
+            old = b.get(k, _MISSING)
+            if old is _MISSING or self.digest(old) != self.digest(x):
+                sub = self.diff(prefix + k, old, x)
+                if sub is None:
+                    return None
+                res += sub
+                cost += _cost(sub)
+                if cost >= limit:
+                    return None
+        res += [f"{prefix}{k}=<del>" for k in b if k not in n]
+        return res if _cost(res) < limit else None
+
+    def diff_list(
+        self, path: str, b: list[Any], n: list[Any], limit: float
+    ) -> _Commands:
+        """Edits by deleting, setting and appending elements, as for dicts.
+
+        The kept elements of `b` end up at the start of the list in their
+        order, so only a common suffix of a list that does not grow can stay
+        in place; the rest is aligned with the cheapest edits.
+        """
+        hb = [self.digest(x) for x in b]
+        hn = [self.digest(x) for x in n]
+        lb, ln = len(b), len(n)
+        p = 0
+        while p < min(lb, ln) and hb[p] == hn[p]:
+            p += 1
+        s = 0
+        if ln <= lb:
+            while s < ln - p and hb[lb - 1 - s] == hn[ln - 1 - s]:
+                s += 1
+        m, q = lb - s - p, ln - s - p
+
+        subs: dict[tuple[int, int], _Commands] = {}
+
+        def sub(i: int, j: int) -> _Commands:
+            if hb[i] == hn[j]:
+                return []
+            if (i, j) not in subs:
+                subs[i, j] = self.diff(f"{path}.{j}", b[i], n[j])
+            return subs[i, j]
+
+        # (original index, final index) of the kept elements of the middle
+        if m * q <= _MAX_ALIGN:
+            pairs = self._align(path, p, m, q, s == 0, sub, n)
+            if pairs is None:
+                return None
+        else:
+            pairs = [(p + k, p + k) for k in range(min(m, q))]
+
+        res: list[str] = []
+        kept = {i for i, _ in pairs}
+        # from the back, so that the indices of the others do not move
+        for i in range(p + m - 1, p - 1, -1):
+            if i not in kept:
+                res.append(f"{path}.{i}=<del>")
+        cost = _cost(res)
+        for cmds in itertools.chain(
+            (sub(i, j) for i, j in pairs),
+            (
+                self.diff(f"{path}.{j}", _MISSING, n[j])
+                for j in range(p + len(pairs), p + q)
+            ),
+        ):
+            if cmds is None:
+                return None
+            res += cmds
+            cost += _cost(cmds)
+            if cost >= limit:
+                return None
+        return res
+
+    def _align(
+        self,
+        path: str,
+        p: int,
+        m: int,
+        q: int,
+        append: bool,
+        sub: Callable[[int, int], _Commands],
+        n: list[Any],
+    ) -> list[tuple[int, int]] | None:
+        """The cheapest pairs of kept and final indices of the middle parts.
+
+        Unless `append`, every element of the final middle must come from a
+        kept one.
+        """
+
+        def del_cost(i: int) -> int:
+            return len(f"{path}.{p + i}=<del>") + 1
+
+        # cost[i][j]: `i` elements of the old middle done, `j` of the new one
+        cost = [[_INF] * (q + 1) for _ in range(m + 1)]
+        back: list[list[bool]] = [[False] * (q + 1) for _ in range(m + 1)]
+        cost[0][0] = 0
+        for i in range(m + 1):
+            for j in range(min(i, q) + 1):
+                c = cost[i][j]
+                if c == _INF or i == m:
+                    continue
+                if c + del_cost(i) < cost[i + 1][j]:
+                    cost[i + 1][j] = c + del_cost(i)
+                    back[i + 1][j] = False
+                if j < q:
+                    cmds = sub(p + i, p + j)
+                    if cmds is not None and c + _cost(cmds) < cost[i + 1][j + 1]:
+                        cost[i + 1][j + 1] = c + _cost(cmds)
+                        back[i + 1][j + 1] = True
+
+        best, k = cost[m][q], q
+        if append:
+            tail = 0
+            for j in range(q - 1, -1, -1):
+                value = self.value(n[p + j])
+                if value is None:
+                    break
+                tail += len(f"{path}.{p + j}={value}") + 1
+                if cost[m][j] + tail < best:
+                    best, k = cost[m][j] + tail, j
+        if best == _INF:
+            return None
+
+        pairs = []
+        i, j = m, k
+        while i > 0:
+            if back[i][j]:
+                j -= 1
+                pairs.append((p + i - 1, p + j))
+            i -= 1
+        pairs.reverse()
+        return pairs
+
+
+def lunaconf_overrides(
+    config: BaseModel, base: BaseModel | dict[str, Any] | None = None
+) -> list[str]:
+    """The shortest `key.path=value` commands that turn `base` into `config`.
+
+    `base` is a configuration or a dumped one, and the defaults of the class
+    of `config` if `None`. Applying the commands to the dump of `base` with
+    `lunaconf_gendict` gives a configuration equal to `config`. Subtrees are
+    compared by their digests, so identical ones are skipped at once; lists
+    are edited with `<del>`, indices and appends when that is shorter than
+    writing them whole, and long changed stretches element by element.
+    Strings that are special values cannot be written.
+    """
+    if base is None:
+        base_dump = lunaconf_defaults(type(config)).dump
+    elif isinstance(base, BaseModel):
+        base_dump = base.model_dump()
+    else:
+        base_dump = base
+    dump = config.model_dump()
+    if not all(map(_addressable, dump)) or not all(map(_addressable, base_dump)):
+        raise ValueError("Configurations with non-identifier fields are not supported")
+    res = _Differ().diff_dict("", base_dump, dump, _INF)
+    if res is None:
+        raise ValueError(
+            "The configuration holds a string that is a special value, which "
+            "cannot be written as an override"
+        )
+    return res
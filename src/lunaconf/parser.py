@@ -0,0 +1,83 @@
+import argparse
+from collections.abc import Sequence
+from typing import Any, Callable, Generic, NoReturn, TypeVar
+
+from lunaconf.cli import (
+    _add_gendict_arguments,
+    _apply_entries,
+    _AvaliTag,
+    _expand_command_files,
+    _load_file,
+)
+from lunaconf.config_base import LunaConf
+from lunaconf.defaults import lunaconf_defaults
+from lunaconf.profile import phase
+from lunaconf.schema import OverrideChecker, schema_index
+
+T = TypeVar("T", bound=LunaConf)
+
+
+class _RaisingArgumentParser(argparse.ArgumentParser):
+    """Reports invalid arguments with an exception instead of exiting."""
+
+    def error(self, message: str) -> NoReturn:
+        raise ValueError(message)
+
+
+class LunaConfParser(Generic[T]):
+    """Resolves argument vectors into configurations of one class.
+
+    The argument parser and the schema of `cls` are built once, and parsing
+    keeps no state in the object, so one parser can serve many threads.
+    Arguments are the same as for `lunaconf_gendict`; vectors of `key=value`
+    commands only are resolved without going through argparse at all.
+    Invalid arguments raise a `ValueError` instead of exiting.
+    """
+
+    __slots__ = ("cls", "init_from_defaults", "use_cache", "_parser")
+
+    def __init__(
+        self,
+        cls: type[T],
+        *,
+        init_from_defaults: bool = True,
+        use_cache: bool = True,
+    ) -> None:
+        self.cls = cls
+        self.init_from_defaults = init_from_defaults
+        self.use_cache = use_cache
+        self._parser = _RaisingArgumentParser(prog=cls.__name__, add_help=False)
+        _add_gendict_arguments(self._parser)
+        schema_index(cls)
+
+    def _commands(
+        self, args: Sequence[str]
+    ) -> tuple[list[tuple[_AvaliTag, str]], bool]:
+        if not any(arg.startswith("-") for arg in args):
+            # nothing but positional commands
+            return [("command", arg) for arg in args], False
+        with phase("argparse"):
+            argspace = self._parser.parse_args(args)
+        return argspace.command or [], argspace.no_cache
+
+    def parse(self, args: Sequence[str]) -> T:
+        """The configuration that `args` resolve to."""
+        command, no_cache = self._commands(args)
+        entries = _expand_command_files(command, self.use_cache and not no_cache)
+        return self._resolve(entries)
+
+    def _resolve(
+        self,
+        entries: list[tuple[_AvaliTag, str, bool]],
+        load_file: Callable[[_AvaliTag, str, bool], tuple[Any, bool]] = _load_file,
+    ) -> T:
+        config_dict: dict[str, Any]
+        if self.init_from_defaults:
+            with phase("defaults"):
+                config_dict = lunaconf_defaults(self.cls).seed()
+        else:
+            config_dict = {}
+        checker = OverrideChecker(self.cls)
+        _apply_entries(config_dict, entries, checker=checker, load_file=load_file)
+        with phase("validate"):
+            return checker.validate(config_dict)
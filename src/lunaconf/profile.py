@@ -0,0 +1,162 @@
+import contextvars
+import time
+from typing import IO, Any, Callable, NamedTuple
+
+
+class LunaPhase(NamedTuple):
+    """A timed phase of resolving or dumping a configuration.
+
+    `name` is one of `argparse`, `defaults`, `read`, `cache`, `parse`,
+    `special`, `check`, `compile`, `merge`, `validate` and `dump`. `source` is
+    the file the phase worked on, `size` the number of characters read,
+    parsed or written, and `count` the number of overrides compiled or
+    applied.
+    """
+
+    name: str
+    seconds: float
+    source: str | None = None
+    size: int | None = None
+    count: int | None = None
+
+
+_HOOKS: list[Callable[[LunaPhase], None]] = []
+# the events of the `ProfileReport` running in this thread or task, if any
+_REPORT: contextvars.ContextVar[list[LunaPhase] | None] = contextvars.ContextVar(
+    "lunaconf_profile_report", default=None
+)
+
+
+def lunaconf_add_profile_hook(hook: Callable[[LunaPhase], None]) -> None:
+    """Call `hook` with every `LunaPhase` from now on."""
+    _HOOKS.append(hook)
+
+
+def lunaconf_remove_profile_hook(hook: Callable[[LunaPhase], None]) -> None:
+    _HOOKS.remove(hook)
+
+
+class _Phase:
+    __slots__ = ("name", "source", "size", "count", "_start")
+
+    def __init__(
+        self, name: str, source: str | None, size: int | None, count: int | None
+    ) -> None:
+        self.name = name
+        self.source = source
+        self.size = size
+        self.count = count
+
+    def __enter__(self) -> "_Phase":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        event = LunaPhase(
+            self.name,
+            time.perf_counter() - self._start,
+            self.source,
+            self.size,
+            self.count,
+        )
+        for hook in _HOOKS:
+            hook(event)
+        events = _REPORT.get()
+        if events is not None:
+            events.append(event)
+
+
+class _NullPhase:
+    """Stands in for `_Phase` while nobody listens."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullPhase":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(
+    name: str,
+    source: str | None = None,
+    size: int | None = None,
+    count: int | None = None,
+) -> Any:
+    """A context manager timing the phase `name` for the profile hooks.
+
+    `size` and `count` may also be set on it inside the `with` block. Without
+    hooks or a report, this only costs a function call.
+    """
+    if not _HOOKS and _REPORT.get() is None:
+        return _NULL_PHASE
+    return _Phase(name, source, size, count)
+
+
+PROFILE_FLAG = "--lunaconf-profile"
+
+
+class ProfileReport:
+    """Collects the phases of one resolution for `--lunaconf-profile`.
+
+    Only the phases of the thread (or task) that started the report are
+    collected, not those of other threads resolving at the same time.
+    """
+
+    def __init__(self) -> None:
+        self.events: list[LunaPhase] = []
+        self._tracing = False
+
+    def start(self) -> None:
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        self._token = _REPORT.set(self.events)
+
+    def finish(self, fp: IO[str]) -> None:
+        import tracemalloc
+
+        total = time.perf_counter() - self._start
+        _REPORT.reset(self._token)
+        _, peak = tracemalloc.get_traced_memory()
+        if self._tracing:
+            tracemalloc.stop()
+        fp.write(self.format(total, peak))
+
+    def format(self, total: float, peak: int) -> str:
+        phases: dict[str, list[float]] = {}
+        for e in self.events:
+            entry = phases.setdefault(e.name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += e.seconds
+        lines = ["lunaconf profile:", f"  {'phase':<10} {'calls':>6} {'ms':>10}"]
+        for name, (calls, seconds) in phases.items():
+            lines.append(f"  {name:<10} {calls:>6} {seconds * 1000:>10.3f}")
+
+        sources = [e for e in self.events if e.source is not None]
+        if sources:
+            lines.append("  sources:")
+            for e in sources:
+                size = "" if e.size is None else f" {e.size} chars"
+                lines.append(
+                    f"    {e.name:<8} {e.source}{size} {e.seconds * 1000:.3f} ms"
+                )
+
+        overrides = sum(e.count or 0 for e in self.events if e.name == "compile")
+        # commands are merged with a count, documents without
+        documents = sum(1 for e in self.events if e.name == "merge" and e.count is None)
+        lines.append(f"  overrides: {overrides}, documents: {documents}")
+        lines.append(f"  peak memory: {peak / 1024:.1f} KiB")
+        lines.append(f"  total: {total * 1000:.3f} ms")
+        return "\n".join(lines) + "\n"
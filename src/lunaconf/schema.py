@@ -0,0 +1,362 @@
+import types
+import typing
+import weakref
+from collections.abc import Collection, Mapping, Sequence, Set
+from typing import Annotated, Any
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+from pydantic.errors import PydanticUserError
+
+from lunaconf.config_base import LunaConf
+from lunaconf.special import _DEL_OBJ
+
+# Kinds of `SchemaNode`
+_ANY = 0  # anything goes, also below
+_OPAQUE = 1  # validated in ways only the final validation knows about
+_LEAF = 2  # validated as a whole
+_MODEL = 3
+_LIST = 4
+_DICT = 5
+_SEQ = 6  # tuples and sets, which are written as lists
+
+# validators that see the raw input before the type does
+_RAW_MODES = ("before", "wrap", "plain")
+
+
+def _strip_optional(annotation: Any) -> tuple[Any, bool]:
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def _has_validators(annotation: Any) -> bool:
+    """Whether `Annotated` metadata in `annotation` brings its own validation.
+
+    Such validators (e.g. `AfterValidator`) need not give the same result when
+    run again on their output, so their values are left to the final
+    validation instead of being replaced by a checked value.
+    """
+    if typing.get_origin(annotation) is Annotated:
+        if any(
+            hasattr(m, "__get_pydantic_core_schema__") for m in annotation.__metadata__
+        ):
+            return True
+        annotation = typing.get_args(annotation)[0]
+    return any(_has_validators(a) for a in typing.get_args(annotation))
+
+
+def _kind_of(annotation: Any) -> int:
+    if annotation is Any:
+        return _ANY
+    if typing.get_origin(annotation) is Annotated:
+        return _OPAQUE if _has_validators(annotation) else _LEAF
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        decorators = annotation.__pydantic_decorators__
+        validators = decorators.model_validators.values()
+        if any(d.info.mode in _RAW_MODES for d in validators):
+            return _OPAQUE
+        return _MODEL
+    origin = typing.get_origin(annotation) or annotation
+    args = typing.get_args(annotation)
+    if origin in (list, Sequence) and len(args) == 1:
+        return _LIST
+    if origin is tuple and args and args != ((),):
+        return _SEQ
+    if origin in (set, frozenset, Set) and len(args) == 1:
+        return _SEQ
+    if origin in (dict, Mapping) and len(args) == 2 and args[0] in (str, Any):
+        return _DICT
+    return _OPAQUE if _has_validators(annotation) else _LEAF
+
+
+class SchemaNode:
+    """What is known about the values at one path of a configuration class.
+
+    Children are only looked into on demand, so building the index of a large
+    (or recursive) class costs nothing up front.
+    """
+
+    __slots__ = (
+        "annotation",
+        "nullable",
+        "kind",
+        "_full",
+        "_config",
+        "_adapter",
+        "_children",
+        "_item",
+        "_forbid_extra",
+    )
+
+    def __init__(
+        self,
+        annotation: Any,
+        metadata: Sequence[Any] = (),
+        config: ConfigDict | None = None,
+        opaque: bool = False,
+    ) -> None:
+        self.annotation = annotation
+        self._full = Annotated[(annotation, *metadata)] if metadata else annotation
+        inner, self.nullable = _strip_optional(annotation)
+        if opaque or any(hasattr(m, "__get_pydantic_core_schema__") for m in metadata):
+            self.kind = _OPAQUE
+        else:
+            self.kind = _kind_of(inner)
+        self._config = config
+        self._adapter: TypeAdapter[Any] | None = None
+        self._children: dict[Any, SchemaNode] | None = None
+        self._item: SchemaNode | None = None
+        self._forbid_extra = False
+
+    @property
+    def adapter(self) -> TypeAdapter[Any]:
+        """A `TypeAdapter` validating a whole value at this path."""
+        if self._adapter is None:
+            try:
+                self._adapter = TypeAdapter(self._full, config=self._config)
+            except PydanticUserError:
+                # models, dataclasses etc. bring their own config
+                self._adapter = TypeAdapter(self._full)
+        return self._adapter
+
+    def _model_children(self) -> dict[Any, "SchemaNode"]:
+        if self._children is None:
+            cls = _strip_optional(self.annotation)[0]
+            self._forbid_extra = cls.model_config.get("extra") == "forbid"
+            config = cls.model_config
+            opaque = set()
+            for d in cls.__pydantic_decorators__.field_validators.values():
+                if d.info.mode in _RAW_MODES:
+                    opaque.update(
+                        cls.model_fields if "*" in d.info.fields else d.info.fields
+                    )
+            children: dict[Any, SchemaNode] = {}
+            for name, field in cls.model_fields.items():
+                node = SchemaNode(
+                    field.annotation,
+                    field.metadata,
+                    config,
+                    name in opaque,
+                )
+                children[name] = node
+                if isinstance(field.alias, str):
+                    children[field.alias] = node
+            self._children = children
+        return self._children
+
+    def child(self, seg: Any) -> "SchemaNode | None":
+        """The node below this one at key or index `seg`.
+
+        Returns `None` for keys that are not fields of a model.
+        """
+        if self.kind == _MODEL:
+            return self._model_children().get(seg)
+        if self.kind == _SEQ:
+            return self._seq_child(seg)
+        if self._item is None:
+            inner = _strip_optional(self.annotation)[0]
+            if self.kind == _LIST:
+                self._item = SchemaNode(typing.get_args(inner)[0], (), self._config)
+            elif self.kind == _DICT:
+                self._item = SchemaNode(typing.get_args(inner)[1], (), self._config)
+            elif self.kind == _ANY:
+                self._item = self
+            else:
+                self._item = SchemaNode(Any, (), None, opaque=True)
+        return self._item
+
+    def _seq_child(self, seg: Any) -> "SchemaNode | None":
+        if self._children is None:
+            inner = _strip_optional(self.annotation)[0]
+            args = typing.get_args(inner)
+            if len(args) == 2 and args[1] is Ellipsis:
+                args = args[:1]
+            elif typing.get_origin(inner) is tuple:
+                # a fixed-length tuple has a type per index
+                self._children = {
+                    i: SchemaNode(a, (), self._config) for i, a in enumerate(args)
+                }
+                return self._children.get(seg)
+            self._children = {}
+            self._item = SchemaNode(args[0], (), self._config)
+        return self._children.get(seg, self._item)
+
+    def lookup(self, path: str | Sequence[Any]) -> "SchemaNode | None":
+        """The node at a dotted path (or sequence of keys) below this one."""
+        if isinstance(path, str):
+            path = [int(s) if s.isdigit() else s for s in path.split(".")]
+        node: SchemaNode | None = self
+        for seg in path:
+            if node is None:
+                break
+            node = node.child(seg)
+        return node
+
+
+def _is_scalar(value: Any) -> bool:
+    if isinstance(value, (str, bytes)):
+        return True
+    return not isinstance(value, (BaseModel, Collection))
+
+
+_INDEXES: "weakref.WeakKeyDictionary[type, SchemaNode]" = weakref.WeakKeyDictionary()
+
+
+def schema_index(cls: type[LunaConf]) -> SchemaNode:
+    """The root of the per-path index of the fields of `cls`."""
+    res = _INDEXES.get(cls)
+    if res is None:
+        res = SchemaNode(cls)
+        _INDEXES[cls] = res
+    return res
+
+
+class OverrideChecker:
+    """Validates overrides against a configuration class as they come in.
+
+    Values are replaced by their validated form where that is a scalar (not a
+    model or a container), so that the final validation can run in strict
+    mode when nothing escaped the checks. Containers stay plain lists and
+    dicts, which later overrides can still index into, and their items are
+    checked one by one.
+    """
+
+    __slots__ = ("cls", "root", "complete")
+
+    def __init__(self, cls: type[LunaConf]) -> None:
+        self.cls = cls
+        self.root = schema_index(cls)
+        # whether every value met so far has been checked
+        self.complete = True
+
+    def check_path(self, path: Sequence[Any], value: Any) -> Any:
+        """Check `value` set at `path`, and return the value to set."""
+        node: SchemaNode | None = self.root
+        for i, seg in enumerate(path):
+            parent = node
+            node = self._descend(node, seg, path[: i + 1], value)
+            if node is None:
+                if parent is not None and parent.kind == _MODEL:
+                    # an extra key, which the model ignores or accepts as is
+                    return value
+                self.complete = False
+                return value
+        return self._check(node, value, path)
+
+    def check_document(self, obj: Any) -> Any:
+        """Check a document merged at the root, in place where possible."""
+        if not isinstance(obj, dict):
+            self.complete = False
+            return obj
+        return self._check(self.root, obj, ())
+
+    def _descend(
+        self, node: SchemaNode | None, seg: Any, path: Sequence[Any], value: Any
+    ) -> SchemaNode | None:
+        if node is None or node.kind in (_OPAQUE, _LEAF):
+            return None
+        if node.kind in (_LIST, _SEQ) and type(seg) is not int:
+            return None
+        child = node.child(seg)
+        if child is None and node._forbid_extra:
+            raise self._error(
+                [{"type": "extra_forbidden", "loc": tuple(path), "input": value}]
+            )
+        return child
+
+    def _check(self, node: SchemaNode, value: Any, path: Sequence[Any]) -> Any:
+        if value is _DEL_OBJ or node.kind == _ANY:
+            return value
+        if node.kind == _OPAQUE:
+            self.complete = False
+            return value
+        if value is None and node.nullable:
+            return value
+        if node.kind == _MODEL and isinstance(value, dict):
+            for k, v in value.items():
+                child = self._descend(node, k, (*path, k), v)
+                if child is not None:
+                    r = self._check(child, v, (*path, k))
+                    if r is not v:
+                        value[k] = r
+            return value
+        if node.kind == _DICT and isinstance(value, dict):
+            item = node.child(None)
+            for k, v in value.items():
+                r = self._check(item, v, (*path, k))  # type: ignore[arg-type]
+                if r is not v:
+                    value[k] = r
+            return value
+        if node.kind == _LIST and isinstance(value, list):
+            item = node.child(0)
+            assert item is not None
+            if item.kind in (_ANY, _LEAF) and not any(v is _DEL_OBJ for v in value):
+                res = self._validate(node, value, path)
+                if type(res) is list and all(map(_is_scalar, res)):
+                    return res
+            self._check_items(node, value, path)
+            return value
+        if node.kind == _SEQ and isinstance(value, list):
+            self._check_items(node, value, path)
+            # strict mode would not take the list for a tuple or a set
+            self.complete = False
+            return value
+        res = self._validate(node, value, path)
+        if node.kind != _LEAF:
+            return value
+        if not _is_scalar(res):
+            # models and containers are kept as dicts and lists so that later
+            # overrides can reach in, which strict mode does not accept
+            self.complete = False
+            return value
+        return res
+
+    def _check_items(
+        self, node: SchemaNode, value: list[Any], path: Sequence[Any]
+    ) -> None:
+        for i, v in enumerate(value):
+            item = node.child(i)
+            if item is None:
+                # past the end of a fixed-length tuple
+                self.complete = False
+                continue
+            r = self._check(item, v, (*path, i))
+            if r is not v:
+                value[i] = r
+
+    def _validate(self, node: SchemaNode, value: Any, path: Sequence[Any]) -> Any:
+        try:
+            return node.adapter.validate_python(value)
+        except ValidationError as e:
+            errors: list[Any] = []
+            for err in e.errors():
+                line = {
+                    "type": err["type"],
+                    "loc": (*path, *err["loc"]),
+                    "input": err["input"],
+                }
+                if "ctx" in err:
+                    line["ctx"] = err["ctx"]
+                errors.append(line)
+            try:
+                raise self._error(errors) from None
+            except (KeyError, TypeError):
+                # custom error types cannot be recreated
+                raise e from None
+
+    def _error(self, errors: list[Any]) -> ValidationError:
+        # the same error as the final validation would raise
+        return ValidationError.from_exception_data(self.cls.__name__, errors)
+
+    def validate(self, config_dict: dict[str, Any]) -> Any:
+        """Build the configuration from the checked `config_dict`."""
+        if self.complete:
+            # every leaf already has its validated type, which strict mode
+            # accepts without trying any conversions
+            try:
+                return self.cls.model_validate(config_dict, strict=True)
+            except ValidationError:
+                pass
+        return self.cls.model_validate(config_dict)
@@ -0,0 +1,116 @@
+import mmap
+import os
+import struct
+import sys
+import weakref
+from multiprocessing import shared_memory
+from typing import Any, Callable, Generic, TypeVar
+
+from lunaconf.config_base import LunaConf
+from lunaconf.snapshot import _decode, _encode
+
+T = TypeVar("T", bound=LunaConf)
+
+# The segment starts with the size of the snapshot, since the system may
+# round the size of the segment up.
+_SIZE = struct.Struct("<Q")
+
+
+def _release(shm: shared_memory.SharedMemory) -> None:
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _map(name: str) -> tuple[Any, Callable[[], None]]:
+    """Map the segment `name` read-only; returns the buffer and its closer.
+
+    `SharedMemory` would register the segment with the resource tracker,
+    which workers usually share with the publisher, and the tracker would
+    then remove the segment with the first worker that exits.
+    """
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+        return shm.buf, shm.close
+    if os.name != "posix":
+        # Windows has no resource tracker for shared memory
+        shm = shared_memory.SharedMemory(name=name)
+        return shm.buf, shm.close
+    path = f"/{name.lstrip('/')}"
+    try:
+        import _posixshmem
+    except ImportError:
+        from multiprocessing import resource_tracker
+
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(path, "shared_memory")
+        return shm.buf, shm.close
+
+    fd = _posixshmem.shm_open(path, os.O_RDONLY, mode=0o600)
+    try:
+        buf = mmap.mmap(fd, os.fstat(fd).st_size, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+    return buf, buf.close
+
+
+class LunaShared(Generic[T]):
+    """A configuration published in shared memory by `lunaconf_publish`.
+
+    The segment lives until `close()` is called, the object is garbage
+    collected or the process exits, whichever comes first.
+    """
+
+    def __init__(self, config: T, name: str | None = None) -> None:
+        data = _encode(config)
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=True, size=_SIZE.size + len(data)
+        )
+        _SIZE.pack_into(self._shm.buf, 0, len(data))
+        self._shm.buf[_SIZE.size : _SIZE.size + len(data)] = data
+        self.name: str = self._shm.name
+        self.size = len(data)
+        self._finalizer = weakref.finalize(self, _release, self._shm)
+
+    def close(self) -> None:
+        """Remove the segment; workers attaching afterwards fail."""
+        self._finalizer()
+
+    def __enter__(self) -> "LunaShared[T]":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def lunaconf_publish(config: T, name: str | None = None) -> LunaShared[T]:
+    """Publish a resolved configuration for other processes to attach to.
+
+    The configuration is stored once in a shared memory segment called `name`
+    (or a generated name, see `LunaShared.name`), in the format of
+    `lunaconf_save_snapshot`. Keep the returned object alive (or use it as a
+    context manager) until every worker has attached.
+    """
+    return LunaShared(config, name)
+
+
+def lunaconf_attach(cls: type[T], name: str, *, validate: bool = False) -> T:
+    """The configuration published under `name` by `lunaconf_publish`.
+
+    It is restored straight from the shared segment, without parsing,
+    merging or (unless `validate`) validation, after checking that it was
+    published for the same schema of `cls`. Like snapshots, the segment holds
+    a pickle, so only attach to segments of trusted processes.
+    """
+    buf, close = _map(name)
+    try:
+        (size,) = _SIZE.unpack_from(buf, 0)
+        with memoryview(buf)[_SIZE.size : _SIZE.size + size] as data:
+            config = _decode(cls, data, f"'{name}'")
+    finally:
+        close()
+    if validate:
+        config = cls.model_validate(config.model_dump())
+    return config
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import pickle
+import typing
+import weakref
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+
+from lunaconf.config_base import LunaConf
+
+T = TypeVar("T", bound=LunaConf)
+
+_MAGIC = b"LUNASNAP"
+_VERSION = 1
+# The snapshot holds the pickled configuration itself, which is restored
+# without validation.
+_KIND_MODEL = b"m"
+# The snapshot holds the pickled dumped dict, used for classes that cannot be
+# pickled by reference (e.g. defined inside a function).
+_KIND_DICT = b"d"
+_HEADER_SIZE = len(_MAGIC) + 2 + 32
+
+_FINGERPRINTS: "weakref.WeakKeyDictionary[type, bytes]" = weakref.WeakKeyDictionary()
+
+
+def _type_key(tp: Any, seen: set[type]) -> str:
+    """A description of the type `tp` that is the same in every process.
+
+    Unlike `repr`, it leaves out the validators and other callables that
+    `Annotated` metadata may hold, whose `repr` includes their address.
+    """
+    origin = typing.get_origin(tp)
+    if origin is typing.Annotated:
+        inner, *metadata = typing.get_args(tp)
+        names = ", ".join(type(m).__qualname__ for m in metadata)
+        return f"Annotated[{_type_key(inner, seen)}, {names}]"
+    if origin is not None:
+        args = ", ".join(_type_key(a, seen) for a in typing.get_args(tp))
+        return f"{_type_key(origin, seen)}[{args}]"
+    if isinstance(tp, type):
+        key = f"{tp.__module__}.{tp.__qualname__}"
+        if issubclass(tp, BaseModel) and tp not in seen:
+            seen.add(tp)
+            key += f"{{{_fields_key(tp, seen)}}}"
+        return key
+    return repr(tp)
+
+
+def _fields_key(cls: type[BaseModel], seen: set[type]) -> str:
+    # defaults are left out, as their `repr` may include addresses too
+    return ", ".join(
+        f"{name}: {_type_key(field.annotation, seen)}"
+        for name, field in cls.model_fields.items()
+    )
+
+
+def lunaconf_schema_fingerprint(cls: type[LunaConf]) -> bytes:
+    """A digest of the schema of `cls`, which changes when its fields do."""
+    fp = _FINGERPRINTS.get(cls)
+    if fp is None:
+        try:
+            schema = json.dumps(cls.model_json_schema(), sort_keys=True)
+        except Exception:
+            # not every type can be expressed in JSON schema
+            schema = _fields_key(cls, {cls})
+        fp = hashlib.sha256(
+            f"{cls.__module__}.{cls.__qualname__}\0{schema}".encode()
+        ).digest()
+        _FINGERPRINTS[cls] = fp
+    return fp
+
+
+def _encode(config: LunaConf) -> bytes:
+    try:
+        payload = pickle.dumps(config, protocol=pickle.HIGHEST_PROTOCOL)
+        kind = _KIND_MODEL
+    except (pickle.PicklingError, AttributeError, TypeError):
+        payload = pickle.dumps(config.model_dump(), protocol=pickle.HIGHEST_PROTOCOL)
+        kind = _KIND_DICT
+
+    header = (
+        _MAGIC + bytes([_VERSION]) + kind + lunaconf_schema_fingerprint(type(config))
+    )
+    return header + payload
+
+
+def _decode(cls: type[T], data: bytes | memoryview, source: str) -> T:
+    """Restore a configuration from `_encode`; `source` names it in errors."""
+    if len(data) < _HEADER_SIZE or data[: len(_MAGIC)] != _MAGIC:
+        raise ValueError(f"{source} is not a lunaconf snapshot")
+    version = data[len(_MAGIC)]
+    if version != _VERSION:
+        raise ValueError(
+            f"Snapshot {source} has version {version}, expected {_VERSION}"
+        )
+    kind = bytes(data[len(_MAGIC) + 1 : len(_MAGIC) + 2])
+    fingerprint = bytes(data[len(_MAGIC) + 2 : _HEADER_SIZE])
+    if fingerprint != lunaconf_schema_fingerprint(cls):
+        raise ValueError(
+            f"Snapshot {source} was written for a different schema than "
+            f"{cls.__qualname__}; regenerate it from the original sources"
+        )
+
+    obj = pickle.loads(data[_HEADER_SIZE:])
+    if kind == _KIND_MODEL:
+        if type(obj) is not cls:
+            raise ValueError(
+                f"Snapshot {source} holds a {type(obj).__qualname__}, "
+                f"expected {cls.__qualname__}"
+            )
+        return obj
+    return cls.model_validate(obj)
+
+
+def lunaconf_save_snapshot(config: LunaConf, path: str) -> None:
+    data = _encode(config)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def lunaconf_load_snapshot(cls: type[T], path: str) -> T:
+    """Load a configuration saved with `lunaconf_save_snapshot`.
+
+    Snapshots are pickles, so only load snapshots from trusted sources.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    return _decode(cls, data, f"'{path}'")
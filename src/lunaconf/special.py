@@ -0,0 +1,140 @@
+import math
+import os
+from typing import Any, Callable
+
+_DEL_OBJ = object()
+
+_Handler = Callable[["SpecialValueResolver", str], Any]
+
+# `<name>` tokens; the context-free ones may be resolved once and cached
+_TOKENS: dict[str, _Handler] = {
+    "null": lambda r, _: None,
+    "del": lambda r, _: _DEL_OBJ,
+    "inf": lambda r, _: math.inf,
+    "-inf": lambda r, _: -math.inf,
+    "nan": lambda r, _: math.nan,
+}
+# `<del>` is not static: the identity of `_DEL_OBJ` does not survive caching
+_STATIC_TOKENS = frozenset(["null", "inf", "-inf", "nan"])
+
+
+def _env(r: "SpecialValueResolver", name: str) -> str:
+    return r.getenv(name)
+
+
+def _envint(r: "SpecialValueResolver", name: str) -> int:
+    res = r.getenv(name)
+    try:
+        return int(res)
+    except ValueError as e:
+        raise ValueError(
+            f"Environment variable '{name}' cannot be converted to int"
+        ) from e
+
+
+# `<name:arg>` tokens
+_ARG_TOKENS: dict[str, _Handler] = {
+    "env": _env,
+    "envint": _envint,
+}
+
+
+def lunaconf_register_special_value(
+    name: str,
+    func: Callable[..., Any],
+    *,
+    takes_arg: bool = True,
+) -> None:
+    """Register a custom special value.
+
+    With `takes_arg`, `<name:arg>` is replaced by `func(arg)`; otherwise
+    `<name>` is replaced by `func()`. Names are case-insensitive.
+    """
+    name = name.lower()
+    if takes_arg:
+        _ARG_TOKENS[name] = lambda r, arg: func(arg)
+    else:
+        if name in _STATIC_TOKENS or name == "del":
+            raise ValueError(f"Cannot override the special value <{name}>")
+        _TOKENS[name] = lambda r, _: func()
+
+
+def is_special(s: str) -> bool:
+    """Whether resolving `s` replaces it, with the values registered now."""
+    if len(s) < 3 or s[0] != "<" or s[-1] != ">":
+        return False
+    inner = s[1:-1]
+    if inner.lower() in _TOKENS:
+        return True
+    name, sep, _ = inner.partition(":")
+    return bool(sep) and name.lower() in _ARG_TOKENS
+
+
+class SpecialValueResolver:
+    """Replaces special values like `<null>` or `<env:VAR>` in documents.
+
+    Environment variables are looked up once per resolver, so a resolver
+    should be used for one resolution. With `static_only`, only context-free
+    values are replaced and `dynamic_seen` tells whether others were met.
+    """
+
+    __slots__ = ("_env", "static_only", "dynamic_seen")
+
+    def __init__(self, *, static_only: bool = False) -> None:
+        self._env: dict[str, str] = {}
+        self.static_only = static_only
+        self.dynamic_seen = False
+
+    def getenv(self, name: str) -> str:
+        res = self._env.get(name)
+        if res is None:
+            res = os.getenv(name)
+            if res is None:
+                raise ValueError(f"Environment variable '{name}' is not set")
+            self._env[name] = res
+        return res
+
+    def resolve_scalar(self, s: str) -> Any:
+        if len(s) < 3 or s[0] != "<" or s[-1] != ">":
+            return s
+        inner = s[1:-1]
+        key = inner.lower()
+        handler = _TOKENS.get(key)
+        if handler is not None:
+            if self.static_only and key not in _STATIC_TOKENS:
+                self.dynamic_seen = True
+                return s
+            return handler(self, inner)
+        name, sep, arg = inner.partition(":")
+        if sep:
+            handler = _ARG_TOKENS.get(name.lower())
+            if handler is not None:
+                if self.static_only:
+                    self.dynamic_seen = True
+                    return s
+                return handler(self, arg)
+        if self.static_only:
+            # may become a special value once more are registered
+            self.dynamic_seen = True
+        return s
+
+    def resolve(self, obj: Any) -> Any:
+        """Resolve all special values in `obj`, in place for containers."""
+        if isinstance(obj, str):
+            return self.resolve_scalar(obj)
+        if not isinstance(obj, (dict, list)):
+            return obj
+        # an explicit stack keeps deeply nested documents from hitting the
+        # recursion limit
+        stack: list[Any] = [obj]
+        while stack:
+            cur = stack.pop()
+            for k, v in cur.items() if isinstance(cur, dict) else enumerate(cur):
+                if isinstance(v, str):
+                    if v.startswith("<"):
+                        r = self.resolve_scalar(v)
+                        if r is not v:
+                            cur[k] = r
+                elif isinstance(v, (dict, list)):
+                    stack.append(v)
+        return obj
@@ -0,0 +1,97 @@
+import itertools
+from collections.abc import Iterator, Mapping, Sequence
+from typing import Any, TypeVar
+
+from lunaconf.cli import _parse_command_value, adjust_conf, lunaconf_gendict
+from lunaconf.config_base import LunaConf
+from lunaconf.defaults import lunaconf_defaults
+
+T = TypeVar("T", bound=LunaConf)
+
+
+def _parse_keys(key_str: str) -> list[str]:
+    return [s.strip() for s in key_str.strip().split(".")]
+
+
+def _parse_axis_value(value: Any) -> Any:
+    if isinstance(value, str):
+        return _parse_command_value(value.strip())
+    return value
+
+
+def _cow_adjust(
+    root: dict[str, Any],
+    owned: set[int],
+    keys: list[str],
+    value: Any,
+) -> None:
+    # Copy (shallowly) every container on the path that is still shared with
+    # the base, so that `adjust_conf` only ever mutates containers owned by
+    # the current point.
+    now: Any = root
+    for key in keys[:-1]:
+        slot: str | int
+        if isinstance(now, dict) and key.isidentifier() and key in now:
+            slot = key
+        elif isinstance(now, list) and key.isdigit() and int(key) < len(now):
+            slot = int(key)
+        else:
+            break
+        child = now[slot]
+        if not isinstance(child, (dict, list)):
+            break
+        if id(child) not in owned:
+            child = child.copy()
+            owned.add(id(child))
+            now[slot] = child
+        now = child
+    adjust_conf(root, keys, value)
+
+
+def lunaconf_sweep(
+    cls: type[T],
+    base_args: Sequence[str] | None = None,
+    axes: Mapping[str | tuple[str, ...], Sequence[Any]] | None = None,
+    *,
+    init_from_defaults: bool = True,
+) -> Iterator[T]:
+    """Lazily generate validated configurations over a grid of overrides.
+
+    `base_args` is resolved once like the arguments of `lunaconf_cli`. Each
+    key of `axes` is a dotted path (`"a.b"`) whose values are swept over; a
+    tuple of paths is a zipped axis whose values are tuples swept over in
+    lockstep. The cartesian product of all axes is yielded, with the last axis
+    varying fastest. String values are parsed like command values, so
+    `"<null>"`, `"[1, 2]"` etc. are supported; other values are used as-is.
+    """
+    base: dict[str, Any]
+    if init_from_defaults:
+        base = lunaconf_defaults(cls).seed()
+    else:
+        base = {}
+    lunaconf_gendict(base, list(base_args or []))
+
+    dims: list[list[list[tuple[list[str], Any]]]] = []
+    for key, values in (axes or {}).items():
+        if isinstance(key, str):
+            keys = _parse_keys(key)
+            dims.append([[(keys, _parse_axis_value(v))] for v in values])
+        else:
+            key_paths = [_parse_keys(k) for k in key]
+            dim = []
+            for v in values:
+                if len(v) != len(key_paths):
+                    raise ValueError(
+                        f"Zipped axis {key} expects {len(key_paths)} values "
+                        f"per point but got {len(v)}"
+                    )
+                dim.append([(k, _parse_axis_value(x)) for k, x in zip(key_paths, v)])
+            dims.append(dim)
+
+    for point in itertools.product(*dims):
+        config_dict = base.copy()
+        owned = {id(config_dict)}
+        for overrides in point:
+            for keys, value in overrides:
+                _cow_adjust(config_dict, owned, keys, value)
+        yield cls.model_validate(config_dict)
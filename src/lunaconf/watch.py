@@ -0,0 +1,278 @@
+import logging
+import os
+import pickle
+import select
+import sys
+import threading
+from collections.abc import Sequence
+from typing import Any, Callable, Generic, TypeVar
+
+from lunaconf.cli import (
+    _apply_entries,
+    _AvaliTag,
+    _expand_command_files,
+    _gendict_parser,
+    _load_file,
+)
+from lunaconf.config_base import LunaConf
+from lunaconf.defaults import _diff, lunaconf_defaults
+from lunaconf.schema import OverrideChecker
+
+T = TypeVar("T", bound=LunaConf)
+
+logger = logging.getLogger("lunaconf")
+
+_Signature = tuple[int, int] | None
+
+
+def _signature(path: str) -> _Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class _Inotify:
+    """Wakes the watcher up when something changes in the watched directories.
+
+    Only used as a hint: what changed is always decided by comparing mtimes.
+    """
+
+    # IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    # | IN_CREATE | IN_DELETE
+    _MASK = 0x2 | 0x4 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+
+    def __init__(self) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._rm = libc.inotify_rm_watch
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: dict[str, int] = {}
+
+    def watch(self, directories: set[str]) -> None:
+        for d in set(self._watches) - directories:
+            self._rm(self.fd, self._watches.pop(d))
+        for d in directories - set(self._watches):
+            wd = self._add(self.fd, os.fsencode(d), self._MASK)
+            if wd >= 0:
+                self._watches[d] = wd
+
+    def wait(self, timeout: float) -> None:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if ready:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class LunaWatcher(Generic[T]):
+    """Keeps a configuration up to date with the files it was built from.
+
+    See `lunaconf_watch`. `config` is the latest valid configuration.
+    """
+
+    def __init__(
+        self,
+        cls: type[T],
+        args: Sequence[str] | None,
+        on_change: Callable[[T, dict[str, Any]], None],
+        *,
+        interval: float = 1.0,
+        debounce: float = 0.2,
+        init_from_defaults: bool = True,
+        on_error: Callable[[Exception], None] | None = None,
+        use_inotify: bool = True,
+    ) -> None:
+        self.cls = cls
+        self.on_change = on_change
+        self.on_error = on_error
+        self.interval = interval
+        self.debounce = debounce
+        self._init_from_defaults = init_from_defaults
+
+        argspace = _gendict_parser().parse_args(args)
+        self._command: list[tuple[_AvaliTag, str]] = argspace.command or []
+        self._use_cache = not argspace.no_cache
+
+        # (path, tag) -> (signature, pickled document, has special values)
+        self._documents: dict[tuple[str, str], tuple[_Signature, bytes, bool]] = {}
+        self._signatures: dict[str, _Signature] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self._inotify: _Inotify | None = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError):
+                self._inotify = None
+
+        self.config: T = self._resolve()
+        self._dump = self.config.model_dump()
+
+    @property
+    def files(self) -> list[str]:
+        """The files the configuration is built from."""
+        return sorted(self._signatures)
+
+    def _load_file(
+        self, tag: _AvaliTag, path: str, use_cache: bool
+    ) -> tuple[Any, bool]:
+        real = os.path.realpath(path)
+        sig = _signature(real)
+        self._signatures[real] = sig
+        key = (real, tag)
+        entry = self._documents.get(key)
+        if entry is None or entry[0] != sig or sig is None:
+            d, dynamic = _load_file(tag, path, use_cache)
+            try:
+                blob = pickle.dumps(d, protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                return d, dynamic
+            self._documents[key] = entry = (sig, blob, dynamic)
+        # merging adopts parts of the document, so every merge gets a copy
+        return pickle.loads(entry[1]), entry[2]
+
+    def _resolve(self) -> T:
+        included: set[str] = set()
+        self._signatures = {}
+        try:
+            entries = _expand_command_files(self._command, self._use_cache, included)
+        finally:
+            for path in included:
+                self._signatures[path] = _signature(path)
+        config_dict: dict[str, Any]
+        if self._init_from_defaults:
+            config_dict = lunaconf_defaults(self.cls).seed()
+        else:
+            config_dict = {}
+        checker = OverrideChecker(self.cls)
+        _apply_entries(config_dict, entries, checker=checker, load_file=self._load_file)
+        self._documents = {
+            k: v for k, v in self._documents.items() if k[0] in self._signatures
+        }
+        if self._inotify is not None:
+            self._inotify.watch({os.path.dirname(p) for p in self._signatures})
+        return checker.validate(config_dict)
+
+    def _changed(self) -> bool:
+        return any(_signature(p) != sig for p, sig in self._signatures.items())
+
+    def check(self) -> bool:
+        """Reload the configuration if a file changed since the last check.
+
+        Returns whether `on_change` was called. Errors while reloading (e.g.
+        a file saved half-way) are passed to `on_error`, or logged, and the
+        current configuration is kept.
+        """
+        with self._lock:
+            if not self._changed():
+                return False
+            try:
+                config = self._resolve()
+            except (Exception, SystemExit) as e:
+                if isinstance(e, SystemExit):
+                    e = ValueError(f"Invalid arguments in a command file: {e}")
+                if self.on_error is not None:
+                    self.on_error(e)
+                else:
+                    logger.warning("Cannot reload the configuration: %s", e)
+                return False
+            dump = config.model_dump()
+            diff = _diff(self._dump, dump)
+            self.config, self._dump = config, dump
+        if not diff:
+            return False
+        self.on_change(config, diff)
+        return True
+
+    def _wait(self, timeout: float) -> None:
+        if self._inotify is not None:
+            self._inotify.wait(timeout)
+        else:
+            self._stop.wait(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wait(self.interval)
+            if self._stop.is_set() or not self._changed():
+                continue
+            # wait until the files stop changing, to not pick up a burst of
+            # writes half-way
+            sigs = {p: _signature(p) for p in self._signatures}
+            while not self._stop.wait(self.debounce):
+                new = {p: _signature(p) for p in self._signatures}
+                if new == sigs:
+                    break
+                sigs = new
+            if not self._stop.is_set():
+                self.check()
+
+    def start(self) -> "LunaWatcher[T]":
+        """Watch the files in a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="lunaconf-watch", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self) -> "LunaWatcher[T]":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def lunaconf_watch(
+    cls: type[T],
+    args: Sequence[str] | None,
+    on_change: Callable[[T, dict[str, Any]], None],
+    *,
+    interval: float = 1.0,
+    debounce: float = 0.2,
+    init_from_defaults: bool = True,
+    on_error: Callable[[Exception], None] | None = None,
+) -> LunaWatcher[T]:
+    """Resolve a configuration and reload it whenever its files change.
+
+    `args` are override arguments as for `lunaconf_gendict`. Every file
+    pulled in through `-J/-T/-D/-C` is watched (with inotify on Linux,
+    otherwise by polling every `interval` seconds), and once a change has
+    settled for `debounce` seconds only the changed files are parsed again.
+    `on_change` is then called from the watcher thread with the new
+    configuration and the entries of its dump that changed (removed ones as
+    `"<del>"`). The returned watcher is already running; call `stop()` or use
+    it as a context manager.
+    """
+    watcher = LunaWatcher(
+        cls,
+        args,
+        on_change,
+        interval=interval,
+        debounce=debounce,
+        init_from_defaults=init_from_defaults,
+        on_error=on_error,
+    )
+    return watcher.start()
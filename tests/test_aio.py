@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+from pydantic import Field
+
+from lunaconf import LunaConf, lunaconf_cli
+from lunaconf import aio as lunaconf_aio
+from lunaconf.aio import lunaconf_cli_async, lunaconf_cli_batch_async
+
+
+class AioInner(LunaConf):
+    lr: float = 0.1
+    layers: list[int] = Field(default_factory=lambda: [1, 2])
+
+
+class AioConf(LunaConf):
+    name: str = "default"
+    inner: AioInner = Field(default_factory=AioInner)
+    tags: dict[str, list[int]] = Field(default_factory=dict)
+
+
+def write(path, content):
+    path.write_text(content)
+    return str(path)
+
+
+def test_async_matches_cli(tmp_path):
+    doc = write(tmp_path / "a.json", '{"tags": {"x": [1]}, "inner": {"lr": 0.5}}')
+    toml = write(tmp_path / "b.toml", 'name = "toml"\n[inner]\nlayers = [7]\n')
+    base = write(tmp_path / "base.args", f"-J {doc}\ntags.x.0=9\n")
+    top = write(tmp_path / "top.args", f"-C {base}\n-T {toml}\n")
+    args = ["-C", top, "-J", doc, "-D", toml, "tags.x.1=3; name=last"]
+
+    conf = asyncio.run(lunaconf_cli_async(AioConf, args))
+    assert conf == lunaconf_cli(AioConf, args)
+    assert conf.name == "last"
+    # the document used twice is not shared between its uses
+    assert conf.tags == {"x": [1, 3]}
+
+
+def test_async_loads_concurrently(tmp_path, monkeypatch):
+    paths = [
+        write(tmp_path / f"{i}.json", f'{{"tags": {{"k{i}": [{i}]}}}}')
+        for i in range(3)
+    ]
+    # every load waits for the others, which only works if they overlap
+    barrier = threading.Barrier(3, timeout=5)
+    load_file = lunaconf_aio._load_file
+
+    def slow_load(*key):
+        barrier.wait()
+        return load_file(*key)
+
+    monkeypatch.setattr(lunaconf_aio, "_load_file", slow_load)
+    args = [a for p in paths for a in ("-J", p)]
+    conf = asyncio.run(lunaconf_cli_async(AioConf, args, max_workers=3))
+    assert conf.tags == {"k0": [0], "k1": [1], "k2": [2]}
+
+
+def test_async_errors(tmp_path):
+    missing = str(tmp_path / "missing.json")
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(lunaconf_cli_async(AioConf, ["-J", missing]))
+    with pytest.raises(ValueError):
+        asyncio.run(lunaconf_cli_async(AioConf, ["--bogus"]))
+
+
+def test_async_batch(tmp_path):
+    doc = write(tmp_path / "a.json", '{"name": "doc"}')
+    missing = str(tmp_path / "missing.json")
+    argvs = [["name=a"], ["-J", doc, "inner.lr=2"], ["-J", missing], []]
+    results = asyncio.run(lunaconf_cli_batch_async(AioConf, argvs, max_workers=2))
+    assert results[0].name == "a"
+    assert results[1] == AioConf(name="doc", inner=AioInner(lr=2.0))
+    assert isinstance(results[2], FileNotFoundError)
+    assert results[3] == AioConf()
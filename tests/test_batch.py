@@ -0,0 +1,41 @@
+from pydantic import ValidationError
+
+from lunaconf import LunaConf, lunaconf_cli_batch
+
+
+class BatchConf(LunaConf):
+    index: int = 0
+    name: str = "default"
+
+
+def test_batch_in_process():
+    argvs = [["index=1"], ["index=abc"], ["index=3", "name=three"]]
+    results = lunaconf_cli_batch(BatchConf, argvs)
+    assert results[0] == BatchConf(index=1)
+    assert isinstance(results[1], ValidationError)
+    assert results[2] == BatchConf(index=3, name="three")
+
+
+def test_batch_process_pool():
+    argvs = [[f"index={i}"] for i in range(100)]
+    argvs[42] = ["index=oops"]
+    argvs[57] = ["--unknown-flag"]
+    results = lunaconf_cli_batch(
+        BatchConf, argvs, max_workers=2, chunksize=7, min_parallel=10
+    )
+    assert len(results) == 100
+    for i, res in enumerate(results):
+        if i in (42, 57):
+            assert isinstance(res, Exception)
+        else:
+            assert res == BatchConf(index=i)
+
+
+def test_batch_local_class():
+    class LocalConf(LunaConf):
+        value: int = 0
+
+    results = lunaconf_cli_batch(
+        LocalConf, [[f"value={i}"] for i in range(20)], max_workers=2, min_parallel=1
+    )
+    assert [r.value for r in results] == list(range(20))  # type: ignore
@@ -0,0 +1,37 @@
+import importlib.util
+import json
+import os
+
+BENCH = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "bench.py")
+
+
+def load_bench():
+    spec = importlib.util.spec_from_file_location("lunaconf_bench", BENCH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_bench_smoke(tmp_path):
+    bench = load_bench()
+    baseline = str(tmp_path / "baseline.json")
+    assert bench.main(["run", "--scale", "0.001", "--repeat", "1", "-o", baseline]) == 0
+    with open(baseline) as f:
+        result = json.load(f)
+    assert result["scale"] == 0.001
+    assert {
+        "adjust_conf",
+        "lunaconf_cli",
+        "lunaconf_dumps_toml",
+        "lunaconf_dump_toml",
+    } <= set(result["results"])
+
+    slower = json.loads(json.dumps(result))
+    for r in slower["results"].values():
+        r["min"] *= 2
+    assert bench.compare(result, result, 0.1) == []
+    assert bench.compare(result, slower, 0.1) == list(result["results"])
+    current = str(tmp_path / "current.json")
+    with open(current, "w") as f:
+        json.dump(slower, f)
+    assert bench.main(["compare", baseline, current]) == 1
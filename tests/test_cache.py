@@ -0,0 +1,104 @@
+import argparse
+import os
+
+from lunaconf import LunaConf, lunaconf_cli, lunaconf_gendict
+from lunaconf.formats import get_format
+
+
+class CacheConf(LunaConf):
+    name: str = "default"
+    value: float = 1.0
+    opt: int | None = 3
+
+
+def test_cache_hit(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setenv("LUNACONF_CACHE_DIR", str(cache))
+    f = tmp_path / "conf.json"
+    f.write_text('{"name": "first", "value": "<inf>", "opt": "<null>"}')
+    parsed = []
+
+    def counting_format(name):
+        fmt = get_format(name)
+        return fmt._replace(loads=lambda s: parsed.append(s) or fmt.loads(s))
+
+    monkeypatch.setattr("lunaconf.cli.get_format", counting_format)
+
+    conf = lunaconf_cli(CacheConf, ["-J", str(f)])
+    assert conf == CacheConf(name="first", value=float("inf"), opt=None)
+    assert len(list(cache.glob("*.lcc"))) == 1
+    assert len(parsed) == 1
+
+    # the cached entry is used for the second load, without parsing
+    conf = lunaconf_cli(CacheConf, ["-J", str(f)])
+    assert conf == CacheConf(name="first", value=float("inf"), opt=None)
+    assert len(list(cache.glob("*.lcc"))) == 1
+    assert len(parsed) == 1
+
+    # content changes invalidate the entry
+    f.write_text('{"name": "second"}')
+    os.utime(f, ns=(0, 0))
+    conf = lunaconf_cli(CacheConf, ["-D", str(f)])
+    assert conf.name == "second"
+
+
+def test_cache_dynamic_values(tmp_path, monkeypatch):
+    monkeypatch.setenv("LUNACONF_CACHE_DIR", str(tmp_path / "cache"))
+    f = tmp_path / "conf.toml"
+    f.write_text('name = "<env:CACHE_TEST_NAME>"\n')
+
+    monkeypatch.setenv("CACHE_TEST_NAME", "a")
+    assert lunaconf_cli(CacheConf, ["-T", str(f)]).name == "a"
+    monkeypatch.setenv("CACHE_TEST_NAME", "b")
+    assert lunaconf_cli(CacheConf, ["-T", str(f)]).name == "b"
+
+
+def test_cache_disabled(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setenv("LUNACONF_CACHE_DIR", str(cache))
+    f = tmp_path / "conf.json"
+    f.write_text('{"name": "first"}')
+
+    lunaconf_cli(CacheConf, ["--no-cache", "-J", str(f)])
+    assert not cache.exists()
+
+    monkeypatch.setenv("LUNACONF_NO_CACHE", "1")
+    lunaconf_cli(CacheConf, ["-J", str(f)])
+    assert not cache.exists()
+
+
+def test_caller_parser_keeps_no_cache(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setenv("LUNACONF_CACHE_DIR", str(cache))
+    f = tmp_path / "conf.json"
+    f.write_text('{"name": "first"}')
+
+    # an application option of the same name does not conflict
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-cache", action="store_true", dest="app_no_cache")
+    config_dict = {}
+    argspace = lunaconf_gendict(
+        config_dict, ["--no-cache", "-J", str(f)], parser=parser
+    )
+    assert argspace.app_no_cache
+    assert config_dict == {"name": "first"}
+    assert cache.exists()
+
+
+def test_cache_eviction(tmp_path, monkeypatch):
+    cache = tmp_path / "cache"
+    monkeypatch.setenv("LUNACONF_CACHE_DIR", str(cache))
+    monkeypatch.setenv("LUNACONF_CACHE_MAX_BYTES", "1")
+    for i in range(3):
+        f = tmp_path / f"conf{i}.json"
+        f.write_text(f'{{"name": "n{i}"}}')
+        assert lunaconf_cli(CacheConf, ["-J", str(f)]).name == f"n{i}"
+    assert len(list(cache.glob("*.lcc"))) == 0
+
+
+def test_cache_del(tmp_path, monkeypatch):
+    monkeypatch.setenv("LUNACONF_CACHE_DIR", str(tmp_path / "cache"))
+    f = tmp_path / "conf.json"
+    f.write_text('{"opt": "<del>"}')
+    for _ in range(2):
+        assert lunaconf_cli(CacheConf, ["opt=5", "-J", str(f)]).opt == 3
@@ -0,0 +1,133 @@
+import array
+import csv
+import enum
+import io
+import json
+import math
+import sys
+
+import pytest
+from pydantic import Field
+
+from lunaconf import (
+    LunaConf,
+    lunaconf_dump_csv,
+    lunaconf_dump_jsonl,
+    lunaconf_to_columns,
+)
+from lunaconf.columns import _numpy
+
+
+class ColMode(enum.Enum):
+    FAST = "fast"
+
+
+class ColOpt(LunaConf):
+    lr: float = 0.1
+    wd: float | None = None
+
+
+class ColConf(LunaConf):
+    name: str = "run"
+    seed: int = 0
+    flag: bool = False
+    opt: ColOpt = Field(default_factory=ColOpt)
+    tags: list[str] = Field(default_factory=list)
+    params: dict[str, float] = Field(default_factory=dict)
+    mode: ColMode = ColMode.FAST
+
+
+def configs(n: int):
+    for i in range(n):
+        yield ColConf(
+            seed=i,
+            flag=i % 2 == 0,
+            opt=ColOpt(lr=i / 2, wd=0.1 if i % 2 else None),
+            tags=["a"] * i,
+            params={"p": float(i)} if i else {},
+        )
+
+
+def test_to_columns(monkeypatch):
+    monkeypatch.setattr("lunaconf.columns._numpy", lambda: None)
+    cols = lunaconf_to_columns(configs(3))
+    assert list(cols) == [
+        "name",
+        "seed",
+        "flag",
+        "opt.lr",
+        "opt.wd",
+        "tags",
+        "mode",
+        "params.p",
+    ]
+    # paths are interned
+    assert all(path is sys.intern(path) for path in cols)
+    assert cols["name"].values == ["run"] * 3
+    assert cols["seed"].values == array.array("q", [0, 1, 2])
+    assert cols["flag"].values == array.array("b", [1, 0, 1])
+    assert cols["opt.lr"].values == array.array("d", [0.0, 0.5, 1.0])
+    wd = cols["opt.wd"]
+    assert wd.values.typecode == "d" and wd.values[1] == 0.1
+    assert math.isnan(wd.values[0]) and list(wd.mask) == [1, 0, 1]
+    assert cols["tags"].values == [[], ["a"], ["a", "a"]]
+    assert cols["mode"].values == ["fast"] * 3
+    # only present in some configurations
+    params = cols["params.p"]
+    assert list(params.mask) == [1, 0, 0] and list(params.values)[1:] == [1.0, 2.0]
+    assert lunaconf_to_columns([]) == {}
+    with pytest.raises(TypeError, match="ColConf"):
+        lunaconf_to_columns([ColConf(), ColOpt()])
+
+
+def test_to_columns_numpy():
+    np = pytest.importorskip("numpy")
+    _numpy.cache_clear()
+    cols = lunaconf_to_columns(configs(3))
+    assert cols["seed"].values.dtype == np.int64
+    assert cols["flag"].values.dtype == np.bool_
+    assert cols["opt.wd"].mask.tolist() == [True, False, True]
+    assert cols["tags"].values == [[], ["a"], ["a", "a"]]
+
+
+def test_dump_csv():
+    f = io.StringIO()
+    cols = list(lunaconf_to_columns(configs(3)))
+    assert lunaconf_dump_csv(configs(3), f, columns=cols) == 3
+    rows = list(csv.DictReader(io.StringIO(f.getvalue())))
+    assert list(rows[0]) == cols
+    assert rows[0]["opt.wd"] == "" and rows[1]["opt.wd"] == "0.1"
+    assert rows[0]["params.p"] == "" and rows[2]["params.p"] == "2.0"
+    assert json.loads(rows[2]["tags"]) == ["a", "a"]
+    # the header comes from the first configuration
+    with pytest.raises(ValueError, match="params.p"):
+        lunaconf_dump_csv(configs(3), io.StringIO())
+
+
+def test_dump_jsonl():
+    f = io.StringIO()
+    items = [*configs(2), ColConf(opt=ColOpt(lr=math.inf))]
+    assert lunaconf_dump_jsonl(iter(items), f) == 3
+    rows = [json.loads(line) for line in f.getvalue().splitlines()]
+    assert rows[0]["opt.wd"] is None and "params.p" not in rows[0]
+    assert rows[1]["params.p"] == 1.0 and rows[1]["tags"] == ["a"]
+    assert rows[2]["opt.lr"] == "<inf>"
+
+
+class ColSeries(LunaConf):
+    values: list[float] = Field(default_factory=list)
+
+
+def test_dump_csv_special_floats():
+    items = [ColSeries(values=[math.nan, -math.inf, 1.0])]
+    f = io.StringIO()
+    lunaconf_dump_csv(iter(items), f)
+    cell = next(csv.DictReader(io.StringIO(f.getvalue())))["values"]
+
+    def reject(name):
+        raise ValueError(f"Not JSON: {name}")
+
+    assert json.loads(cell, parse_constant=reject) == ["<nan>", "<-inf>", 1.0]
+    f = io.StringIO()
+    lunaconf_dump_jsonl(iter(items), f)
+    assert json.loads(f.getvalue())["values"] == json.loads(cell)
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+from pydantic import Field
+
+from lunaconf import LunaConf, lunaconf_cli
+from lunaconf import cli as lunaconf_cli_module
+
+
+class IncludeConf(LunaConf):
+    a: int = 0
+    b: int = 0
+    log: list[int] = Field(default_factory=list)
+
+
+def write(path, content):
+    path.write_text(content)
+    return str(path)
+
+
+def test_nested_and_repeated_includes(tmp_path):
+    base = write(tmp_path / "base.args", "a=1\nlog.100=<del>  # no-op\n")
+    mid = write(tmp_path / "mid.args", f"-C {base}\nb=2\n-C {base}\n")
+    top = write(
+        tmp_path / "top.args",
+        f'-C {mid}\n-j {{"log": [1]}}\n-C {base}\nlog.1=2\n',
+    )
+    conf = lunaconf_cli(IncludeConf, ["-C", top, "-C", mid, "a=5"])
+    assert conf == IncludeConf(a=5, b=2, log=[1, 2])
+
+
+def test_include_cycle(tmp_path):
+    first = tmp_path / "first.args"
+    second = write(tmp_path / "second.args", f"b=1\n-C {first}\n")
+    write(first, f"a=1\n-C {second}\n")
+    with pytest.raises(ValueError, match="include each other"):
+        lunaconf_cli(IncludeConf, ["-C", str(first)])
+
+    self_include = tmp_path / "self.args"
+    write(self_include, f"-C {self_include}\n")
+    with pytest.raises(ValueError, match="include each other"):
+        lunaconf_cli(IncludeConf, ["-C", str(self_include)])
+
+
+def test_command_file_memoized(tmp_path, monkeypatch):
+    path = write(tmp_path / "conf.args", "a=1\n")
+    assert lunaconf_cli(IncludeConf, ["-C", path]).a == 1
+    monkeypatch.setattr(lunaconf_cli_module, "open", None, raising=False)
+    # the file is not opened again while it is unchanged
+    assert lunaconf_cli(IncludeConf, ["-C", path, "-C", path]).a == 1
+    monkeypatch.undo()
+
+    write(tmp_path / "conf.args", "a=22\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert lunaconf_cli(IncludeConf, ["-C", path]).a == 22
@@ -0,0 +1,80 @@
+import math
+from typing import Self
+
+from pydantic import Field
+
+from lunaconf import (
+    LunaConf,
+    lunaconf_cli,
+    lunaconf_defaults,
+    lunaconf_invalidate_defaults,
+)
+
+
+class DefInner(LunaConf):
+    values: list[float] = Field(default_factory=lambda: [1.0, math.nan])
+    table: dict[str, int] = Field(default_factory=lambda: {"a": 1, "b": 2})
+
+
+class DefConf(LunaConf):
+    name: str
+    flag: bool = True
+    inner: DefInner = Field(default_factory=DefInner)
+
+    @classmethod
+    def __lunaconf_default__(cls) -> Self:
+        return cls(name="default")
+
+
+def test_defaults_cached_and_seed_independent():
+    defaults = lunaconf_defaults(DefConf)
+    assert lunaconf_defaults(DefConf) is defaults
+    assert defaults.instance == DefConf(name="default")
+
+    seed = defaults.seed()
+    assert seed == defaults.dump or repr(seed) == repr(defaults.dump)
+    seed["inner"]["values"].append(3.0)
+    seed["inner"]["table"]["c"] = 3
+    assert defaults.dump["inner"]["values"][0] == 1.0
+    assert len(defaults.dump["inner"]["values"]) == 2
+    assert "c" not in defaults.dump["inner"]["table"]
+
+    # resolutions never write into the cache
+    conf = lunaconf_cli(DefConf, ["inner.values.0=5", "inner.table.a=<del>"])
+    assert conf.inner.values[0] == 5.0
+    assert defaults.dump["inner"]["values"][0] == 1.0
+    assert defaults.dump["inner"]["table"] == {"a": 1, "b": 2}
+
+
+def test_defaults_diff():
+    defaults = lunaconf_defaults(DefConf)
+    assert defaults.diff(defaults.seed()) == {}
+
+    conf = lunaconf_cli(
+        DefConf, ["flag=1", "inner.table.a=<del>", "inner.table.c=3", "name=x"]
+    )
+    assert defaults.diff(conf.model_dump()) == {
+        "name": "x",
+        "inner": {"table": {"a": "<del>", "c": 3}},
+    }
+    # `1` is not the default `True` even though they compare equal
+    assert defaults.diff({**defaults.seed(), "flag": 1}) == {"flag": 1}
+
+
+def test_defaults_invalidate():
+    class Dynamic(LunaConf):
+        x: int = 0
+
+        @classmethod
+        def __lunaconf_default__(cls) -> Self:
+            return cls(x=state["x"])
+
+    state = {"x": 1}
+    assert lunaconf_cli(Dynamic, []).x == 1
+    state["x"] = 2
+    assert lunaconf_cli(Dynamic, []).x == 1
+    lunaconf_invalidate_defaults(Dynamic)
+    assert lunaconf_cli(Dynamic, []).x == 2
+    state["x"] = 3
+    lunaconf_invalidate_defaults()
+    assert lunaconf_cli(Dynamic, []).x == 3
@@ -0,0 +1,142 @@
+import random
+
+import pytest
+from pydantic import Field, ValidationError, field_validator
+
+from lunaconf import LunaConf, lunaconf_cli
+from lunaconf.cli import adjust_conf_command
+
+
+class DeltaLeaf(LunaConf):
+    x: int = 0
+    values: list[float] = Field(default_factory=lambda: [1.0, 2.0])
+
+
+class DeltaMid(LunaConf):
+    leaf: DeltaLeaf = Field(default_factory=DeltaLeaf)
+    leaves: list[DeltaLeaf] = Field(default_factory=lambda: [DeltaLeaf()] * 3)
+    named: dict[str, DeltaLeaf] = Field(
+        default_factory=lambda: {"a": DeltaLeaf(), "b": DeltaLeaf(x=1)}
+    )
+
+
+class DeltaConf(LunaConf):
+    name: str = "base"
+    mid: DeltaMid = Field(default_factory=DeltaMid)
+    other: DeltaMid = Field(default_factory=DeltaMid)
+    maybe: DeltaLeaf | None = None
+
+
+class RawConf(LunaConf):
+    tags: list[str] = Field(default_factory=list)
+    leaf: DeltaLeaf = Field(default_factory=DeltaLeaf)
+
+    @field_validator("tags", mode="before")
+    @classmethod
+    def _split(cls, v):
+        return v.split(",") if isinstance(v, str) else v
+
+
+def test_apply_shares_untouched():
+    base = lunaconf_cli(DeltaConf, ["mid.leaf.x=1"])
+    new = base.lunaconf_apply(["mid.leaves.1.x=5", "mid.named.b.values.0=<del>"])
+
+    assert new.mid.leaves[1].x == 5
+    assert new.mid.named["b"].values == [2.0]
+    assert base.mid.leaves[1].x == 0
+    assert base.mid.named["b"].values == [1.0, 2.0]
+
+    assert new.other is base.other
+    assert new.mid.leaf is base.mid.leaf
+    assert new.mid.leaves[0] is base.mid.leaves[0]
+    assert new.mid.named["a"] is base.mid.named["a"]
+    assert new.mid.leaves[1] is not base.mid.leaves[1]
+
+
+def test_apply_no_args():
+    base = lunaconf_cli(DeltaConf, [])
+    assert base.lunaconf_apply([]) is base
+
+
+def test_apply_validates():
+    base = lunaconf_cli(DeltaConf, [])
+    with pytest.raises(ValidationError):
+        base.lunaconf_apply(["mid.leaf.x=abc"])
+    with pytest.raises(ValidationError):
+        base.lunaconf_apply(["mid.leaves.5.x=1"])
+
+
+def test_apply_raw_validators():
+    base = lunaconf_cli(RawConf, ["tags=a,b"])
+    assert base.tags == ["a", "b"]
+    new = base.lunaconf_apply(["leaf.x=2"])
+    assert new.tags == ["a", "b"]
+    assert new.leaf.x == 2
+    assert new.lunaconf_apply(["tags=c"]).tags == ["c"]
+
+
+PATHS = [
+    "name",
+    "maybe",
+    "maybe.x",
+    "mid",
+    "mid.leaf",
+    "mid.leaf.x",
+    "mid.leaf.values",
+    "mid.leaf.values.0",
+    "mid.leaf.values.2",
+    "mid.leaves",
+    "mid.leaves.0",
+    "mid.leaves.1.x",
+    "mid.leaves.2.values.1",
+    "mid.named.a.x",
+    "mid.named.c",
+    "mid.named.b",
+    "other.leaf.x",
+]
+
+
+def _random_value(rng, path):
+    last = path.rsplit(".", 1)[-1]
+    choices = ["<del>"]
+    if path in ("maybe", "mid.leaf", "mid.leaves.0", "mid.named.b", "mid.named.c"):
+        choices += ['{"x": 7}', "<null>" if last == "maybe" else "{}"]
+    elif last == "x":
+        choices += [str(rng.randint(0, 9))]
+    elif last.isdigit():
+        choices += [str(rng.random())]
+    elif last == "name":
+        choices += ["n" + str(rng.randint(0, 9))]
+    elif last == "values":
+        choices += ["[3.5]", "[]"]
+    elif last == "leaves":
+        choices += ['[{"x": 2}]', "[]"]
+    else:
+        choices += ["{}"]
+    return rng.choice(choices)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_apply_matches_cli(seed):
+    rng = random.Random(seed)
+    base_args = [
+        f"{p}={_random_value(rng, p)}" for p in rng.sample(PATHS, rng.randint(0, 3))
+    ]
+    delta = [
+        f"{p}={_random_value(rng, p)}" for p in rng.choices(PATHS, k=rng.randint(1, 5))
+    ]
+    try:
+        base = lunaconf_cli(DeltaConf, base_args)
+    except ValidationError:
+        return
+    # what applying the delta took before: dump, adjust and validate again
+    config_dict = base.model_dump()
+    try:
+        for cmd in delta:
+            adjust_conf_command(config_dict, cmd)
+        expected = DeltaConf.model_validate(config_dict)
+    except ValidationError:
+        with pytest.raises(ValidationError):
+            base.lunaconf_apply(delta)
+        return
+    assert base.lunaconf_apply(delta) == expected
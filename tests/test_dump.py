@@ -0,0 +1,143 @@
+import io
+import json
+import tomllib
+
+import pytest
+from pydantic import ConfigDict, Field
+
+from lunaconf import LunaConf, lunaconf_cli
+from lunaconf.cli import _handle_special_values
+from lunaconf.dump import (
+    lunaconf_dump_json,
+    lunaconf_dump_toml,
+    lunaconf_dumps_json,
+    lunaconf_dumps_toml,
+)
+
+
+class DumpLeaf(LunaConf):
+    x: int = 1
+    name: str = "leaf"
+
+
+class DumpInner(LunaConf):
+    values: list[float] = Field(default_factory=lambda: [1.0, 2.0])
+    leaves: list[DumpLeaf] = Field(default_factory=lambda: [DumpLeaf(), DumpLeaf()])
+    opt: int | None = None
+
+
+class DumpConf(LunaConf):
+    a: int = 0
+    text: str = 'quote " ünïcode'
+    empty: dict[str, int] = Field(default_factory=dict)
+    mapping: dict[str, int] = Field(default_factory=lambda: {"k.1": 1, "k2": 2})
+    nested: list[list[int]] = Field(default_factory=lambda: [[1], [2, 3]])
+    inner: DumpInner = Field(default_factory=DumpInner)
+
+
+ARGS = [
+    [],
+    ["a=5", "inner.values.1=<inf>", "inner.values.2=<nan>", "inner.opt=3"],
+    ["inner.leaves.0.x=9", "inner.leaves.1=<del>", "mapping.k2=<del>"],
+]
+
+
+@pytest.mark.parametrize("args", ARGS)
+@pytest.mark.parametrize("indent", [2, 0, 4, None])
+@pytest.mark.parametrize("exclude_defaults", [False, True])
+def test_dump_json_matches_dumps(args, indent, exclude_defaults):
+    conf = lunaconf_cli(DumpConf, args)
+    fp = io.StringIO()
+    lunaconf_dump_json(conf, fp, indent=indent, exclude_defaults=exclude_defaults)
+    assert fp.getvalue() == lunaconf_dumps_json(
+        conf, indent=indent, exclude_defaults=exclude_defaults
+    )
+
+
+@pytest.mark.parametrize("args", ARGS)
+@pytest.mark.parametrize("exclude_defaults", [False, True])
+def test_dump_toml_matches_dumps(args, exclude_defaults):
+    conf = lunaconf_cli(DumpConf, args)
+    fp = io.StringIO()
+    lunaconf_dump_toml(conf, fp, exclude_defaults=exclude_defaults)
+    expected = tomllib.loads(
+        lunaconf_dumps_toml(conf, exclude_defaults=exclude_defaults)
+    )
+    # `repr` so that NaN compares equal to itself
+    assert repr(tomllib.loads(fp.getvalue())) == repr(expected)
+
+
+class DumpExtra(LunaConf):
+    model_config = ConfigDict(extra="allow")
+
+    token: str = Field(default="hunter2", exclude=True)
+    opt: int | None = None
+    leaf: DumpLeaf = Field(default_factory=DumpLeaf)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"exclude_none": True},
+        {"exclude_defaults": True},
+        {"exclude_unset": True},
+        {"exclude_none": True, "exclude_unset": True},
+    ],
+)
+def test_dump_excluded_and_extra_match_dumps(options):
+    conf = lunaconf_cli(
+        DumpExtra, ["-j", '{"gone": null, "kept": 1}', "token=secret", "leaf.x=2"]
+    )
+    fp = io.StringIO()
+    lunaconf_dump_json(conf, fp, **options)
+    assert fp.getvalue() == lunaconf_dumps_json(conf, **options)
+    assert "secret" not in fp.getvalue()
+
+    fp = io.StringIO()
+    lunaconf_dump_toml(conf, fp, **options)
+    expected = tomllib.loads(lunaconf_dumps_toml(conf, **options))
+    assert tomllib.loads(fp.getvalue()) == expected
+
+
+def test_dump_cli_excluded(capsys):
+    for flag in ("-p", "-P"):
+        with pytest.raises(SystemExit):
+            lunaconf_cli(DumpExtra, ["opt=1", "-a", flag])
+        out = capsys.readouterr().out
+        assert "hunter2" not in out
+        assert "opt" in out
+
+
+@pytest.mark.parametrize("args", ARGS)
+def test_dump_toml_round_trip(args):
+    conf = lunaconf_cli(DumpConf, args)
+    fp = io.StringIO()
+    lunaconf_dump_toml(conf, fp)
+    # not the same text as `lunaconf_dumps_toml`, but the same configuration
+    for text in (fp.getvalue(), lunaconf_dumps_toml(conf)):
+        loaded = DumpConf.model_validate(_handle_special_values(tomllib.loads(text)))
+        assert repr(loaded) == repr(conf)
+
+
+def test_dump_other_options():
+    conf = lunaconf_cli(DumpConf, ["inner.opt=3"])
+    fp = io.StringIO()
+    lunaconf_dump_json(conf, fp, exclude={"inner"})
+    assert fp.getvalue() == lunaconf_dumps_json(conf, exclude={"inner"})
+    assert "inner" not in json.loads(fp.getvalue())
+
+
+def test_dump_cli(capsys):
+    with pytest.raises(SystemExit):
+        lunaconf_cli(DumpConf, ["a=3", "-p", "--json-indent", "0"])
+    out = capsys.readouterr().out
+    expected = lunaconf_dumps_json(DumpConf(a=3), indent=0, exclude_defaults=True)
+    assert out == expected + "\n"
+
+    with pytest.raises(SystemExit):
+        lunaconf_cli(DumpConf, ["inner.leaves.0.x=4", "-a", "-P"])
+    out = capsys.readouterr().out
+    expected = lunaconf_cli(DumpConf, ["inner.leaves.0.x=4"]).model_dump()
+    expected["inner"]["opt"] = "<null>"
+    assert tomllib.loads(out) == expected
@@ -0,0 +1,84 @@
+import enum
+import gc
+
+from pydantic import ConfigDict, Field, create_model
+
+from lunaconf import LunaConf, lunaconf_fingerprint
+from lunaconf.fingerprint import _MEMO
+
+
+class Mode(enum.Enum):
+    FAST = "fast"
+    SLOW = "slow"
+
+
+class FpOpt(LunaConf):
+    model_config = ConfigDict(frozen=True)
+
+    lr: float = 0.1
+    betas: tuple[float, float] = (0.9, 0.99)
+
+
+class FpConf(LunaConf):
+    name: str = "run"
+    mode: Mode = Mode.FAST
+    opt: FpOpt = Field(default_factory=FpOpt)
+    weights: dict[str, float] = Field(default_factory=dict)
+    layers: list[int] = Field(default_factory=lambda: [1, 2])
+
+
+def test_fingerprint_canonical():
+    base = lunaconf_fingerprint(FpConf())
+    assert base.startswith("v1:")
+    assert lunaconf_fingerprint(FpConf()) == base
+    # key order and NaN do not matter, any value does
+    assert lunaconf_fingerprint(
+        FpConf(weights={"a": 1.0, "b": float("nan")})
+    ) == lunaconf_fingerprint(FpConf(weights={"b": float("nan"), "a": 1.0}))
+    assert lunaconf_fingerprint(FpConf(weights={"a": -0.0})) == lunaconf_fingerprint(
+        FpConf(weights={"a": 0.0})
+    )
+    for changed in (
+        FpConf(name="other"),
+        FpConf(mode=Mode.SLOW),
+        FpConf(opt=FpOpt(lr=0.2)),
+        FpConf(layers=[2, 1]),
+        FpConf(layers=[1, 2, 3]),
+        FpConf(weights={"a": 1.0}),
+    ):
+        assert lunaconf_fingerprint(changed) != base
+    # strings are length-prefixed, so fields cannot run into each other
+    assert lunaconf_fingerprint(FpConf(name="a", layers=[])) != lunaconf_fingerprint(
+        FpConf(name="a[]", layers=[])
+    )
+
+
+def test_fingerprint_exclude_defaults():
+    # the same configuration after a field with a default was added
+    extended = create_model(
+        "FpConf", __base__=FpConf, extra_field=(int, Field(default=3))
+    )
+    assert lunaconf_fingerprint(extended()) != lunaconf_fingerprint(FpConf())
+    assert lunaconf_fingerprint(
+        extended(name="x"), exclude_defaults=True
+    ) == lunaconf_fingerprint(FpConf(name="x"), exclude_defaults=True)
+    assert lunaconf_fingerprint(
+        extended(extra_field=4), exclude_defaults=True
+    ) != lunaconf_fingerprint(FpConf(), exclude_defaults=True)
+
+
+def test_fingerprint_memo():
+    opt = FpOpt(lr=0.5)
+    first = FpConf(opt=opt)
+    fp = lunaconf_fingerprint(first)
+    assert any(ref() is opt for ref, _ in _MEMO.values())
+    # a shared frozen submodel is hashed once
+    assert lunaconf_fingerprint(FpConf(opt=opt, name="b")) != fp
+    assert lunaconf_fingerprint(FpConf(opt=FpOpt(lr=0.5))) == fp
+
+    # only frozen models are remembered
+    assert not any(isinstance(ref(), FpConf) for ref, _ in _MEMO.values())
+    del opt, first
+    gc.collect()
+    # and forgotten with them
+    assert all(ref() is not None for ref, _ in _MEMO.values())
@@ -0,0 +1,145 @@
+import json
+import logging
+
+import pytest
+
+from lunaconf import LunaConf, lunaconf_cli, lunaconf_register_format
+from lunaconf.formats import (
+    _EXTENSIONS,
+    _FORMATS,
+    _json_loads,
+    _toml_loads,
+    loads_detect,
+    sniff_format,
+)
+
+
+class FormatConf(LunaConf):
+    name: str = "default"
+    big: int = 0
+
+
+def _loads_kv(s: str) -> dict[str, str]:
+    d = {}
+    for line in s.splitlines():
+        if ":" not in line:
+            raise ValueError(f"Not a key-value line: {line}")
+        k, v = line.split(":", 1)
+        d[k.strip()] = v.strip()
+    return d
+
+
+@pytest.fixture
+def kv_format():
+    lunaconf_register_format("kv", _loads_kv, extensions=(".kv",))
+    yield
+    del _FORMATS["kv"]
+    del _EXTENSIONS[".kv"]
+
+
+def test_json_backend():
+    assert _json_loads('{"a": [1, 2.5, "x"]}') == {"a": [1, 2.5, "x"]}
+    # values orjson cannot represent exactly are left to `json`
+    assert _json_loads('{"a": 123456789012345678901234}') == {
+        "a": 123456789012345678901234
+    }
+    assert _json_loads('{"a": NaN}')["a"] != _json_loads('{"a": NaN}')["a"]
+    with pytest.raises(json.JSONDecodeError):
+        _json_loads('{"a": }')
+
+
+def test_toml_backend():
+    assert _toml_loads('a = 1\n[b]\nc = "x"\n') == {"a": 1, "b": {"c": "x"}}
+
+
+def test_custom_format(tmp_path, kv_format):
+    f = tmp_path / "conf.kv"
+    f.write_text("name: from-kv\n")
+    assert lunaconf_cli(FormatConf, ["-D", str(f)]).name == "from-kv"
+    assert lunaconf_cli(FormatConf, ["-d", "name: inline"]).name == "inline"
+    # JSON and TOML are still detected first for strings
+    assert loads_detect('{"name": "x"}') == {"name": "x"}
+
+
+class SharedInner(LunaConf):
+    v: int = 0
+    tags: list[str] = []
+
+
+class SharedConf(LunaConf):
+    a: SharedInner | None = None
+    b: SharedInner | None = None
+    lists: list[list[int]] = []
+
+
+def _loads_shared(s: str) -> dict:
+    # like `yaml.safe_load` on `a: &x {...}` / `b: *x`
+    inner = {"v": 1, "tags": []}
+    empty: list[int] = []
+    return {"a": inner, "b": inner, "lists": [empty, empty]}
+
+
+@pytest.fixture
+def shared_format():
+    lunaconf_register_format("shared", _loads_shared, extensions=(".shared",))
+    yield
+    del _FORMATS["shared"]
+    del _EXTENSIONS[".shared"]
+
+
+def test_shared_subtrees_are_copied(tmp_path, shared_format):
+    f = tmp_path / "conf.shared"
+    f.write_text("a: &x {v: 1}\nb: *x\n")
+    conf = lunaconf_cli(
+        SharedConf, ["-D", str(f), "a.v=2", "a.tags.0=x", "lists.0.0=3"]
+    )
+    assert conf.a == SharedInner(v=2, tags=["x"])
+    assert conf.b == SharedInner(v=1)
+    assert conf.lists == [[3], []]
+
+
+def test_extension_preference(tmp_path):
+    f = tmp_path / "conf.toml"
+    f.write_text('name = "toml"\nbig = 123456789012345678901234\n')
+    conf = lunaconf_cli(FormatConf, ["-D", str(f)])
+    assert conf == FormatConf(name="toml", big=123456789012345678901234)
+
+    with pytest.raises(ValueError, match="Cannot detect"):
+        lunaconf_cli(FormatConf, ["-d", "name: x"])
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"name": "x"}', "json"),
+        ("  [1, 2, 3]", "json"),
+        ('"just a string"', "json"),
+        ('name = "x"\n', "toml"),
+        ("# comment\nname = 1", "toml"),
+        ("[tags]\nk = 1", "toml"),
+        ("[[tags]]\nk = 1", "toml"),
+        ('"quoted key" = 1', "toml"),
+        ("", "toml"),
+        # valid in both formats: fall back to trying JSON first
+        ("[1]", None),
+        ('["a"]', None),
+    ],
+)
+def test_sniff(text, expected):
+    fmt, _ = sniff_format(text)
+    assert (fmt and fmt.name) == expected
+
+
+def test_sniff_parses_once(tmp_path, caplog):
+    f = tmp_path / "conf.cfg"
+    f.write_text('name = "x"\n')
+    with caplog.at_level(logging.DEBUG, logger="lunaconf"):
+        assert loads_detect(f.read_text(), str(f)) == {"name": "x"}
+    assert "trying toml, json (content)" in caplog.text
+    assert "as toml" in caplog.text
+
+    # the extension decides when the content is ambiguous
+    f = tmp_path / "conf.toml"
+    f.write_text("[1]\n")
+    assert loads_detect(f.read_text(), str(f)) == {"1": {}}
+    assert loads_detect("[1]\n") == [1]
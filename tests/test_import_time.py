@@ -0,0 +1,50 @@
+import subprocess
+import sys
+
+# Cold `import lunaconf` must stay a small fraction of importing pydantic,
+# measured in the same run so that the check holds on slow or loaded machines.
+IMPORT_TIME_MAX_RATIO = 0.1
+
+
+def _run(code: str) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_import_time_budget():
+    # run once so that the bytecode cache is warm
+    _run("import lunaconf, pydantic")
+    proc = _run("import lunaconf; import pydantic")
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if name.strip() in ("lunaconf", "pydantic"):
+            cumulative[name.strip()] = int(cumulative_us)
+    assert cumulative["lunaconf"] < IMPORT_TIME_MAX_RATIO * cumulative["pydantic"]
+
+
+def test_import_is_lazy():
+    heavy = ["argparse", "pydantic", "toml", "typing"]
+    proc = _run(
+        f"import sys, lunaconf; print([m for m in {heavy!r} if m in sys.modules])"
+    )
+    assert proc.stdout.strip() == "[]"
+
+
+def test_backends_loaded_on_demand(tmp_path):
+    f = tmp_path / "conf.json"
+    f.write_text('{"a": 2}')
+    proc = _run(
+        "import sys, lunaconf\n"
+        "class Conf(lunaconf.LunaConf):\n"
+        "    a: int = 1\n"
+        f"assert lunaconf.lunaconf_cli(Conf, ['-J', {str(f)!r}]).a == 2\n"
+        "print('toml' in sys.modules)"
+    )
+    assert proc.stdout.strip() == "False"
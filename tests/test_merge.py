@@ -0,0 +1,262 @@
+import copy
+import json
+import pickle
+import random
+from typing import Any
+
+import pytest
+
+from lunaconf import LunaConf, lunaconf_cli, lunaconf_gendict
+from lunaconf.cli import (
+    _DEL_OBJ,
+    _handle_special_values,
+    _parse_command_value,
+    adjust_conf,
+    adjust_conf_command,
+    adjust_conf_multilevel_data_structure,
+)
+
+
+# The original one-override-at-a-time implementation, kept as a reference.
+def reference_adjust_conf(now, keys, value):
+    if len(keys) == 0:
+        raise ValueError("Keys cannot be empty")
+    key = keys[0]
+    if len(keys) == 1:
+        if key.isdigit():
+            if now is None or not isinstance(now, list):
+                now = []
+            index = int(key)
+            if value is _DEL_OBJ:
+                if index < len(now):
+                    del now[index]
+            else:
+                if index >= len(now):
+                    now.extend([None] * (index - len(now) + 1))
+                now[index] = value
+        elif key.isidentifier():
+            if now is None or not isinstance(now, dict):
+                now = {}
+            if value is _DEL_OBJ:
+                if key in now:
+                    del now[key]
+            else:
+                now[key] = value
+        else:
+            raise TypeError(f"Cannot set value for key '{key}' in {type(now)}")
+    else:
+        if key.isdigit():
+            if now is None or not isinstance(now, list):
+                now = []
+            index = int(key)
+            if index >= len(now):
+                now.extend([None] * (index - len(now) + 1))
+            now[index] = reference_adjust_conf(now[index], keys[1:], value)
+        elif key.isidentifier():
+            if now is None or not isinstance(now, dict):
+                now = {}
+            if key not in now:
+                now[key] = None
+            now[key] = reference_adjust_conf(now[key], keys[1:], value)
+        else:
+            raise TypeError(f"Cannot set value for key '{key}' in {type(now)}")
+    return now
+
+
+def reference_multilevel(config_dict, obj, prefix=None):
+    def adjust_inner(obj, prefix):
+        if isinstance(obj, dict):
+            if len(obj) == 0:
+                reference_adjust_conf(config_dict, prefix, {})
+            for k, v in obj.items():
+                prefix.append(k)
+                if isinstance(v, (dict, list)):
+                    adjust_inner(v, prefix)
+                else:
+                    reference_adjust_conf(config_dict, prefix, v)
+                prefix.pop()
+        else:
+            if len(obj) == 0:
+                reference_adjust_conf(config_dict, prefix, [])
+            for i, v in enumerate(obj):
+                prefix.append(str(i))
+                if isinstance(v, (dict, list)):
+                    adjust_inner(v, prefix)
+                else:
+                    reference_adjust_conf(config_dict, prefix, v)
+                prefix.pop()
+
+    adjust_inner(_handle_special_values(obj), list(prefix or []))
+
+
+_KEYS = ["a", "b", "c", "0", "1", "3"]
+_VALUES = ["1", "x", "<del>", "<null>", "[1, 2]", "{}", '{"a": 1}']
+
+
+def random_tree(rng, depth=3):
+    if depth == 0 or rng.random() < 0.3:
+        return rng.choice([1, "s", None, 2.5, "<del>"])
+    if rng.random() < 0.5:
+        keys = rng.choices(["a", "b", "c", "0", "2"], weights=[3, 3, 3, 1, 1], k=3)
+        return {k: random_tree(rng, depth - 1) for k in keys}
+    return [random_tree(rng, depth - 1) for _ in range(rng.randint(0, 3))]
+
+
+def random_base(rng):
+    base = random_tree(rng, 4)
+    return base if isinstance(base, dict) else {"a": base}
+
+
+def strip_del(tree):
+    return json.loads(json.dumps(tree).replace('"<del>"', '"del"'))
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_commands_match_reference(seed):
+    rng = random.Random(seed)
+    base = strip_del(random_base(rng))
+    cmds = [
+        ".".join(rng.choice(_KEYS) for _ in range(rng.randint(1, 3)))
+        + "="
+        + rng.choice(_VALUES)
+        for _ in range(rng.randint(1, 8))
+    ]
+
+    expected = copy.deepcopy(base)
+    for cmd in cmds:
+        key_str, value_str = cmd.split("=")
+        reference_adjust_conf(
+            expected, key_str.split("."), _parse_command_value(value_str)
+        )
+
+    actual = copy.deepcopy(base)
+    adjust_conf_command(actual, "; ".join(cmds))
+    assert actual == expected
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_documents_match_reference(seed):
+    rng = random.Random(seed)
+    base = strip_del(random_base(rng))
+    doc = random_base(rng)
+    prefix = [rng.choice("ab")] if rng.random() < 0.2 else None
+
+    expected = copy.deepcopy(base)
+    reference_multilevel(expected, copy.deepcopy(doc), prefix)
+
+    actual = copy.deepcopy(base)
+    adjust_conf_multilevel_data_structure(actual, copy.deepcopy(doc), prefix)
+    assert actual == expected
+
+
+def test_adjust_conf_errors():
+    with pytest.raises(ValueError):
+        adjust_conf({}, [], 1)
+    with pytest.raises(TypeError):
+        adjust_conf({}, ["a", "b-c"], 1)
+    with pytest.raises(ValueError):
+        adjust_conf_multilevel_data_structure({}, {})
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_deep_documents_match_reference(seed):
+    rng = random.Random(seed)
+    base = strip_del(random_tree(rng, 6))
+    base = base if isinstance(base, dict) else {"a": base}
+    doc = {"a": random_tree(rng, 6), "b": random_tree(rng, 6)}
+
+    expected = copy.deepcopy(base)
+    reference_multilevel(expected, copy.deepcopy(doc))
+
+    actual = copy.deepcopy(base)
+    adjust_conf_multilevel_data_structure(actual, copy.deepcopy(doc))
+    assert actual == expected
+
+
+def test_large_list_merge():
+    config_dict = {"lst": list(range(10)), "nested": {"keep": 1}}
+    doc = {
+        "lst": list(range(200_000)),
+        "nested": {"new": {"items": [{"x": i} for i in range(1000)]}},
+    }
+    adjust_conf_multilevel_data_structure(config_dict, doc)
+    assert config_dict["lst"] == list(range(200_000))
+    assert config_dict["nested"]["keep"] == 1
+    assert config_dict["nested"]["new"]["items"][999] == {"x": 999}
+
+    # a shorter list only overwrites the leading elements
+    adjust_conf_multilevel_data_structure(config_dict, {"lst": ["a", "b"]})
+    assert config_dict["lst"][:3] == ["a", "b", 2]
+    assert len(config_dict["lst"]) == 200_000
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_sparse_commands_match_reference(seed):
+    rng = random.Random(seed)
+    keys = ["a", "b", "0", "2", "70", "100", "250"]
+    base = {"a": list(range(rng.randint(0, 5))), "b": {}}
+    cmds = [
+        ".".join(rng.choice(keys) for _ in range(rng.randint(1, 3)))
+        + "="
+        + rng.choice(_VALUES)
+        for _ in range(rng.randint(1, 12))
+    ]
+
+    doc = rng.choice([None, {"a": [1, [2]]}, {"b": {"100": 1}}])
+
+    expected = copy.deepcopy(base)
+    actual = copy.deepcopy(base)
+    for i in range(0, len(cmds), 4):
+        for cmd in cmds[i : i + 4]:
+            key_str, value_str = cmd.split("=")
+            reference_adjust_conf(
+                expected, key_str.split("."), _parse_command_value(value_str)
+            )
+        adjust_conf_command(actual, "; ".join(cmds[i : i + 4]))
+        if doc is not None:
+            reference_multilevel(expected, copy.deepcopy(doc))
+            adjust_conf_multilevel_data_structure(actual, copy.deepcopy(doc))
+    assert actual == expected
+
+
+def test_max_list_gap(monkeypatch):
+    config_dict = {"lst": [1]}
+    with pytest.raises(ValueError, match="past the end"):
+        adjust_conf_command(config_dict, "lst.100000000=1")
+    assert config_dict == {"lst": [1]}
+
+    monkeypatch.setenv("LUNACONF_MAX_LIST_GAP", "10")
+    adjust_conf_command(config_dict, "lst.11=2")
+    with pytest.raises(ValueError, match="LUNACONF_MAX_LIST_GAP"):
+        adjust_conf_command(config_dict, "lst.100=1")
+    assert adjust_conf([], ["3"], 1) == [None, None, None, 1]
+
+    # padded gaps are limited as well
+    monkeypatch.setenv("LUNACONF_MAX_LIST_GAP", "5")
+    with pytest.raises(ValueError, match="LUNACONF_MAX_LIST_GAP"):
+        adjust_conf_command(config_dict, "lst.50=1")
+    adjust_conf_command(config_dict, "lst.17=3")
+    assert config_dict["lst"][17] == 3
+
+
+class SparseConf(LunaConf):
+    a: Any = None
+    b: list[Any] = []
+
+
+def test_sparse_lists_are_plain():
+    config_dict = {"lst": [1], "nested": {}}
+    adjust_conf_command(config_dict, "lst.100=1; nested.xs.200.a=2; lst.300=3")
+    assert type(config_dict["lst"]) is list
+    assert type(config_dict["nested"]["xs"]) is list
+    assert config_dict["lst"][100] == 1 and len(config_dict["lst"]) == 301
+    assert config_dict["nested"]["xs"][200] == {"a": 2}
+    assert pickle.loads(pickle.dumps(config_dict)) == config_dict
+    assert type(adjust_conf([], ["100"], 1)) is list
+
+    config_dict = {}
+    lunaconf_gendict(config_dict, ["a.100=1", "b.c.200=2"])
+    assert type(config_dict["a"]) is list and type(config_dict["b"]["c"]) is list
+    conf = lunaconf_cli(SparseConf, ["a.100=1", "b.200=2"])
+    assert type(conf.a) is list and type(conf.b) is list
+    assert conf.a[100] == 1 and conf.b[200] == 2
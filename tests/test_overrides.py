@@ -0,0 +1,115 @@
+import math
+import random
+import shlex
+
+import pytest
+from pydantic import Field
+
+from lunaconf import (
+    LunaConf,
+    lunaconf_cli,
+    lunaconf_defaults,
+    lunaconf_fingerprint,
+    lunaconf_gendict,
+    lunaconf_overrides,
+)
+
+
+class OvLayer(LunaConf):
+    width: int = 8
+    act: str = "relu"
+
+
+class OvConf(LunaConf):
+    name: str = "run"
+    items: list[int] = Field(default_factory=lambda: list(range(20)))
+    layers: list[OvLayer] = Field(
+        default_factory=lambda: [OvLayer(width=i) for i in range(5)]
+    )
+    weights: dict[str, float] = Field(default_factory=lambda: {"a": 1.0, "b": 2.0})
+    shape: tuple[int, int] = (1, 2)
+    note: str | None = None
+
+
+def replay(config: OvConf, base: OvConf | None = None) -> list[str]:
+    cmds = lunaconf_overrides(config, base)
+    d = (base or OvConf()).model_dump()
+    lunaconf_gendict(d, cmds, cls=OvConf)
+    # fingerprints, since NaN != NaN
+    assert lunaconf_fingerprint(OvConf.model_validate(d)) == lunaconf_fingerprint(
+        config
+    )
+    return cmds
+
+
+def test_overrides_minimal():
+    assert replay(OvConf()) == []
+    items = list(range(20))
+    assert replay(OvConf(items=[*items, 5])) == ["items.20=5"]
+    assert replay(OvConf(items=[x for x in items if x != 7])) == ["items.7=<del>"]
+    assert replay(OvConf(items=[99 if x == 7 else x for x in items])) == ["items.7=99"]
+    # shorter written whole
+    assert replay(OvConf(items=[1, 2])) == ["items=[1,2]"]
+    layers = [OvLayer(width=i) for i in range(5)]
+    del layers[2]
+    layers[0].act = "gelu"
+    assert replay(OvConf(layers=layers)) == [
+        "layers.2=<del>",
+        "layers.0.act=gelu",
+    ]
+    assert replay(OvConf(weights={"a": 1.0, "c": math.nan}, shape=(1, 3))) == [
+        'weights={"a":1.0,"c":NaN}',
+        "shape=[1,3]",
+    ]
+    weights = {f"w{i}": float(i) for i in range(5)}
+    assert replay(OvConf(weights=weights), OvConf(weights={**weights, "b": 0})) == [
+        "weights.b=<del>"
+    ]
+
+
+def test_overrides_values():
+    # strings that would be parsed as something else are quoted
+    assert replay(OvConf(name="1", note=" x")) == ['name="1"', 'note=" x"']
+    assert replay(OvConf(name="a b", note="<unk>")) == ["name=a b", "note=<unk>"]
+    assert replay(OvConf(name="k=v;w")) == ['name="k\\u003dv\\u003bw"']
+    with pytest.raises(ValueError, match="special value"):
+        lunaconf_overrides(OvConf(note="<del>"))
+
+
+def test_overrides_base():
+    base = OvConf(name="base", items=[1, 2, 3])
+    assert replay(OvConf(name="base", items=[1, 3]), base) == ["items.1=<del>"]
+    # from an empty dump, every field is written
+    cmds = lunaconf_overrides(OvConf(), {})
+    assert [c.split("=")[0] for c in cmds] == list(OvConf.model_fields)
+
+
+def test_overrides_random():
+    rng = random.Random(0)
+    for _ in range(300):
+        items = list(range(20))
+        for _ in range(rng.randint(0, 4)):
+            op = rng.randint(0, 2)
+            if op == 0 and items:
+                del items[rng.randrange(len(items))]
+            elif op == 1:
+                items.insert(rng.randint(0, len(items)), rng.randint(0, 30))
+            elif items:
+                items[rng.randrange(len(items))] = rng.randint(0, 30)
+        layers = [
+            OvLayer(width=rng.randint(0, 3), act=rng.choice(["relu", "gelu"]))
+            for _ in range(rng.randint(0, 7))
+        ]
+        replay(OvConf(items=items, layers=layers))
+
+
+def test_overrides_cli(capsys):
+    with pytest.raises(SystemExit):
+        lunaconf_cli(OvConf, ["items.3=<del>", "name=x y", "--print-overrides"])
+    cmds = shlex.split(capsys.readouterr().out)
+    assert cmds == ["name=x y", "items.3=<del>"]
+    d = lunaconf_defaults(OvConf).seed()
+    lunaconf_gendict(d, cmds)
+    assert OvConf.model_validate(d) == lunaconf_cli(
+        OvConf, ["items.3=<del>", "name=x y"]
+    )
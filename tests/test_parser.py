@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+from pydantic import Field, ValidationError
+
+from lunaconf import LunaConf, LunaConfParser, lunaconf_cli
+from lunaconf import cli as lunaconf_cli_module
+
+
+class ParserInner(LunaConf):
+    lr: float = 0.1
+    layers: list[int] = Field(default_factory=lambda: [1, 2])
+
+
+class ParserConf(LunaConf):
+    name: str = "default"
+    inner: ParserInner = Field(default_factory=ParserInner)
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        [],
+        ["name=a; inner.lr=0.5", "inner.layers.1=3"],
+        ["-j", '{"inner": {"lr": 2}}', "-t", 'name = "t"'],
+        ["name=first", "-d", '{"name": "second"}'],
+    ],
+)
+def test_parser_matches_cli(args):
+    parser = LunaConfParser(ParserConf)
+    assert parser.parse(args) == lunaconf_cli(ParserConf, args)
+
+
+def test_parser_fast_path(monkeypatch, tmp_path):
+    parser = LunaConfParser(ParserConf, init_from_defaults=False)
+    monkeypatch.setattr(
+        parser._parser, "parse_args", lambda *_: pytest.fail("argparse used")
+    )
+    conf = parser.parse(["name=a", "inner.lr=1"])
+    assert conf == ParserConf(name="a", inner=ParserInner(lr=1.0))
+    monkeypatch.undo()
+
+    path = tmp_path / "conf.args"
+    path.write_text("inner.layers.0=5\n")
+    assert parser.parse(["-C", str(path)]).inner.layers == [5]
+
+
+def test_parser_errors():
+    parser = LunaConfParser(ParserConf)
+    with pytest.raises(ValueError, match="unrecognized arguments"):
+        parser.parse(["--bogus"])
+    with pytest.raises(ValueError, match="Invalid command format"):
+        parser.parse(["name"])
+    with pytest.raises(ValidationError):
+        parser.parse(["inner.lr=fast"])
+
+
+def test_parser_threads():
+    parser = LunaConfParser(ParserConf)
+    errors = []
+
+    def work(k):
+        try:
+            for i in range(50):
+                doc = f'{{"inner": {{"lr": {k}}}}}'
+                args = [f"name=t{k}", f"inner.layers.0={i}", "-j", doc]
+                conf = parser.parse(args)
+                assert conf.name == f"t{k}"
+                assert conf.inner.layers == [i, 2]
+                assert conf.inner.lr == k
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(k,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_tagged_actions_created_once():
+    assert lunaconf_cli_module._append_action_with_tag(
+        "json"
+    ) is lunaconf_cli_module._append_action_with_tag("json")
@@ -0,0 +1,90 @@
+import io
+import threading
+
+import pytest
+from pydantic import Field, model_validator
+
+from lunaconf import (
+    LunaConf,
+    lunaconf_add_profile_hook,
+    lunaconf_cli,
+    lunaconf_dump_json,
+    lunaconf_remove_profile_hook,
+)
+from lunaconf.profile import _NULL_PHASE, phase
+
+
+class ProfConf(LunaConf):
+    a: int = 0
+    xs: list[int] = Field(default_factory=lambda: [1, 2])
+
+
+def test_profile_hook(tmp_path):
+    doc = tmp_path / "conf.json"
+    doc.write_text('{"a": 3}')
+    events = []
+    lunaconf_add_profile_hook(events.append)
+    try:
+        conf = lunaconf_cli(ProfConf, ["-J", str(doc), "a=4; xs.0=5", "xs.1=6"])
+        lunaconf_dump_json(conf, io.StringIO())
+    finally:
+        lunaconf_remove_profile_hook(events.append)
+    assert conf == ProfConf(a=4, xs=[5, 6])
+
+    names = {e.name for e in events}
+    assert {"argparse", "read", "parse", "compile", "merge", "validate"} <= names
+    assert "dump" in names
+    read = next(e for e in events if e.name == "read")
+    assert read.source == str(doc) and read.size == len('{"a": 3}')
+    assert sum(e.count for e in events if e.name == "compile") == 3
+    assert all(e.seconds >= 0 for e in events)
+
+    # nothing is recorded without hooks
+    assert phase("parse") is _NULL_PHASE
+    seen = len(events)
+    lunaconf_cli(ProfConf, ["a=1"])
+    assert len(events) == seen
+
+
+def test_profile_flag(capsys):
+    conf = lunaconf_cli(ProfConf, ["--lunaconf-profile", "a=2"])
+    assert conf.a == 2
+    err = capsys.readouterr().err
+    assert "lunaconf profile:" in err
+    assert "validate" in err
+    assert "overrides: 1" in err
+    assert "peak memory" in err
+
+    with pytest.raises(SystemExit):
+        lunaconf_cli(ProfConf, ["--lunaconf-profile", "a=3", "-p"])
+    out, err = capsys.readouterr()
+    assert '"a": 3' in out
+    assert "dump" in err
+
+
+class ThreadedConf(ProfConf):
+    @model_validator(mode="after")
+    def _resolve_elsewhere(self):
+        # e.g. a watcher thread resolving while the report is running
+        def resolve() -> None:
+            with phase("special"):
+                pass
+
+        worker = threading.Thread(target=resolve)
+        worker.start()
+        worker.join()
+        return self
+
+
+def test_profile_flag_ignores_other_threads(capsys):
+    events = []
+    lunaconf_add_profile_hook(events.append)
+    try:
+        lunaconf_cli(ThreadedConf, ["--lunaconf-profile", "a=2"])
+    finally:
+        lunaconf_remove_profile_hook(events.append)
+    # hooks see every thread, the report only its own
+    assert "special" in {e.name for e in events}
+    err = capsys.readouterr().err
+    assert "validate" in err
+    assert "special" not in err
@@ -0,0 +1,187 @@
+from enum import Enum
+from pathlib import Path
+from typing import Annotated
+
+import pytest
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    BeforeValidator,
+    ConfigDict,
+    Field,
+    ValidationError,
+    field_validator,
+)
+
+from lunaconf import LunaConf, lunaconf_cli, lunaconf_gendict
+from lunaconf.defaults import lunaconf_defaults
+from lunaconf.schema import OverrideChecker, schema_index
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+class SchemaItem(LunaConf):
+    model_config = ConfigDict(extra="forbid")
+
+    xs: list[int] = Field(default_factory=lambda: [1, 2])
+    path: Path = Path("a")
+    color: Color = Color.RED
+    pair: tuple[int, int] = (0, 0)
+
+
+class SchemaConf(LunaConf):
+    model_config = ConfigDict(extra="forbid")
+
+    item: SchemaItem = Field(default_factory=SchemaItem)
+    items: list[SchemaItem] = Field(default_factory=lambda: [SchemaItem()])
+    table: dict[str, SchemaItem] = Field(default_factory=dict)
+    opt: int | None = None
+
+
+class LooseConf(LunaConf):
+    n: int = 0
+    upper: str = "A"
+
+    @field_validator("upper", mode="before")
+    @classmethod
+    def _upper(cls, v):
+        return str(v).upper()
+
+
+def test_index_lookup():
+    index = schema_index(SchemaConf)
+    assert schema_index(SchemaConf) is index
+    assert index.lookup("item.xs.0").annotation is int
+    assert index.lookup("items.3.color").annotation is Color
+    assert index.lookup("table.any.path").annotation is Path
+    assert index.lookup("item.missing") is None
+    assert index.lookup("opt").adapter.validate_python(None) is None
+
+
+@pytest.mark.parametrize(
+    "args, loc",
+    [
+        (["item.xs.0=abc"], ("item", "xs", 0)),
+        (["items.0.color=green"], ("items", 0, "color")),
+        (['table.k.xs=[1, "x"]'], ("table", "k", "xs", 1)),
+        (["item.typo=1"], ("item", "typo")),
+        (["-d", '{"item": {"pair": [1, "x"]}}'], ("item", "pair", 1)),
+    ],
+)
+def test_fail_fast(args, loc):
+    config_dict = lunaconf_defaults(SchemaConf).seed()
+    # the error is raised while applying, with the location of the field
+    with pytest.raises(ValidationError) as info:
+        lunaconf_gendict(config_dict, args, cls=SchemaConf)
+    assert info.value.errors()[0]["loc"] == loc
+    with pytest.raises(ValidationError):
+        lunaconf_cli(SchemaConf, args)
+
+
+def test_checked_values_are_coerced():
+    checker = OverrideChecker(SchemaConf)
+    assert checker.check_path(("item", "path"), "b/c") == Path("b/c")
+    assert checker.check_path(("item", "color"), "blue") is Color.BLUE
+    assert checker.check_path(("opt",), None) is None
+    assert checker.complete
+    # tuples stay lists, with their items checked, so they can be indexed into
+    assert checker.check_path(("items", 0, "pair"), ["1", 2]) == [1, 2]
+    assert not checker.complete
+
+    conf = lunaconf_cli(
+        SchemaConf,
+        ["item.path=b/c", "item.color=blue", "items.0.pair=[1, 2]", "opt=<null>"],
+    )
+    assert conf.item.path == Path("b/c")
+    assert conf.item.color is Color.BLUE
+    assert conf.items[0].pair == (1, 2)
+    assert conf == SchemaConf.model_validate(
+        {
+            "item": {"path": "b/c", "color": "blue"},
+            "items": [{"pair": [1, 2]}],
+        }
+    )
+
+
+def test_unchecked_falls_back():
+    checker = OverrideChecker(LooseConf)
+    # extra keys are left to the model, which ignores them here
+    assert checker.check_path(("unknown",), 1) == 1
+    assert checker.complete
+    # before-validators may accept anything
+    assert checker.check_path(("upper",), 5) == 5
+    assert not checker.complete
+    assert checker.validate({"upper": 5, "unknown": 1}) == LooseConf(upper="5")
+    assert lunaconf_cli(LooseConf, ["upper=b", "n=2"]) == LooseConf(n=2, upper="B")
+
+
+class PartA(LunaConf):
+    x: int = 0
+
+
+class PartB(LunaConf):
+    x: int = 0
+    y: int = 0
+
+
+class ContainerConf(LunaConf):
+    t: tuple[int, ...] = ()
+    s: set[int] = Field(default_factory=set)
+    pair: tuple[PartA, PartA] | None = None
+    items: list[PartA | PartB] = Field(default_factory=list)
+
+
+@pytest.mark.parametrize(
+    "args, field, expected",
+    [
+        (["t=[1,2]", "t.1=5"], "t", (1, 5)),
+        (["-j", '{"s": [1, 2]}', "s.2=3"], "s", {1, 2, 3}),
+        (
+            ["-j", '{"pair": [{"x": 1}, {}]}', "pair.0.x=7"],
+            "pair",
+            (PartA(x=7), PartA()),
+        ),
+        (
+            ["-j", '{"items": [{"x": 1, "y": 2}]}', "items.0.x=9"],
+            "items",
+            [PartB(x=9, y=2)],
+        ),
+    ],
+)
+def test_containers_can_be_overridden_inside(args, field, expected):
+    conf = lunaconf_cli(ContainerConf, args)
+    assert getattr(conf, field) == expected
+    config_dict = lunaconf_defaults(ContainerConf).seed()
+    lunaconf_gendict(config_dict, args, cls=ContainerConf)
+    # what is set stays plain, so that later overrides can reach in
+    assert not isinstance(config_dict[field], (tuple, set, BaseModel))
+
+
+class AnnotatedConf(LunaConf):
+    x: Annotated[int, AfterValidator(lambda v: v * 2)] = 1
+    name: Annotated[str, BeforeValidator(lambda v: f"p{v}")] = "a"
+    xs: list[Annotated[int, AfterValidator(lambda v: v + 10)]] = []
+    table: dict[str, Annotated[int, AfterValidator(lambda v: -v)]] = {}
+    opt: Annotated[int, AfterValidator(lambda v: v * 2)] | None = None
+
+
+def test_annotated_validators_run_once():
+    conf = lunaconf_cli(
+        AnnotatedConf,
+        ["x=3", "name=b", "xs.0=1", "xs.1=2", "table.k=4", "opt=5"],
+    )
+    assert conf == AnnotatedConf.model_validate(
+        {"x": 3, "name": "b", "xs": [1, 2], "table": {"k": 4}, "opt": 5}
+    )
+    assert (conf.x, conf.name, conf.xs, conf.table, conf.opt) == (
+        6,
+        "pb",
+        [11, 12],
+        {"k": -4},
+        10,
+    )
+    conf = lunaconf_cli(AnnotatedConf, ["-j", '{"xs": [1, 2], "table": {"k": 4}}'])
+    assert conf.xs == [11, 12] and conf.table == {"k": -4}
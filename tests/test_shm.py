@@ -0,0 +1,79 @@
+import multiprocessing
+import os
+import sys
+from multiprocessing import resource_tracker
+
+import pytest
+from pydantic import Field
+
+from lunaconf import LunaConf, lunaconf_attach, lunaconf_publish
+
+
+class ShmInner(LunaConf):
+    lr: float = 0.1
+    layers: list[int] = Field(default_factory=lambda: [1, 2])
+
+
+class ShmConf(LunaConf):
+    name: str = "default"
+    inner: ShmInner = Field(default_factory=ShmInner)
+
+
+class OtherConf(LunaConf):
+    name: str = "default"
+
+
+def attach_in_worker(name):
+    return lunaconf_attach(ShmConf, name).model_dump()
+
+
+def test_publish_attach():
+    config = ShmConf(name="shared", inner=ShmInner(layers=list(range(1000))))
+    with lunaconf_publish(config) as shared:
+        attached = lunaconf_attach(ShmConf, shared.name)
+        assert attached == config
+        assert attached is not config
+        assert lunaconf_attach(ShmConf, shared.name, validate=True) == config
+        with pytest.raises(ValueError, match="different schema"):
+            lunaconf_attach(OtherConf, shared.name)
+
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(2) as pool:
+            dumps = pool.map(attach_in_worker, [shared.name] * 4)
+        assert dumps == [config.model_dump()] * 4
+        # workers exiting do not take the segment with them
+        assert lunaconf_attach(ShmConf, shared.name) == config
+
+    with pytest.raises(FileNotFoundError):
+        lunaconf_attach(ShmConf, shared.name)
+    shared.close()
+
+
+def test_publish_lifetime():
+    shared = lunaconf_publish(ShmConf(), name="lunaconf_test_lifetime")
+    assert shared.name == "lunaconf_test_lifetime"
+    assert lunaconf_attach(ShmConf, shared.name) == ShmConf()
+    del shared
+    with pytest.raises(FileNotFoundError):
+        lunaconf_attach(ShmConf, "lunaconf_test_lifetime")
+
+
+@pytest.mark.skipif(
+    os.name != "posix" or sys.version_info >= (3, 13), reason="posix fallback"
+)
+def test_attach_fallback(monkeypatch):
+    # as on interpreters without the private module
+    monkeypatch.setitem(sys.modules, "_posixshmem", None)
+    tracked = []
+    monkeypatch.setattr(
+        resource_tracker, "register", lambda name, rtype: tracked.append(name)
+    )
+    monkeypatch.setattr(
+        resource_tracker, "unregister", lambda name, rtype: tracked.remove(name)
+    )
+    config = ShmConf(name="fallback")
+    with lunaconf_publish(config) as shared:
+        before = list(tracked)
+        assert lunaconf_attach(ShmConf, shared.name) == config
+        # the segment is left to the publisher
+        assert tracked == before
@@ -0,0 +1,103 @@
+import subprocess
+import sys
+from typing import Annotated
+
+import pytest
+from pydantic import AfterValidator, ConfigDict, Field
+
+from lunaconf import LunaConf, lunaconf_cli
+from lunaconf.snapshot import (
+    lunaconf_load_snapshot,
+    lunaconf_save_snapshot,
+    lunaconf_schema_fingerprint,
+)
+
+
+class SnapInner(LunaConf):
+    values: list[float] = Field(default_factory=lambda: [1.0, 2.0])
+
+
+class SnapConf(LunaConf):
+    name: str = "default"
+    inner: SnapInner = Field(default_factory=SnapInner)
+
+
+class OtherConf(LunaConf):
+    name: int = 0
+
+
+def test_snapshot_roundtrip(tmp_path):
+    snap = str(tmp_path / "conf.snap")
+    conf = lunaconf_cli(SnapConf, ["name=saved", "inner.values.2=<inf>", "-S", snap])
+    assert conf.inner.values == [1.0, 2.0, float("inf")]
+
+    loaded = lunaconf_cli(SnapConf, ["-L", snap])
+    assert loaded == conf
+
+    # overrides are applied on top of the snapshot
+    loaded = lunaconf_cli(SnapConf, ["-L", snap, "inner.values.0=<del>"])
+    assert loaded.name == "saved"
+    assert loaded.inner.values == [2.0, float("inf")]
+
+
+def test_snapshot_local_class(tmp_path):
+    class LocalConf(LunaConf):
+        a: int = 1
+
+    snap = str(tmp_path / "conf.snap")
+    lunaconf_save_snapshot(LocalConf(a=5), snap)
+    assert lunaconf_load_snapshot(LocalConf, snap) == LocalConf(a=5)
+
+
+def test_snapshot_schema_mismatch(tmp_path):
+    snap = str(tmp_path / "conf.snap")
+    lunaconf_save_snapshot(SnapConf(), snap)
+    with pytest.raises(ValueError, match="different schema"):
+        lunaconf_load_snapshot(OtherConf, snap)
+
+    bad = tmp_path / "bad.snap"
+    bad.write_bytes(b"garbage")
+    with pytest.raises(ValueError, match="not a lunaconf snapshot"):
+        lunaconf_load_snapshot(SnapConf, str(bad))
+
+
+class Opaque:
+    pass
+
+
+class OpaqueConf(LunaConf):
+    # no JSON schema for `Opaque`, so the fingerprint falls back to the fields
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    obj: Opaque = Opaque()
+    xs: list[Annotated[int, AfterValidator(lambda v: v)]] = []
+    inner: SnapInner = Field(default_factory=SnapInner)
+
+
+def test_schema_fingerprint_fallback_is_stable():
+    code = (
+        # allocate first, so that the processes lay out their objects apart
+        "import sys; junk = [object() for _ in range(int(sys.argv[2]))];"
+        "sys.path.insert(0, sys.argv[1]);"
+        "from test_snapshot import OpaqueConf;"
+        "from lunaconf.snapshot import lunaconf_schema_fingerprint;"
+        "print(lunaconf_schema_fingerprint(OpaqueConf).hex())"
+    )
+    prints = {
+        subprocess.run(
+            [sys.executable, "-c", code, __file__.rsplit("/", 1)[0], str(n)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        for n in (0, 100_000)
+    }
+    assert len(prints) == 1
+
+    class ChangedConf(OpaqueConf):
+        xs: list[str] = []
+
+    ChangedConf.__qualname__ = OpaqueConf.__qualname__
+    assert lunaconf_schema_fingerprint(ChangedConf) != lunaconf_schema_fingerprint(
+        OpaqueConf
+    )
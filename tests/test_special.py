@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+from lunaconf import LunaConf, lunaconf_cli, lunaconf_register_special_value
+from lunaconf.special import _ARG_TOKENS, _DEL_OBJ, _TOKENS, SpecialValueResolver
+
+
+class SpecialConf(LunaConf):
+    a: str = "a"
+    b: float = 0.0
+    c: list[str] = []
+
+
+def test_resolve_deep_document():
+    doc: list = ["<NULL>"]
+    for _ in range(10_000):
+        doc = [doc, "<inf>"]
+    SpecialValueResolver().resolve(doc)
+    inner = doc
+    for _ in range(10_000):
+        assert inner[1] == math.inf
+        inner = inner[0]
+    assert inner == [None]
+
+
+def test_resolve_tokens(monkeypatch):
+    monkeypatch.setenv("SPECIAL_TEST", "42")
+    r = SpecialValueResolver()
+    doc = {
+        "del": "<Del>",
+        "env": "<ENV:SPECIAL_TEST>",
+        "int": "<envint:SPECIAL_TEST>",
+        "plain": "<not special>",
+        "nested": [{"x": "<-inf>"}],
+    }
+    r.resolve(doc)
+    assert doc == {
+        "del": _DEL_OBJ,
+        "env": "42",
+        "int": 42,
+        "plain": "<not special>",
+        "nested": [{"x": -math.inf}],
+    }
+    # environment variables are looked up once per resolver
+    monkeypatch.setenv("SPECIAL_TEST", "43")
+    assert r.resolve("<envint:SPECIAL_TEST>") == 42
+    assert SpecialValueResolver().resolve("<envint:SPECIAL_TEST>") == 43
+
+    monkeypatch.delenv("SPECIAL_TEST")
+    with pytest.raises(ValueError, match="is not set"):
+        SpecialValueResolver().resolve("<env:SPECIAL_TEST>")
+
+
+def test_custom_special_values():
+    lunaconf_register_special_value("upper", str.upper)
+    lunaconf_register_special_value("pi", lambda: math.pi, takes_arg=False)
+    try:
+        conf = lunaconf_cli(
+            SpecialConf, ["a=<upper:text>", "b=<PI>", "-j", '{"c": ["<upper:x>"]}']
+        )
+        assert conf == SpecialConf(a="TEXT", b=math.pi, c=["X"])
+    finally:
+        del _ARG_TOKENS["upper"]
+        del _TOKENS["pi"]
+
+    with pytest.raises(ValueError):
+        lunaconf_register_special_value("null", lambda: 0, takes_arg=False)
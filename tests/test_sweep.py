@@ -0,0 +1,72 @@
+from typing import Self
+
+from pydantic import Field
+
+from lunaconf import LunaConf, lunaconf_sweep
+
+
+class OptimConf(LunaConf):
+    lr: float = 0.1
+    betas: list[float] = Field(default_factory=lambda: [0.9, 0.999])
+
+
+class SweepConf(LunaConf):
+    name: str
+    seed: int = 0
+    optim: OptimConf = Field(default_factory=OptimConf)
+
+    @classmethod
+    def __lunaconf_default__(cls) -> Self:
+        return cls(name="default")
+
+
+def test_sweep_product():
+    confs = list(
+        lunaconf_sweep(
+            SweepConf,
+            ["name=base"],
+            {"seed": [1, 2], "optim.lr": ["0.5", "0.05", 0.01]},
+        )
+    )
+    assert len(confs) == 6
+    assert [(c.seed, c.optim.lr) for c in confs] == [
+        (1, 0.5),
+        (1, 0.05),
+        (1, 0.01),
+        (2, 0.5),
+        (2, 0.05),
+        (2, 0.01),
+    ]
+    assert all(c.name == "base" for c in confs)
+
+
+def test_sweep_zipped():
+    confs = list(
+        lunaconf_sweep(
+            SweepConf,
+            [],
+            {
+                ("optim.betas.0", "optim.betas.1"): [(0.8, 0.99), ("0.5", "<del>")],
+                "seed": [3],
+            },
+        )
+    )
+    assert [c.optim.betas for c in confs] == [[0.8, 0.99], [0.5]]
+    assert [c.seed for c in confs] == [3, 3]
+
+
+def test_sweep_shares_base():
+    # overriding one point must not leak into the others
+    confs = list(
+        lunaconf_sweep(
+            SweepConf,
+            ["optim.betas.1=0.5"],
+            {"optim.betas.0": [0.1, 0.2], "optim.betas.2": [1, "<del>"]},
+        )
+    )
+    assert [c.optim.betas for c in confs] == [
+        [0.1, 0.5, 1.0],
+        [0.1, 0.5],
+        [0.2, 0.5, 1.0],
+        [0.2, 0.5],
+    ]
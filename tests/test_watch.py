@@ -0,0 +1,97 @@
+import os
+import threading
+
+from pydantic import Field
+
+from lunaconf import LunaConf, lunaconf_watch
+from lunaconf.watch import LunaWatcher
+
+
+class WatchInner(LunaConf):
+    lr: float = 0.1
+    layers: list[int] = Field(default_factory=lambda: [1, 2])
+
+
+class WatchConf(LunaConf):
+    name: str = "default"
+    inner: WatchInner = Field(default_factory=WatchInner)
+
+
+def touch(path, content):
+    # bump the mtime explicitly, as writes within one clock tick keep it
+    st = os.stat(path) if os.path.exists(path) else None
+    with open(path, "w") as f:
+        f.write(content)
+    if st is not None:
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_watch_check(tmp_path):
+    doc = str(tmp_path / "conf.json")
+    base = str(tmp_path / "base.args")
+    args = str(tmp_path / "conf.args")
+    touch(doc, '{"inner": {"lr": 0.5}}')
+    touch(base, "name=base\n")
+    touch(args, f"-C {base}\n-J {doc}\n")
+
+    changes = []
+    errors = []
+    watcher = LunaWatcher(
+        WatchConf,
+        ["-C", args, "inner.layers.0=7"],
+        lambda config, diff: changes.append((config, diff)),
+        on_error=errors.append,
+    )
+    assert watcher.config == WatchConf(
+        name="base", inner=WatchInner(lr=0.5, layers=[7, 2])
+    )
+    assert set(watcher.files) == {os.path.realpath(p) for p in (doc, base, args)}
+    assert not watcher.check()
+
+    touch(doc, '{"inner": {"lr": 0.25, "layers": [3]}}')
+    assert watcher.check()
+    config, diff = changes[-1]
+    assert watcher.config is config
+    # the command-line override is still applied on top
+    assert config.inner.layers == [7, 2]
+    assert diff == {"inner": {"lr": 0.25}}
+
+    # a file saved half-way keeps the current configuration
+    touch(doc, '{"inner": ')
+    assert not watcher.check()
+    assert len(errors) == 1
+    assert watcher.config is config
+
+    touch(doc, '{"inner": {"lr": 0.25, "layers": [3]}}')
+    # an unchanged result is not reported
+    assert not watcher.check()
+
+    # newly included files are picked up
+    extra = str(tmp_path / "extra.args")
+    touch(extra, "name=extra\n")
+    touch(args, f"-C {base}\n-J {doc}\n-C {extra}\n")
+    assert watcher.check()
+    assert changes[-1][1] == {"name": "extra"}
+    touch(extra, "name=again\n")
+    assert watcher.check()
+    assert watcher.config.name == "again"
+    watcher.stop()
+
+
+def test_watch_thread(tmp_path):
+    doc = str(tmp_path / "conf.toml")
+    touch(doc, 'name = "first"\n')
+    changed = threading.Event()
+    seen = []
+
+    def on_change(config, diff):
+        seen.append(config.name)
+        changed.set()
+
+    with lunaconf_watch(
+        WatchConf, ["-T", doc], on_change, interval=0.05, debounce=0.05
+    ) as watcher:
+        assert watcher.config.name == "first"
+        touch(doc, 'name = "second"\n')
+        assert changed.wait(5)
+    assert seen == ["second"]